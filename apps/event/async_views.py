@@ -0,0 +1,147 @@
+"""
+Async variants of the event read endpoints (detail, availability, schedule list), served
+instead of the DRF views under ASGI (settings.ASYNC_EVENT_VIEWS). Lookups use the async
+queryset methods and snapshots are served without leaving the event loop, only the
+serializers and the availability run on the thread of sync_to_async.
+Writes of the same paths are passed to the DRF views
+"""
+from abc import ABC, abstractmethod
+from typing import Any, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import patch_vary_headers
+
+from apps.event.models import Event, Schedule
+from apps.event.serializers import EventSerializer, ScheduleSerializer
+from apps.event.services import EventService
+from apps.event.views import EventDetailView, ScheduleView
+from config.async_views import AsyncAPIView
+from config.conditional import (
+    ContentVersion,
+    conditional_response,
+    get_content_version,
+    set_validators,
+)
+from config.edge_cache import set_cache_headers, surrogate_key
+from config.exceptions import InstanceNotFound
+from config.snapshots import get_snapshot, snapshot_response, store_snapshot
+
+
+class EventReadAsyncView(AsyncAPIView, ABC):
+    """
+    GET of an event resource, validated against the content version of the event
+    and served from its snapshot of kind snapshot_kind
+    """
+
+    snapshot_kind = ""
+    # DRF view of the other methods of the path
+    write_view_class = None
+
+    async def dispatch(self, request: HttpRequest, *args: Any, **kwargs: Any):
+        if request.method not in ("GET", "HEAD") and self.write_view_class:
+            view = self.write_view_class.as_view()
+            return await sync_to_async(view)(request, *args, **kwargs)
+        return await super().dispatch(request, *args, **kwargs)
+
+    async def get(
+        self, request: HttpRequest, *args: Any, **kwargs: Any
+    ) -> HttpResponse:
+        uuid = kwargs.get("uuid")
+        version = await sync_to_async(get_content_version)(request, Event, "uuid", uuid)
+        if version is None:
+            raise InstanceNotFound("event with the provided uuid does not exist")
+
+        response = conditional_response(request, version)
+        if response is None:
+            response = await self.get_snapshot_or_render(request, uuid, version)
+        return set_cache_headers(
+            set_validators(response, version), surrogate_key("event", uuid)
+        )
+
+    async def get_snapshot_or_render(
+        self, request: HttpRequest, uuid: str, version: ContentVersion
+    ) -> HttpResponse:
+        # like config.snapshots.serve_snapshot, query strings are rendered live
+        if settings.SNAPSHOT_TTL <= 0 or request.GET:
+            return self.respond(await self.load_payload(request, uuid, version))
+
+        snapshot = await sync_to_async(get_snapshot)(self.snapshot_kind, uuid, version)
+        if snapshot is not None:
+            return snapshot_response(request, snapshot, version)
+
+        response = self.respond(await self.load_payload(request, uuid, version))
+        await sync_to_async(store_snapshot)(
+            self.snapshot_kind, uuid, version, response.content
+        )
+        patch_vary_headers(response, ("Accept-Encoding",))
+        return response
+
+    @abstractmethod
+    async def load_payload(
+        self, request: HttpRequest, uuid: str, version: ContentVersion
+    ) -> Any:
+        """
+        Data of the response, read at the content version
+        """
+
+
+class EventDetailAsyncView(EventReadAsyncView):
+    snapshot_kind = "event"
+    write_view_class = EventDetailView
+
+    async def load_payload(
+        self, request: HttpRequest, uuid: str, version: ContentVersion
+    ) -> Any:
+        event = (
+            await Event.objects.select_related("associated_team")
+            .prefetch_related("event_date", "schedule")
+            .filter(id=version.pk)
+            .afirst()
+        )
+        if event is None:
+            raise InstanceNotFound("event with the provided uuid does not exist")
+        # the availability field reads the shared table or the schedules
+        return await sync_to_async(
+            lambda: EventSerializer(event, context={"request": request}).data
+        )()
+
+
+class EventAvailabilityAsyncView(EventReadAsyncView):
+    snapshot_kind = "event-availability"
+
+    async def load_payload(
+        self, request: HttpRequest, uuid: str, version: ContentVersion
+    ) -> Any:
+        event = Event(id=version.pk, uuid=uuid, content_version=version.content_version)
+        return {
+            "availability": await sync_to_async(EventService.get_availability_str)(
+                event
+            )
+        }
+
+
+class ScheduleListAsyncView(AsyncAPIView):
+    async def dispatch(self, request: HttpRequest, *args: Any, **kwargs: Any):
+        # writes and delta syncs (?since=) are served by the DRF view
+        if request.method not in ("GET", "HEAD") or "since" in request.GET:
+            view = ScheduleView.as_view()
+            return await sync_to_async(view)(request, *args, **kwargs)
+        return await super().dispatch(request, *args, **kwargs)
+
+    async def get(
+        self, request: HttpRequest, *args: Any, **kwargs: Any
+    ) -> HttpResponse:
+        qs = (
+            Schedule.objects.select_related("event", "date")
+            .filter(event__uuid=kwargs.get("uuid"))
+            .order_by("date__date")
+        )
+        name: Optional[str] = request.GET.get("name")
+        if name:
+            qs = qs.filter(name=name)
+
+        schedules = [schedule async for schedule in qs]
+        response = self.respond(ScheduleSerializer(schedules, many=True).data)
+        return set_cache_headers(response, surrogate_key("event", kwargs.get("uuid")))
@@ -0,0 +1,285 @@
+"""
+Aggregated availability of events (dates x 48 counters) in a memory-mapped file shared by
+the workers of a host, so a hot event is computed once per host and stored once,
+whatever the number of workers.
+
+The file has a fixed layout: a header followed by settings.AVAILABILITY_SHM_SLOTS slots of
+the same size, the slot of an event is its id modulo the number of slots. The file is named
+after its layout and never resized under the workers mapping it. Every slot holds
+the content version of the event it was computed for, and a lookup only hits when the
+version matches the one of the event being served, so a write bumping the version retires
+the slot in every worker at once.
+
+Reads are lock-free with a seqlock: writers make the sequence number of the slot odd,
+write, and make it even again, and readers retry while it is odd or changed under them.
+Writers of a slot exclude each other with an fcntl lock on its byte range.
+Workers missing the same event wait for the one computing it (compute_lock).
+"""
+import fcntl
+import logging
+import mmap
+import os
+import struct
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List, NamedTuple, Optional
+
+import numpy as np
+from django.conf import settings
+
+from config.metrics import CACHE_REQUESTS
+
+logger = logging.getLogger("bistime")
+
+MAGIC = b"BTAVAIL1"
+SLOTS_PER_DAY = 48
+
+# magic, number of slots, max dates per slot
+FILE_HEADER = struct.Struct("<8sII")
+# sequence, event id, content version, number of dates
+SLOT_HEADER = struct.Struct("<QqqI4x")
+SEQUENCE = struct.Struct("<Q")
+
+READ_RETRIES = 16
+
+
+class EventAvailability(NamedTuple):
+    # proleptic Gregorian ordinals of the event dates, in the order of the response
+    dates: List[int]
+    # number of available members per date and slot, shape (len(dates), 48)
+    counters: np.ndarray
+
+
+class SharedAvailabilityTable(object):
+    def __init__(self, path: str, slots: int, max_dates: int):
+        self.path = path
+        self.slots = slots
+        self.max_dates = max_dates
+        self.slot_size = self.__align(
+            SLOT_HEADER.size + max_dates * 4 + max_dates * SLOTS_PER_DAY * 2
+        )
+        self.size = self.__align(FILE_HEADER.size) + slots * self.slot_size
+
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            self.__initialize()
+            self.mm = mmap.mmap(self.fd, self.size)
+        except BaseException:
+            os.close(self.fd)
+            raise
+
+        # fcntl locks are per process, threads of a worker take this one first
+        self._write_lock = threading.Lock()
+        self._compute_locks = [threading.Lock() for _ in range(slots)]
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self._hit_counter = CACHE_REQUESTS.labels("event_availability_shm", "hit")
+        self._miss_counter = CACHE_REQUESTS.labels("event_availability_shm", "miss")
+
+    def get(self, event_id: int, content_version: int) -> Optional[EventAvailability]:
+        availability = self.peek(event_id, content_version)
+        if availability is None:
+            self.misses += 1
+            self._miss_counter.inc()
+        else:
+            self.hits += 1
+            self._hit_counter.inc()
+        return availability
+
+    def peek(self, event_id: int, content_version: int) -> Optional[EventAvailability]:
+        """
+        get() without counting the lookup
+        """
+        offset = self.__slot_offset(event_id)
+        for _ in range(READ_RETRIES):
+            (sequence,) = SEQUENCE.unpack_from(self.mm, offset)
+            if sequence & 1:
+                # a writer is in the slot
+                continue
+
+            _, stored_id, stored_version, n_dates = SLOT_HEADER.unpack_from(
+                self.mm, offset
+            )
+            found = stored_id == event_id and stored_version == content_version
+            if found:
+                n_dates = min(n_dates, self.max_dates)
+                dates = np.frombuffer(
+                    self.mm, np.int32, n_dates, offset + SLOT_HEADER.size
+                ).tolist()
+                counters = np.frombuffer(
+                    self.mm,
+                    np.uint16,
+                    n_dates * SLOTS_PER_DAY,
+                    offset + SLOT_HEADER.size + self.max_dates * 4,
+                ).reshape(n_dates, SLOTS_PER_DAY)
+                counters = counters.copy()
+
+            if SEQUENCE.unpack_from(self.mm, offset)[0] != sequence:
+                continue
+            if not found:
+                break
+            return EventAvailability(dates, counters)
+        return None
+
+    def put(
+        self, event_id: int, content_version: int, availability: EventAvailability
+    ) -> bool:
+        """
+        Stores the availability of an event computed after its content version was read.
+        Events with more than max_dates dates are not stored,
+        and a slot holding a newer version of the same event is kept
+        """
+        n_dates = len(availability.dates)
+        if n_dates > self.max_dates:
+            return False
+
+        offset = self.__slot_offset(event_id)
+        counters = np.minimum(availability.counters, np.iinfo(np.uint16).max)
+        with self._write_lock:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX, self.slot_size, offset)
+            try:
+                sequence, stored_id, stored_version, _ = SLOT_HEADER.unpack_from(
+                    self.mm, offset
+                )
+                if stored_id == event_id and stored_version > content_version:
+                    return False
+
+                # odd after a writer died in the slot, the next writer starts from there
+                begin = sequence + 1 if sequence % 2 == 0 else sequence + 2
+                SEQUENCE.pack_into(self.mm, offset, begin)
+                SLOT_HEADER.pack_into(
+                    self.mm, offset, begin, event_id, content_version, n_dates
+                )
+                data = offset + SLOT_HEADER.size
+                self.mm[data : data + n_dates * 4] = np.asarray(
+                    availability.dates, dtype=np.int32
+                ).tobytes()
+                data += self.max_dates * 4
+                self.mm[
+                    data : data + n_dates * SLOTS_PER_DAY * 2
+                ] = np.ascontiguousarray(counters, dtype=np.uint16).tobytes()
+                SEQUENCE.pack_into(self.mm, offset, begin + 1)
+            finally:
+                fcntl.lockf(self.fd, fcntl.LOCK_UN, self.slot_size, offset)
+
+        self.writes += 1
+        return True
+
+    @contextmanager
+    def compute_lock(self, event_id: int) -> Iterator[None]:
+        """
+        Lets one worker of the host at a time compute the availability of the events
+        of a slot. The lock covers a byte past the end of the file, away from the writers,
+        and is taken after the thread lock of the slot
+        """
+        slot = event_id % self.slots
+        offset = self.size + slot
+        with self._compute_locks[slot]:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX, 1, offset)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self.fd, fcntl.LOCK_UN, 1, offset)
+
+    def clear(self) -> None:
+        with self._write_lock:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX)
+            try:
+                start = self.__align(FILE_HEADER.size)
+                self.mm[start : self.size] = bytes(self.size - start)
+            finally:
+                fcntl.lockf(self.fd, fcntl.LOCK_UN)
+
+    def close(self) -> None:
+        self.mm.close()
+        os.close(self.fd)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "bytes": self.size,
+            "slots": self.slots,
+            "max_dates": self.max_dates,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else None,
+            "writes": self.writes,
+        }
+
+    def __initialize(self) -> None:
+        # the first worker formats the file, the others find it ready
+        fcntl.lockf(self.fd, fcntl.LOCK_EX)
+        try:
+            header = os.pread(self.fd, FILE_HEADER.size, 0)
+            expected = FILE_HEADER.pack(MAGIC, self.slots, self.max_dates)
+            size = os.fstat(self.fd).st_size
+            if size == 0:
+                os.ftruncate(self.fd, self.size)
+                os.pwrite(self.fd, expected, 0)
+            elif header != expected or size != self.size:
+                # other workers may map it, shrinking it would fault their reads
+                raise OSError(f"{self.path} holds a table of another layout")
+        finally:
+            fcntl.lockf(self.fd, fcntl.LOCK_UN)
+
+    def __slot_offset(self, event_id: int) -> int:
+        return self.__align(FILE_HEADER.size) + (event_id % self.slots) * self.slot_size
+
+    @staticmethod
+    def __align(size: int) -> int:
+        return (size + 7) // 8 * 8
+
+
+_availability_table: Optional[SharedAvailabilityTable] = None
+_availability_table_lock = threading.Lock()
+# set once the configured file could not be mapped, the worker computes every read
+_availability_table_failed = False
+
+
+def availability_table_path() -> str:
+    """
+    File of the configured layout under settings.AVAILABILITY_SHM_PATH, workers with other
+    slots or max_dates (e.g. during a rolling deploy) map another file
+    """
+    return (
+        f"{settings.AVAILABILITY_SHM_PATH}"
+        f"-{settings.AVAILABILITY_SHM_SLOTS}x{settings.AVAILABILITY_SHM_MAX_DATES}"
+    )
+
+
+def get_availability_table() -> Optional[SharedAvailabilityTable]:
+    """
+    Process-wide table at availability_table_path(), None when the path is empty
+    or the file cannot be mapped
+    """
+    global _availability_table, _availability_table_failed
+    if (
+        _availability_table is None
+        and settings.AVAILABILITY_SHM_PATH
+        and not _availability_table_failed
+    ):
+        with _availability_table_lock:
+            if _availability_table is None and not _availability_table_failed:
+                try:
+                    _availability_table = SharedAvailabilityTable(
+                        availability_table_path(),
+                        settings.AVAILABILITY_SHM_SLOTS,
+                        settings.AVAILABILITY_SHM_MAX_DATES,
+                    )
+                except OSError as e:
+                    logger.warning(f"shared availability table disabled: {e}")
+                    _availability_table_failed = True
+    return _availability_table
+
+
+def set_availability_table(table: Optional[SharedAvailabilityTable]) -> None:
+    """
+    Replaces the process-wide table, None resets it to the configured file
+    """
+    global _availability_table, _availability_table_failed
+    with _availability_table_lock:
+        _availability_table = table
+        _availability_table_failed = False
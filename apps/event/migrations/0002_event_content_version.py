@@ -0,0 +1,35 @@
+# Generated by Django 4.1.5 on 2026-10-20 01:39
+
+import django.core.validators
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("event", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="content_updated_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name="event",
+            name="content_version",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name="event",
+            name="uuid",
+            field=models.CharField(
+                db_index=True,
+                help_text="이벤트를 구분하거나, url 생성을 위한 uuid 문자열",
+                max_length=22,
+                validators=[django.core.validators.MinLengthValidator(22)],
+            ),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.1.5 on 2026-10-20 02:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("event", "0002_event_content_version"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScheduleTombstone",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("schedule_id", models.BigIntegerField(help_text="삭제된 스케줄의 id")),
+                ("name", models.CharField(max_length=50)),
+                ("date", models.DateField()),
+                ("deleted_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "db_table": "schedule_tombstone",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="schedule",
+            index=models.Index(
+                fields=["event", "updated_at"], name="schedule_event_updated_idx"
+            ),
+        ),
+        migrations.AddField(
+            model_name="scheduletombstone",
+            name="event",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="schedule_tombstone",
+                to="event.event",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="scheduletombstone",
+            index=models.Index(
+                fields=["event", "deleted_at"], name="tombstone_event_deleted_idx"
+            ),
+        ),
+    ]
@@ -1,10 +1,10 @@
 from django.db import models
 from django.core.validators import MinLengthValidator
 from apps.team.models import Team
-from config.mixins import TimeStampMixin, TimeBlockMixin
+from config.mixins import TimeStampMixin, TimeBlockMixin, ContentVersionMixin
 
 
-class Event(TimeStampMixin, TimeBlockMixin):
+class Event(TimeStampMixin, TimeBlockMixin, ContentVersionMixin):
     """
     A single event with date and time range
     """
@@ -14,6 +14,7 @@ class Event(TimeStampMixin, TimeBlockMixin):
         max_length=22,
         validators=[MinLengthValidator(22)],
         null=False,
+        db_index=True,
         help_text="이벤트를 구분하거나, url 생성을 위한 uuid 문자열",
     )
     associated_team = models.ForeignKey(
@@ -76,9 +77,45 @@ class Schedule(TimeStampMixin):
     class Meta:
         db_table = "schedule"
         unique_together = (("name", "event", "date"),)
+        indexes = [
+            # changes of the schedules of an event (ScheduleView ?since=)
+            models.Index(
+                fields=["event", "updated_at"], name="schedule_event_updated_idx"
+            )
+        ]
 
     def __str__(self) -> str:
         return f"[{self.id}] {self.name}"
 
     def __repr__(self) -> str:
         return f"Schedule({self.id}, {self.name})"
+
+
+class ScheduleTombstone(models.Model):
+    """
+    Schedule deleted from an event, kept for the clients syncing the schedules of the event
+    (ScheduleView ?since=) for settings.SCHEDULE_TOMBSTONE_RETENTION seconds
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    event = models.ForeignKey(
+        Event, null=False, on_delete=models.CASCADE, related_name="schedule_tombstone"
+    )
+    schedule_id = models.BigIntegerField(null=False, help_text="삭제된 스케줄의 id")
+    name = models.CharField(max_length=50, null=False)
+    date = models.DateField(null=False)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "schedule_tombstone"
+        indexes = [
+            models.Index(
+                fields=["event", "deleted_at"], name="tombstone_event_deleted_idx"
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"[{self.schedule_id}] {self.name}"
+
+    def __repr__(self) -> str:
+        return f"ScheduleTombstone({self.schedule_id}, {self.name}, {self.date})"
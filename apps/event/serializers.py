@@ -1,15 +1,15 @@
 import datetime
 
 from apps.event.services import EventService
-from config.mixins import TimeBlockMixin
+from config.mixins import SparseFieldsetMixin, TimeBlockMixin
 
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
-from apps.event.models import Event, EventDate, Schedule
+from apps.event.models import Event, EventDate, Schedule, ScheduleTombstone
 from typing import Dict, Union
 
 
-class EventSerializer(serializers.ModelSerializer):
+class EventSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     associated_team = serializers.SerializerMethodField()
     availability = serializers.SerializerMethodField(read_only=True)
 
@@ -121,3 +121,13 @@ class ScheduleSerializer(serializers.ModelSerializer):
 
     def get_date(self, obj):
         return str(obj.date.date)
+
+
+class ScheduleTombstoneSerializer(serializers.ModelSerializer):
+    # id of the deleted schedule
+    id = serializers.IntegerField(source="schedule_id", read_only=True)
+
+    class Meta:
+        model = ScheduleTombstone
+        fields = ["id", "name", "date", "deleted_at"]
+        read_only_fields = fields
@@ -1,23 +1,74 @@
 from __future__ import annotations
 
 import datetime
-from itertools import groupby
-from operator import itemgetter
-from typing import Union, Optional, Dict, List
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union, Optional, Dict, List, NamedTuple, Set
 
+import numpy as np
 import shortuuid
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections, transaction
 from django.db.models import QuerySet
 from django.http import Http404
 from django.shortcuts import get_object_or_404, get_list_or_404
+from django.utils import timezone
 import uuid
 
 from rest_framework.request import Request
 
-from apps.event.models import Event, Schedule, EventDate
-from config.exceptions import InstanceNotFound
+from apps.event.availability import (
+    EventAvailability,
+    SharedAvailabilityTable,
+    get_availability_table,
+)
+from apps.event.models import Event, Schedule, EventDate, ScheduleTombstone
+from config.cache import SingleFlight, cached, service_cache
+from config.conditional import load_content_version
+from config.edge_cache import purge_surrogate_key
+from config.exceptions import InstanceNotFound, InvalidInputException
+from config.snapshots import render_snapshot, store_snapshot
+
+logger = logging.getLogger("bistime")
+
+# refreshes the shared availability and the snapshot of written events outside of
+# the request cycle
+event_refresh_executor = ThreadPoolExecutor(
+    max_workers=1, thread_name_prefix="event-refresh"
+)
+
+
+class EventIdentity(NamedTuple):
+    """
+    Fields of an event that only change with the event itself, not with its dates
+    or schedules
+    """
+
+    id: int
+    uuid: str
+    associated_team_id: Optional[int]
+    start_time: str
+    end_time: str
+
+    def to_event(self) -> Event:
+        # from_db() takes the values in the order of the model fields
+        values = self._asdict()
+        field_names = [
+            f.attname for f in Event._meta.concrete_fields if f.attname in values
+        ]
+        return Event.from_db(
+            DEFAULT_DB_ALIAS, field_names, [values[name] for name in field_names]
+        )
 
 
 class EventService:
+    # coalesces the threads of the worker computing the availability of an event
+    availability_flight = SingleFlight()
+    # events waiting for event_refresh_executor, a burst of writes refreshes them once
+    _refresh_queued: Set[str] = set()
+    _refresh_lock = threading.Lock()
+
     @staticmethod
     def get_event_by_id(event_id: int) -> Event:
         try:
@@ -28,11 +79,54 @@ class EventService:
 
     @staticmethod
     def get_event_by_uuid(event_uuid: str) -> Event:
-        try:
-            event: Event = get_object_or_404(Event, uuid=event_uuid)
-        except Http404:
+        """
+        Event with only its identity fields loaded (EventIdentity), without a query once
+        cached. Its other fields are deferred and loaded from the database when accessed
+        """
+        return EventService.get_event_identity(event_uuid).to_event()
+
+    @staticmethod
+    @cached(
+        "event-identity:{event_uuid}",
+        ttl=lambda: settings.EVENT_IDENTITY_CACHE_TTL,
+        tags=["event-identity:{event_uuid}"],
+    )
+    def get_event_identity(event_uuid: str) -> EventIdentity:
+        row = (
+            Event.objects.filter(uuid=event_uuid)
+            .values_list(*EventIdentity._fields)
+            .first()
+        )
+        if row is None:
             raise InstanceNotFound("event with the provided id does not exist")
-        return event
+        return EventIdentity(*row)
+
+    @staticmethod
+    def invalidate_event_identity(*event_uuids: str) -> None:
+        """
+        Drops cached identities after events were updated or deleted
+        """
+        service_cache.invalidate_tags(
+            *(f"event-identity:{event_uuid}" for event_uuid in event_uuids)
+        )
+
+    @staticmethod
+    def invalidate_event(event_uuid: str) -> None:
+        """
+        Bumps the content version of an event after its dates or schedules changed,
+        so conditional GETs of the event miss, refreshes its availability in the shared
+        table and its snapshot in the background once committed, pushes it to the
+        subscribers of its stream and purges it from the edge cache
+        """
+        # the stream depends on this module
+        from apps.event.stream import availability_stream
+
+        # the identity is cached by the lookups of the write, no query of the event
+        Event.bump_content_version(id=EventService.get_event_identity(event_uuid).id)
+        service_cache.invalidate_tags(f"event:{event_uuid}")
+        transaction.on_commit(lambda: EventService.refresh_in_background(event_uuid))
+        transaction.on_commit(lambda: availability_stream.notify(event_uuid))
+        purge_surrogate_key("event", event_uuid)
 
     @staticmethod
     def generate_uuid() -> str:
@@ -41,56 +135,129 @@ class EventService:
         return s
 
     @staticmethod
-    def __calculate_event_availability(
-        event: Event,
-    ) -> Union[dict[str, list[int]], None]:
-        associated_dates: List[EventDate] = event.event_date.all()
+    def calculate_availability(event: Event) -> EventAvailability:
+        """
+        Number of available participants per date and slot of an event
+        """
+        associated_dates: List[EventDate] = list(event.event_date.all())
+        date_index: Dict[int, int] = {d.id: i for i, d in enumerate(associated_dates)}
 
-        if len(associated_dates) == 0:
-            return None
+        counters = np.zeros((len(associated_dates), 48), dtype=np.int64)
+        for date_id, availability in event.schedule.values_list(
+            "date_id", "availability"
+        ):
+            if date_id in date_index:
+                counters[date_index[date_id]] += np.frombuffer(
+                    bytes(availability), dtype=np.uint8
+                )
 
-        schedules: List[dict] = event.schedule.values()
+        return EventAvailability(
+            [d.date.toordinal() for d in associated_dates], counters
+        )
 
-        # sort INFO data by 'company' key.
-        schedules = sorted(schedules, key=itemgetter("date_id"))
+    @staticmethod
+    def get_availability(event: Event) -> EventAvailability:
+        """
+        Availability of the event from the shared table of the host, computed and stored
+        on a miss by one thread of one worker while the others wait for it.
+        The content version of the event was read before its schedules,
+        so a newer version is never labeled older
+        """
+        table = get_availability_table()
+        if table is not None:
+            availability = table.get(event.id, event.content_version)
+            if availability is not None:
+                return availability
 
-        grouped_schedules: Dict[int, List[dict]] = {}
+        return EventService.availability_flight.do(
+            (event.id, event.content_version),
+            lambda: EventService.__load_availability(event, table),
+        )
 
-        for key, value in groupby(schedules, key=itemgetter("date_id")):
-            grouped_schedules[key] = list(value)
+    @staticmethod
+    def __load_availability(
+        event: Event, table: Optional[SharedAvailabilityTable]
+    ) -> EventAvailability:
+        if table is None:
+            return EventService.calculate_availability(event)
 
-        availability_obj = {}
+        with table.compute_lock(event.id):
+            # stored by another worker while this one waited
+            availability = table.peek(event.id, event.content_version)
+            if availability is None:
+                availability = EventService.calculate_availability(event)
+                table.put(event.id, event.content_version, availability)
+        return availability
 
-        for date in associated_dates:
-            availability_list = [0] * 48
+    @staticmethod
+    def refresh_in_background(event_uuid: str) -> None:
+        """
+        Queues refresh_after_write of the event on event_refresh_executor,
+        unless it is already waiting there
+        """
+        if get_availability_table() is None and settings.SNAPSHOT_TTL <= 0:
+            return
+        with EventService._refresh_lock:
+            if event_uuid in EventService._refresh_queued:
+                return
+            EventService._refresh_queued.add(event_uuid)
+        event_refresh_executor.submit(EventService.__refresh_in_thread, event_uuid)
 
-            if date.id in grouped_schedules:
-                associated_schedules: List[dict] = grouped_schedules.get(date.id, None)
-                for s in associated_schedules:
-                    availability_list = [
-                        x + y
-                        for x, y in zip(availability_list, list(s["availability"]))
-                    ]
-            else:
-                pass
+    @staticmethod
+    def __refresh_in_thread(event_uuid: str) -> None:
+        try:
+            EventService.refresh_after_write(event_uuid)
+        finally:
+            connections.close_all()
 
-            availability_obj[str(date.date)] = availability_list
+    @staticmethod
+    def refresh_after_write(event_uuid: str) -> None:
+        """
+        Stores the availability of an event in the shared table and its rendered detail
+        (config.snapshots) after a write committed, readers compute them on a miss
+        """
+        # writes committed from now on queue another refresh
+        with EventService._refresh_lock:
+            EventService._refresh_queued.discard(event_uuid)
+        # the serializers depend on this module
+        from apps.event.serializers import EventSerializer
 
-        return availability_obj
+        try:
+            version = load_content_version(Event, "uuid", event_uuid)
+            if version is None:
+                return
+            event = (
+                Event.objects.select_related("associated_team")
+                .prefetch_related("event_date")
+                .get(id=version.pk)
+            )
+            # labeled with the version read before the schedules, as readers do
+            event.content_version = version.content_version
+            if get_availability_table() is not None:
+                EventService.get_availability(event)
+            if settings.SNAPSHOT_TTL > 0:
+                store_snapshot(
+                    "event",
+                    event_uuid,
+                    version,
+                    render_snapshot(EventSerializer(event).data),
+                )
+        except (DatabaseError, OSError, Event.DoesNotExist) as e:
+            logger.warning(f"failed to refresh event {event_uuid} after a write: {e}")
 
     @staticmethod
     def get_availability_str(event: Event) -> Dict[str, Union[str, List[int]]]:
-        availability_obj: Optional[
-            Dict[str, Union[str, List[int]]]
-        ] = EventService.__calculate_event_availability(event)
+        availability = EventService.get_availability(event)
 
-        if availability_obj is None:
+        if not availability.dates:
             return None
         else:
-            for k, v in availability_obj.items():
-                availability_obj[k] = "".join(str(e) for e in v)
-
-            return availability_obj
+            return {
+                str(datetime.date.fromordinal(date)): "".join(str(e) for e in counts)
+                for date, counts in zip(
+                    availability.dates, availability.counters.tolist()
+                )
+            }
 
 
 class EventDateService(object):
@@ -114,7 +281,19 @@ class EventDateService(object):
         return EventDate.objects.filter(event_id=event_id).all()
 
 
+class ScheduleChanges(NamedTuple):
+    schedules: QuerySet
+    deleted: QuerySet
+    # cursor of the next sync
+    cursor: str
+    # the cursor is older than the tombstones, schedules holds every schedule of the event
+    reset: bool
+
+
 class ScheduleService(object):
+    # cursors count microseconds since then, in the naive times of the database (USE_TZ = False)
+    EPOCH = datetime.datetime(1970, 1, 1)
+
     @staticmethod
     def get_schedule(event_id: int, date_id: int, name: str):
         return Schedule.objects.filter(
@@ -130,3 +309,82 @@ class ScheduleService(object):
                 "schedules with the provided event id does not exist"
             )
         return schedules
+
+    @staticmethod
+    def encode_cursor(moment: datetime.datetime) -> str:
+        return str(
+            (moment - ScheduleService.EPOCH) // datetime.timedelta(microseconds=1)
+        )
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> datetime.datetime:
+        try:
+            return ScheduleService.EPOCH + datetime.timedelta(microseconds=int(cursor))
+        except (ValueError, OverflowError):
+            raise InvalidInputException(f"invalid since cursor: {cursor}")
+
+    @staticmethod
+    def get_changes(
+        event_id: int, cursor: str, name: Optional[str] = None
+    ) -> ScheduleChanges:
+        """
+        Schedules of an event created or updated, and deleted since the cursor.
+        Both are read with the (event, updated_at) and (event, deleted_at) indexes,
+        so a poll costs the number of changes, whatever the size of the event
+        """
+        since = ScheduleService.decode_cursor(cursor)
+        now = timezone.now()
+        schedules = Schedule.objects.select_related("date").filter(event_id=event_id)
+        deleted = ScheduleTombstone.objects.filter(event_id=event_id)
+        if name is not None:
+            schedules = schedules.filter(name=name)
+            deleted = deleted.filter(name=name)
+
+        horizon = now - datetime.timedelta(
+            seconds=settings.SCHEDULE_TOMBSTONE_RETENTION
+        )
+        if since < horizon:
+            return ScheduleChanges(
+                schedules.order_by("date__date", "id"),
+                deleted.none(),
+                ScheduleService.encode_cursor(now),
+                True,
+            )
+
+        # changes committing after the previous sync read past them
+        start = since - datetime.timedelta(seconds=settings.SCHEDULE_SYNC_COMMIT_WINDOW)
+        return ScheduleChanges(
+            schedules.filter(updated_at__gte=start).order_by("updated_at", "id"),
+            deleted.filter(deleted_at__gte=start).order_by("deleted_at", "id"),
+            ScheduleService.encode_cursor(now),
+            False,
+        )
+
+    @staticmethod
+    def record_tombstones(schedules: QuerySet) -> None:
+        """
+        Records the schedules about to be deleted, in the transaction deleting them,
+        and prunes the expired tombstones of their events
+        """
+        rows = list(
+            schedules.select_for_update().values_list(
+                "event_id", "id", "name", "date__date"
+            )
+        )
+        if not rows:
+            return
+
+        ScheduleTombstone.objects.bulk_create(
+            [
+                ScheduleTombstone(
+                    event_id=event_id, schedule_id=schedule_id, name=name, date=date
+                )
+                for event_id, schedule_id, name, date in rows
+            ]
+        )
+        horizon = timezone.now() - datetime.timedelta(
+            seconds=settings.SCHEDULE_TOMBSTONE_RETENTION
+        )
+        ScheduleTombstone.objects.filter(
+            event_id__in={row[0] for row in rows}, deleted_at__lt=horizon
+        ).delete()
@@ -0,0 +1,308 @@
+"""
+Live availability of events over Server-Sent Events: GET /api/events/<uuid>/stream,
+a raw ASGI app mounted in front of Django by config.asgi (not served under WSGI).
+
+Subscribers of an event share a channel of the worker. Schedule writes notify the channel
+once committed, in this worker from EventService.invalidate_event, from the other ones
+through config.cache.bus, which the stream polls while it has subscribers.
+Notifications within settings.SSE_DEBOUNCE seconds are coalesced: the availability is
+read once, and the dates that changed are pushed to every subscriber of the event.
+Connections are coroutines waiting on a queue, idle ones do not hold a thread
+"""
+import asyncio
+import json
+import logging
+from typing import Dict, List, Optional, Set, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from apps.event.models import Event
+from apps.event.services import EventService
+from config.cache import invalidation_bus
+from config.conditional import load_content_version
+
+logger = logging.getLogger("bistime")
+
+# date -> number of available participants per slot, as in EventSerializer
+Availability = Dict[str, str]
+
+
+def load_availability(event_uuid: str) -> Optional[Tuple[int, Availability]]:
+    """
+    (content version, availability) of an event, None once it is deleted
+    """
+    # no request signals around the stream, close the connections past CONN_MAX_AGE
+    close_old_connections()
+    version = load_content_version(Event, "uuid", event_uuid)
+    if version is None:
+        return None
+    event = Event(
+        id=version.pk, uuid=event_uuid, content_version=version.content_version
+    )
+    return version.content_version, EventService.get_availability_str(event) or {}
+
+
+def format_message(event: str, version: int, availability: Dict) -> bytes:
+    data = json.dumps(
+        {"version": version, "availability": availability}, separators=(",", ":")
+    )
+    return f"id: {version}\nevent: {event}\ndata: {data}\n\n".encode()
+
+
+class EventChannel(object):
+    def __init__(self, event_uuid: str):
+        self.uuid = event_uuid
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.loaded = asyncio.Event()
+        self.missing = False
+        self.version = 0
+        self.availability: Availability = {}
+        self.flush: Optional[asyncio.Task] = None
+        # notified while the flush was reading
+        self.dirty = False
+
+    def snapshot(self) -> bytes:
+        return format_message("snapshot", self.version, self.availability)
+
+
+class AvailabilityStream(object):
+    def __init__(self):
+        self.channels: Dict[str, EventChannel] = {}
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.poller: Optional[asyncio.Task] = None
+        self.flushes = 0
+        self.pushed = 0
+        invalidation_bus.subscribe(self.on_invalidation)
+
+    async def subscribe(self, event_uuid: str) -> Optional[Tuple[asyncio.Queue, bytes]]:
+        """
+        Queue of the messages of the event and its current availability,
+        None when the event does not exist
+        """
+        self.loop = asyncio.get_running_loop()
+        channel = self.channels.get(event_uuid)
+        if channel is None:
+            channel = self.channels[event_uuid] = EventChannel(event_uuid)
+            try:
+                loaded = await sync_to_async(load_availability)(event_uuid)
+            except Exception:
+                del self.channels[event_uuid]
+                channel.missing = True
+                channel.loaded.set()
+                raise
+            if loaded is None:
+                del self.channels[event_uuid]
+                channel.missing = True
+            else:
+                channel.version, channel.availability = loaded
+            channel.loaded.set()
+        else:
+            await channel.loaded.wait()
+
+        if channel.missing:
+            return None
+
+        queue = asyncio.Queue(maxsize=settings.SSE_QUEUE_SIZE)
+        channel.subscribers.add(queue)
+        if self.poller is None and invalidation_bus.enabled:
+            self.poller = asyncio.create_task(self.__poll_bus())
+        return queue, channel.snapshot()
+
+    def unsubscribe(self, event_uuid: str, queue: asyncio.Queue) -> None:
+        channel = self.channels.get(event_uuid)
+        if channel is None:
+            return
+        channel.subscribers.discard(queue)
+        if not channel.subscribers:
+            del self.channels[event_uuid]
+            if channel.flush is not None:
+                channel.flush.cancel()
+
+    def notify(self, event_uuid: str) -> None:
+        """
+        Called from any thread once a schedule write of the event committed
+        """
+        loop = self.loop
+        if loop is None or loop.is_closed() or event_uuid not in self.channels:
+            return
+        loop.call_soon_threadsafe(self.__schedule_flush, event_uuid)
+
+    def on_invalidation(self, tags: List[str]) -> None:
+        for tag in tags:
+            if tag.startswith("event:"):
+                self.notify(tag[len("event:") :])
+
+    def stats(self) -> dict:
+        return {
+            "channels": len(self.channels),
+            "subscribers": sum(len(c.subscribers) for c in self.channels.values()),
+            "flushes": self.flushes,
+            "pushed": self.pushed,
+        }
+
+    def __schedule_flush(self, event_uuid: str) -> None:
+        channel = self.channels.get(event_uuid)
+        if channel is None:
+            return
+        if channel.flush is None:
+            channel.flush = asyncio.create_task(self.__flush(channel))
+        else:
+            channel.dirty = True
+
+    async def __flush(self, channel: EventChannel) -> None:
+        try:
+            while True:
+                await asyncio.sleep(settings.SSE_DEBOUNCE)
+                channel.dirty = False
+                loaded = await sync_to_async(load_availability)(channel.uuid)
+                self.flushes += 1
+                if loaded is None:
+                    # deleted, the streams end
+                    self.__push(channel, None)
+                    return
+
+                version, availability = loaded
+                delta = {
+                    date: counts
+                    for date, counts in availability.items()
+                    if channel.availability.get(date) != counts
+                }
+                delta.update(
+                    {
+                        date: None
+                        for date in channel.availability
+                        if date not in availability
+                    }
+                )
+                channel.version, channel.availability = version, availability
+                if delta:
+                    self.__push(channel, format_message("availability", version, delta))
+                if not channel.dirty:
+                    return
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"failed to push the availability of {channel.uuid}: {e}")
+        finally:
+            channel.flush = None
+
+    def __push(self, channel: EventChannel, message: Optional[bytes]) -> None:
+        for queue in list(channel.subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # the deltas of a slow client are replaced with the current state
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(channel.snapshot() if message is not None else None)
+            self.pushed += 1
+
+    async def __poll_bus(self) -> None:
+        try:
+            while self.channels:
+                await sync_to_async(invalidation_bus.maybe_poll)()
+                await asyncio.sleep(settings.CACHE_BUS_POLL_INTERVAL)
+        except Exception as e:
+            logger.warning(f"availability stream stopped polling the cache bus: {e}")
+        finally:
+            self.poller = None
+
+
+availability_stream = AvailabilityStream()
+
+
+def response_headers(scope: dict, content_type: bytes) -> List[Tuple[bytes, bytes]]:
+    headers = [
+        (b"content-type", content_type),
+        (b"cache-control", b"no-cache"),
+        # nginx passes the messages through as they come
+        (b"x-accel-buffering", b"no"),
+    ]
+    origin = dict(scope.get("headers", [])).get(b"origin", b"").decode("latin-1")
+    if origin and origin in settings.CORS_ALLOWED_ORIGINS:
+        headers += [
+            (b"access-control-allow-origin", origin.encode("latin-1")),
+            (b"vary", b"Origin"),
+        ]
+    return headers
+
+
+async def send_error(scope: dict, send, status: int, detail: str) -> None:
+    # body of config.exceptions.custom_exception_handler
+    body = json.dumps({"code": status, "detail": detail}).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": response_headers(scope, b"application/json"),
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+async def wait_disconnect(receive) -> None:
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def availability_stream_app(scope: dict, receive, send, event_uuid: str) -> None:
+    if scope["method"] != "GET":
+        await send_error(scope, send, 405, f'Method "{scope["method"]}" not allowed.')
+        return
+
+    subscription = await availability_stream.subscribe(event_uuid)
+    if subscription is None:
+        await send_error(
+            scope, send, 404, "event with the provided uuid does not exist"
+        )
+        return
+
+    queue, snapshot = subscription
+    disconnect = asyncio.ensure_future(wait_disconnect(receive))
+    message = None
+    try:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": response_headers(scope, b"text/event-stream"),
+            }
+        )
+        await send(
+            {
+                "type": "http.response.body",
+                "body": f"retry: {settings.SSE_RETRY_MS}\n\n".encode() + snapshot,
+                "more_body": True,
+            }
+        )
+        while True:
+            # a getter pending across keepalives is kept, a new one would orphan it
+            # along with the message it takes off the queue
+            if message is None or message.done():
+                message = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait(
+                {message, disconnect},
+                timeout=settings.SSE_HEARTBEAT,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if disconnect in done:
+                return
+            if message not in done:
+                # keeps proxies from closing an idle connection
+                body = b": keepalive\n\n"
+            elif message.result() is None:
+                break
+            else:
+                body = message.result()
+            await send({"type": "http.response.body", "body": body, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+    except OSError:
+        # the client is gone
+        pass
+    finally:
+        for task in (message, disconnect):
+            if task is not None and not task.done():
+                task.cancel()
+        availability_stream.unsubscribe(event_uuid, queue)
@@ -1,6 +1,59 @@
 import pytest
 
+from apps.event.availability import SharedAvailabilityTable, set_availability_table
 from apps.event.models import Event, EventDate, Schedule
+from apps.event.services import EventService
+from config.cache import service_cache
+
+
+@pytest.fixture(autouse=True, scope="function")
+def clear_service_cache():
+    # ids and names of the fixtures are reused across tests
+    service_cache.clear()
+    yield
+
+
+@pytest.fixture(autouse=False, scope="session")
+def availability_table_file(tmp_path_factory):
+    return str(tmp_path_factory.mktemp("shm") / "availability")
+
+
+@pytest.fixture(autouse=True, scope="function")
+def availability_table(availability_table_file):
+    # ids and content versions of the fixtures are reused across tests
+    table = SharedAvailabilityTable(availability_table_file, slots=64, max_dates=31)
+    table.clear()
+    set_availability_table(table)
+    yield table
+    set_availability_table(None)
+    table.close()
+
+
+class RecordingExecutor(object):
+    """
+    Stands in for event_refresh_executor, the refreshes run when the test calls run()
+    """
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, fn, *args):
+        self.submitted.append(args)
+
+    def run(self) -> None:
+        submitted, self.submitted = self.submitted, []
+        for args in submitted:
+            EventService.refresh_after_write(*args)
+
+
+@pytest.fixture(autouse=True, scope="function")
+def refresh_executor(monkeypatch):
+    # the refresh thread would read the database outside of the test transaction
+    executor = RecordingExecutor()
+    monkeypatch.setattr("apps.event.services.event_refresh_executor", executor)
+    EventService._refresh_queued.clear()
+    yield executor
+    EventService._refresh_queued.clear()
 
 
 @pytest.fixture(autouse=False, scope="function")
@@ -0,0 +1,197 @@
+import asyncio
+import json
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from rest_framework.test import APIClient
+
+from apps.event.stream import (
+    availability_stream,
+    availability_stream_app,
+    format_message,
+)
+from config.client_request_for_test import ClientRequest
+
+EVENT_UUID = "dbWUg9io46UXYNsiJrPhfR"
+
+
+@pytest.fixture(autouse=True, scope="function")
+def fast_stream(settings):
+    settings.SSE_DEBOUNCE = 0.05
+    settings.SSE_HEARTBEAT = 5
+    settings.CACHE_BUS_POLL_INTERVAL = 0
+
+
+def messages(sent: list) -> list:
+    """
+    (event, data) of the messages streamed so far, comments and retry excluded
+    """
+    body = b"".join(
+        m.get("body", b"") for m in sent if m["type"] == "http.response.body"
+    )
+    parsed = []
+    for block in body.decode().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n") if ": " in line)
+        if "event" in fields:
+            parsed.append((fields["event"], json.loads(fields["data"])))
+    return parsed
+
+
+class Client(object):
+    """
+    A connection to the stream app, open until disconnect()
+    """
+
+    def __init__(self, path: str = f"/api/events/{EVENT_UUID}/stream", method="GET"):
+        self.scope = {"type": "http", "method": method, "path": path, "headers": []}
+        self.sent = []
+        self.disconnected = asyncio.Event()
+
+    async def receive(self):
+        await self.disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(self, message):
+        self.sent.append(message)
+
+    def start(self) -> asyncio.Task:
+        uuid = self.scope["path"].split("/")[3]
+        return asyncio.ensure_future(
+            availability_stream_app(self.scope, self.receive, self.send, uuid)
+        )
+
+    def disconnect(self) -> None:
+        self.disconnected.set()
+
+    @property
+    def status(self) -> int:
+        return self.sent[0]["status"]
+
+
+def keepalives(sent: list) -> int:
+    return sum(m.get("body") == b": keepalive\n\n" for m in sent)
+
+
+async def until(condition, timeout: float = 2) -> None:
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("timed out")
+
+
+class TestAvailabilityStream(object):
+    def setup_class(cls):
+        cls.request = ClientRequest(APIClient())
+        cls.url = f"/api/events/{EVENT_UUID}/schedules"
+
+    def test_snapshot(self, create_event, create_event_dates, create_schedule):
+        async def scenario():
+            client = Client()
+            task = client.start()
+            await until(lambda: messages(client.sent))
+            client.disconnect()
+            await task
+            return client
+
+        client = async_to_sync(scenario)()
+        assert client.status == 200
+        assert (b"content-type", b"text/event-stream") in client.sent[0]["headers"]
+        assert client.sent[1]["body"].startswith(b"retry: 3000\n\n")
+        [(event, data)] = messages(client.sent)
+        assert event == "snapshot"
+        assert data["availability"]["2023-02-21"] == "1" * 48
+        assert availability_stream.channels == {}
+
+    def test_not_found(self, db):
+        async def scenario():
+            client = Client("/api/events/unknown/stream")
+            await client.start()
+            return client
+
+        client = async_to_sync(scenario)()
+        assert client.status == 404
+        assert json.loads(client.sent[1]["body"])["code"] == 404
+        assert availability_stream.channels == {}
+
+    def test_method_not_allowed(self, db):
+        async def scenario():
+            client = Client(method="POST")
+            await client.start()
+            return client
+
+        assert async_to_sync(scenario)().status == 405
+
+    def test_messages_after_keepalives(
+        self, create_event, create_event_dates, create_schedule, settings
+    ):
+        settings.SSE_HEARTBEAT = 0.02
+
+        async def scenario():
+            client = Client()
+            task = client.start()
+            await until(lambda: messages(client.sent))
+            await until(lambda: keepalives(client.sent) >= 3)
+
+            [queue] = availability_stream.channels[EVENT_UUID].subscribers
+            for version in range(1, 4):
+                queue.put_nowait(format_message("availability", version, {}))
+            await until(lambda: len(messages(client.sent)) == 4)
+
+            client.disconnect()
+            await task
+            return client
+
+        client = async_to_sync(scenario)()
+        assert [data["version"] for _, data in messages(client.sent)[1:]] == [1, 2, 3]
+
+    def test_debounced_fan_out(
+        self,
+        create_event,
+        create_event_dates,
+        create_schedule,
+        django_capture_on_commit_callbacks,
+        settings,
+    ):
+        # longer than the burst
+        settings.SSE_DEBOUNCE = 0.5
+
+        def post_schedules():
+            # a burst of writes, each notifying the stream once committed
+            for name in ["금성", "화성", "목성"]:
+                with django_capture_on_commit_callbacks(execute=True):
+                    res = self.request(
+                        "post",
+                        self.url,
+                        {"name": name, "availability": ["1" * 48] * 3},
+                    )
+                assert res.status_code == 201
+
+        async def scenario():
+            clients = [Client(), Client()]
+            tasks = [client.start() for client in clients]
+            await until(lambda: all(messages(c.sent) for c in clients))
+            assert availability_stream.stats()["subscribers"] == 2
+            flushes = availability_stream.flushes
+
+            await sync_to_async(post_schedules)()
+            await until(lambda: all(len(messages(c.sent)) == 2 for c in clients))
+            await asyncio.sleep(0.6)
+            assert availability_stream.flushes == flushes + 1
+
+            for client in clients:
+                client.disconnect()
+            await asyncio.gather(*tasks)
+            return clients
+
+        for client in async_to_sync(scenario)():
+            (_, snapshot), (event, delta) = messages(client.sent)
+            assert event == "availability"
+            assert delta["version"] > snapshot["version"]
+            # only the dates that changed
+            assert delta["availability"] == {
+                "2023-02-21": "4" * 48,
+                "2023-02-22": "3" * 48,
+                "2023-02-23": "4" * 48,
+            }
+        assert availability_stream.channels == {}
@@ -0,0 +1,108 @@
+import gzip
+import json
+
+import pytest
+from django.test import RequestFactory
+from rest_framework.test import APIClient
+
+from config.compression import accepted_encodings, compressed_cache, negotiate_encoding
+
+
+@pytest.fixture(autouse=True, scope="function")
+def clear_compressed_cache():
+    compressed_cache.clear()
+    yield
+
+
+class TestNegotiation(object):
+    def test_accepted_encodings(self):
+        assert accepted_encodings("gzip, deflate, br") == {
+            "gzip": 1.0,
+            "deflate": 1.0,
+            "br": 1.0,
+        }
+        assert accepted_encodings("br;q=0.5, GZIP ; q=0.8, *;q=0") == {
+            "br": 0.5,
+            "gzip": 0.8,
+            "*": 0.0,
+        }
+        assert accepted_encodings("") == {}
+
+    @pytest.mark.parametrize(
+        "accept_encoding, expected",
+        [
+            ("gzip, deflate", "gzip"),
+            ("br;q=0.5, gzip", "gzip"),
+            ("gzip;q=0", None),
+            ("*", "br"),
+            ("identity", None),
+            ("", None),
+        ],
+    )
+    def test_negotiate_encoding(self, accept_encoding, expected):
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=accept_encoding)
+        assert negotiate_encoding(request, ("br", "gzip")) == expected
+
+
+class TestCompressionMiddleware(object):
+    def setup_class(cls):
+        cls.client = APIClient()
+        cls.url = "/api/events/dbWUg9io46UXYNsiJrPhfR"
+        cls.accept_header = "application/json; version=1;"
+
+    def get(self, path: str, **headers):
+        res = self.client.get(
+            self.url + path, HTTP_ACCEPT=self.accept_header, **headers
+        )
+        assert res.status_code == 200
+        return res
+
+    def test_compresses_above_threshold(
+        self, create_event, create_event_dates, create_schedule, settings
+    ):
+        settings.COMPRESSION_MIN_SIZE = 200
+        identity = self.get("/schedules")
+        res = self.get("/schedules", HTTP_ACCEPT_ENCODING="gzip, deflate")
+
+        assert "Content-Encoding" not in identity
+        assert res["Content-Encoding"] == "gzip"
+        assert "Accept-Encoding" in res["Vary"]
+        assert int(res["Content-Length"]) == len(res.content) < len(identity.content)
+        assert json.loads(gzip.decompress(res.content)) == json.loads(identity.content)
+
+        res = self.get("/schedules", HTTP_ACCEPT_ENCODING="gzip;q=0")
+        assert "Content-Encoding" not in res
+
+        settings.COMPRESSION_MIN_SIZE = len(identity.content) + 1
+        res = self.get("/schedules", HTTP_ACCEPT_ENCODING="gzip")
+        assert "Content-Encoding" not in res
+
+    def test_caches_variants_of_versioned_responses(
+        self, create_event, create_event_dates, create_schedule, settings
+    ):
+        settings.COMPRESSION_MIN_SIZE = 0
+        settings.SNAPSHOT_TTL = 0
+        identity = self.get("")
+
+        first = self.get("", HTTP_ACCEPT_ENCODING="gzip")
+        hits = compressed_cache.hits
+        second = self.get("", HTTP_ACCEPT_ENCODING="gzip")
+
+        assert compressed_cache.hits == hits + 1
+        assert second.content == first.content
+        assert second["ETag"] == f"W/{identity['ETag']}"
+        assert gzip.decompress(second.content) == identity.content
+
+        # no validator, compressed every time
+        self.get("/schedules", HTTP_ACCEPT_ENCODING="gzip")
+        self.get("/schedules", HTTP_ACCEPT_ENCODING="gzip")
+        assert compressed_cache.hits == hits + 1
+
+    def test_brotli(self, create_event, create_event_dates, create_schedule, settings):
+        brotli = pytest.importorskip("brotli")
+        settings.COMPRESSION_MIN_SIZE = 0
+        identity = self.get("/schedules")
+        res = self.get("/schedules", HTTP_ACCEPT_ENCODING="gzip, deflate, br")
+
+        assert res["Content-Encoding"] == "br"
+        assert brotli.decompress(res.content) == identity.content
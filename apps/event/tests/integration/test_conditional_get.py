@@ -0,0 +1,60 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from config.client_request_for_test import ClientRequest
+
+
+def app_queries(captured) -> list:
+    # silk (debug settings) records requests, in savepoints of the same database
+    return [
+        q["sql"]
+        for q in captured.captured_queries
+        if q["sql"].startswith(("SELECT", "INSERT", "UPDATE", "DELETE"))
+        and "silk_" not in q["sql"]
+    ]
+
+
+class TestEventConditionalGet(object):
+    def setup_class(cls):
+        cls.client = APIClient()
+        cls.request = ClientRequest(cls.client)
+        cls.url = "/api/events/dbWUg9io46UXYNsiJrPhfR"
+        cls.accept_header = "application/json; version=1;"
+
+    def conditional_get(self, **headers):
+        return self.client.get(self.url, HTTP_ACCEPT=self.accept_header, **headers)
+
+    def test_not_modified_costs_one_lookup(self, create_event, create_event_dates):
+        res = self.request("get", self.url)
+        assert res.status_code == 200
+        etag = res["ETag"]
+        assert etag.startswith('"') and res.has_header("Last-Modified")
+        assert res["Cache-Control"] == "public, no-cache"
+        assert res["Surrogate-Key"] == "event-dbWUg9io46UXYNsiJrPhfR"
+        assert res.has_header("X-Accel-Expires")
+
+        with CaptureQueriesContext(connection) as captured:
+            res = self.conditional_get(HTTP_IF_NONE_MATCH=etag)
+        assert res.status_code == 304
+        assert res["ETag"] == etag
+        assert res["Surrogate-Key"] == "event-dbWUg9io46UXYNsiJrPhfR"
+        assert len(app_queries(captured)) == 1
+
+        res = self.conditional_get(HTTP_IF_MODIFIED_SINCE=res["Last-Modified"])
+        assert res.status_code == 304
+
+    def test_schedule_change_changes_etag(self, create_event, create_event_dates):
+        etag = self.request("get", self.url)["ETag"]
+
+        res = self.request(
+            "post",
+            self.url + "/schedules",
+            {"name": "지구", "availability": ["1" * 48] * 3},
+        )
+        assert res.status_code == 201
+
+        res = self.conditional_get(HTTP_IF_NONE_MATCH=etag)
+        assert res.status_code == 200
+        assert res["ETag"] != etag
+        assert res.data["availability"]
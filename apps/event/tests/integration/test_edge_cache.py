@@ -0,0 +1,113 @@
+import shutil
+import socket
+import subprocess
+import time
+from pathlib import Path
+
+import pytest
+import requests
+
+NGINX_CONFIGS = Path(__file__).resolve().parents[4] / "infra" / "nginx" / "configs"
+EVENT_PATH = "/api/events/dbWUg9io46UXYNsiJrPhfR"
+HEADERS = {"Accept": "application/json; version=1"}
+
+pytestmark = pytest.mark.skipif(
+    shutil.which("nginx") is None, reason="nginx is not installed"
+)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture(autouse=False, scope="function")
+def edge_nginx(tmp_path, live_server, settings):
+    """
+    nginx with the cache config of infra/nginx in front of the live server,
+    yields the public and the internal (refresh) base urls
+    """
+    public_port, internal_port = free_port(), free_port()
+    upstream = live_server.url.replace("http://", "")
+
+    cache_conf = (NGINX_CONFIGS / "conf.d" / "cache.conf").read_text()
+    (tmp_path / "cache.conf").write_text(
+        cache_conf.replace("/var/cache/nginx/api", str(tmp_path / "cache"))
+    )
+    snippet = NGINX_CONFIGS / "snippets" / "api_cache.conf"
+    (tmp_path / "nginx.conf").write_text(
+        f"""
+pid {tmp_path}/nginx.pid;
+error_log {tmp_path}/error.log warn;
+events {{ worker_connections 64; }}
+http {{
+    access_log off;
+    include {tmp_path}/cache.conf;
+    upstream api_server {{ server {upstream}; }}
+    server {{
+        listen 127.0.0.1:{public_port};
+        location /api/ {{ include {snippet}; }}
+    }}
+    server {{
+        listen 127.0.0.1:{internal_port};
+        location /api/ {{
+            include {snippet};
+            proxy_cache_bypass 1;
+        }}
+    }}
+}}
+"""
+    )
+
+    process = subprocess.Popen(
+        ["nginx", "-p", str(tmp_path), "-c", "nginx.conf", "-g", "daemon off;"]
+    )
+    public_url = f"http://127.0.0.1:{public_port}"
+    for _ in range(50):
+        try:
+            requests.get(public_url, timeout=0.2)
+            break
+        except requests.ConnectionError:
+            time.sleep(0.1)
+
+    settings.EDGE_CACHE_URL = f"http://127.0.0.1:{internal_port}"
+    settings.EDGE_CACHE_TTL = 30
+    yield public_url
+
+    process.terminate()
+    process.wait(timeout=5)
+
+
+class TestEdgeCache(object):
+    def test_hit_rate_and_purge(
+        self, transactional_db, create_event, create_event_dates, edge_nginx
+    ):
+        statuses = []
+        for _ in range(20):
+            res = requests.get(edge_nginx + EVENT_PATH, headers=HEADERS)
+            assert res.status_code == 200
+            assert "Surrogate-Key" not in res.headers
+            statuses.append(res.headers.get("X-Cache-Status"))
+
+        before = res.json()["availability"]
+        hit_rate = statuses.count("HIT") / len(statuses)
+        print(f"edge cache hit rate: {hit_rate:.0%}")
+        assert statuses[0] == "MISS"
+        assert hit_rate >= 0.9
+
+        res = requests.post(
+            edge_nginx + EVENT_PATH + "/schedules",
+            json={"name": "지구", "availability": ["1" * 48] * 3},
+            headers=HEADERS,
+        )
+        assert res.status_code == 201
+
+        # the purge refreshes the cached event in the background
+        for _ in range(50):
+            res = requests.get(edge_nginx + EVENT_PATH, headers=HEADERS)
+            if res.json()["availability"] != before:
+                break
+            time.sleep(0.1)
+        assert res.json()["availability"] != before
+        assert res.headers.get("X-Cache-Status") == "HIT"
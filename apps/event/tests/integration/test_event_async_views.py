@@ -0,0 +1,97 @@
+import json
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncRequestFactory
+from rest_framework.test import APIClient
+
+from apps.event.async_views import (
+    EventAvailabilityAsyncView,
+    EventDetailAsyncView,
+    ScheduleListAsyncView,
+)
+from apps.event.models import Event
+from config.client_request_for_test import ClientRequest
+
+
+class TestEventAsyncViews(object):
+    def setup_class(cls):
+        cls.factory = AsyncRequestFactory()
+        cls.request = ClientRequest(APIClient())
+        cls.uuid = "dbWUg9io46UXYNsiJrPhfR"
+        cls.url = f"/api/events/{cls.uuid}"
+
+    def call(
+        self, view_class, method: str, path: str, data=None, headers=None, uuid=None
+    ):
+        if method == "get":
+            request = self.factory.get(path)
+        else:
+            request = getattr(self.factory, method)(
+                path,
+                data=json.dumps(data or {}),
+                content_type="application/json",
+            )
+        for name, value in (headers or {}).items():
+            request.META[name] = value
+        response = async_to_sync(view_class.as_view())(request, uuid=uuid or self.uuid)
+        if hasattr(response, "render"):
+            response.render()
+        return response
+
+    def sync_json(self, path: str):
+        res = self.request("get", path)
+        assert res.status_code == 200
+        return res.json()
+
+    def test_detail(self, create_event, create_event_dates, create_schedule):
+        expected = self.sync_json(self.url)
+
+        # rendered live and stored, then served from the snapshot
+        first = self.call(EventDetailAsyncView, "get", self.url)
+        second = self.call(EventDetailAsyncView, "get", self.url)
+        assert first.status_code == second.status_code == 200
+        assert json.loads(first.content) == json.loads(second.content) == expected
+        assert first["Surrogate-Key"] == f"event-{self.uuid}"
+
+        res = self.call(
+            EventDetailAsyncView,
+            "get",
+            self.url,
+            headers={"HTTP_IF_NONE_MATCH": first["ETag"]},
+        )
+        assert res.status_code == 304
+
+        res = self.call(EventDetailAsyncView, "get", self.url + "?fields=uuid")
+        assert json.loads(res.content) == {"uuid": self.uuid}
+
+    def test_detail_not_found(self, db):
+        res = self.call(
+            EventDetailAsyncView, "get", "/api/events/unknown", uuid="unknown"
+        )
+        assert res.status_code == 404
+        assert json.loads(res.content)["code"] == 404
+
+    def test_writes_use_the_drf_view(self, create_event, create_event_dates):
+        res = self.call(EventDetailAsyncView, "patch", self.url, {"endTime": "13:00"})
+        assert res.status_code == 200
+        assert Event.objects.get(uuid=self.uuid).end_time == "13:00"
+
+    def test_availability(self, create_event, create_event_dates, create_schedule):
+        expected = self.sync_json(self.url + "/availability")
+        res = self.call(EventAvailabilityAsyncView, "get", self.url + "/availability")
+        assert res.status_code == 200
+        assert json.loads(res.content) == expected
+
+    def test_schedules(self, create_event, create_event_dates, create_schedule):
+        url = self.url + "/schedules"
+        res = self.call(ScheduleListAsyncView, "get", url)
+        assert json.loads(res.content) == self.sync_json(url)
+
+        res = self.call(ScheduleListAsyncView, "get", url + "?name=지구2")
+        assert [s["id"] for s in json.loads(res.content)] == [998]
+
+        # delta syncs are served by the DRF view
+        res = self.call(ScheduleListAsyncView, "get", url + "?since=0")
+        assert res.status_code == 200
+        assert json.loads(res.content)["reset"] is True
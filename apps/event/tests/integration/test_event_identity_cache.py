@@ -0,0 +1,73 @@
+import re
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.event.services import EventService
+from config.client_request_for_test import ClientRequest
+from config.exceptions import InstanceNotFound
+
+EVENT_SELECT = re.compile(r"^SELECT .* FROM [`\"]event[`\"] ")
+EVENT_UPDATE = re.compile(r"^UPDATE [`\"]event[`\"] ")
+
+
+def app_queries(captured) -> list:
+    # silk (debug settings) records requests, in savepoints of the same database
+    return [
+        q["sql"]
+        for q in captured.captured_queries
+        if q["sql"].startswith(("SELECT", "INSERT", "UPDATE", "DELETE"))
+        and "silk_" not in q["sql"]
+    ]
+
+
+class TestEventIdentityCache(object):
+    def setup_class(cls):
+        cls.client = APIClient()
+        cls.request = ClientRequest(cls.client)
+        cls.uuid = "dbWUg9io46UXYNsiJrPhfR"
+        cls.url = f"/api/events/{cls.uuid}"
+
+    def post_schedule(self, name: str, capture_on_commit_callbacks) -> list:
+        # with the callbacks of the write, as once the request commits in production
+        with CaptureQueriesContext(connection) as captured:
+            with capture_on_commit_callbacks(execute=True):
+                res = self.request(
+                    "post",
+                    self.url + "/schedules",
+                    {"name": name, "availability": ["1" * 48] * 3},
+                )
+        assert res.status_code == 201
+        return app_queries(captured)
+
+    def test_schedule_write_skips_event_query(
+        self, create_event, create_event_dates, django_capture_on_commit_callbacks
+    ):
+        cold = self.post_schedule("지구", django_capture_on_commit_callbacks)
+        warm = self.post_schedule("지구2", django_capture_on_commit_callbacks)
+
+        assert len(warm) == len(cold) - 1
+        assert len([q for q in cold if EVENT_SELECT.match(q)]) == 1
+        assert not [q for q in warm if EVENT_SELECT.match(q)]
+        # the content version is bumped by primary key
+        [bump] = [q for q in warm if EVENT_UPDATE.match(q)]
+        assert re.search(r"[`\"]event[`\"]\.[`\"]id[`\"] = 999", bump)
+
+    def test_event_update_invalidates(self, create_event):
+        assert EventService.get_event_identity(self.uuid).start_time == "09:00"
+
+        res = self.request("patch", self.url, {"startTime": "10:00"})
+        assert res.status_code == 200
+
+        assert EventService.get_event_identity(self.uuid).start_time == "10:00"
+
+    def test_event_deletion_invalidates(self, create_event):
+        EventService.get_event_by_uuid(self.uuid)
+
+        res = self.request("del", self.url)
+        assert res.status_code == 204
+
+        with pytest.raises(InstanceNotFound):
+            EventService.get_event_by_uuid(self.uuid)
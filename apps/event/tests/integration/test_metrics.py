@@ -0,0 +1,41 @@
+from prometheus_client import REGISTRY
+from rest_framework.test import APIClient
+
+from config.client_request_for_test import ClientRequest
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class TestMetrics(object):
+    def setup_class(cls):
+        cls.client = APIClient()
+        cls.request = ClientRequest(cls.client)
+
+    def test_request_latency_and_queries_by_url_name(self, create_event):
+        labels = {"method": "GET", "view": "event-detail", "status": "200"}
+        requests_before = sample("bistime_request_duration_seconds_count", **labels)
+        queries_before = sample("bistime_request_db_queries_sum", view="event-detail")
+
+        res = self.request("get", "/api/events/89PKcffHuwBA9uCnGWraNZ")
+        assert res.status_code == 200
+
+        assert (
+            sample("bistime_request_duration_seconds_count", **labels)
+            == requests_before + 1
+        )
+        assert (
+            sample("bistime_request_db_queries_sum", view="event-detail")
+            > queries_before
+        )
+
+    def test_metrics_endpoint(self, create_event):
+        self.request("get", "/api/events/89PKcffHuwBA9uCnGWraNZ")
+
+        res = self.client.get("/metrics")
+        assert res.status_code == 200
+        assert res["Content-Type"].startswith("text/plain")
+        body = res.content.decode()
+        assert "bistime_request_duration_seconds_bucket" in body
+        assert 'view="event-detail"' in body
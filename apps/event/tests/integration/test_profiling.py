@@ -0,0 +1,57 @@
+import pytest
+from rest_framework.test import APIClient
+
+from config.profiling import profile_buffer
+
+
+@pytest.fixture(autouse=False, scope="function")
+def profiling(settings):
+    settings.INTERNAL_STATS_TOKEN = "stats-token"
+    settings.PROFILER_SAMPLE_RATE = 0
+    profile_buffer.clear()
+    yield
+    profile_buffer.clear()
+
+
+class TestSampledProfiling(object):
+    def setup_class(cls):
+        cls.client = APIClient()
+        cls.accept_header = "application/json; version=1;"
+
+    def get(self, url: str, **headers):
+        return self.client.get(url, HTTP_ACCEPT=self.accept_header, **headers)
+
+    def test_unsampled_request_is_not_recorded(self, create_event, profiling):
+        res = self.get("/api/events/89PKcffHuwBA9uCnGWraNZ")
+        assert res.status_code == 200
+        assert profile_buffer.list() == []
+
+    def test_profile_header_records_request(self, create_event, profiling):
+        res = self.get(
+            "/api/events/89PKcffHuwBA9uCnGWraNZ", HTTP_X_PROFILE="stats-token"
+        )
+        assert res.status_code == 200
+
+        profiles = profile_buffer.list()
+        assert len(profiles) == 1
+        profile = profiles[0]
+        assert profile.path == "/api/events/89PKcffHuwBA9uCnGWraNZ"
+        assert profile.status_code == 200
+        assert profile.query_count > 0
+        assert profile.stats is not None
+
+        res = self.get("/api/internal/profiles", HTTP_X_INTERNAL_TOKEN="stats-token")
+        assert res.status_code == 200
+        assert [p["id"] for p in res.json()["profiles"]] == [profile.id]
+
+        res = self.get(
+            f"/api/internal/profiles/{profile.id}", HTTP_X_INTERNAL_TOKEN="stats-token"
+        )
+        assert res.status_code == 200
+        assert len(res.json()["queries"]) == profile.query_count
+
+    @pytest.mark.django_db
+    def test_profiles_require_internal_token(self, profiling):
+        assert self.get("/api/internal/profiles").status_code == 404
+        res = self.get("/api/internal/profiles", HTTP_X_INTERNAL_TOKEN="wrong")
+        assert res.status_code == 404
@@ -0,0 +1,141 @@
+import datetime
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.event.models import Schedule, ScheduleTombstone
+from apps.event.services import ScheduleService
+from config.client_request_for_test import ClientRequest
+
+
+def app_queries(captured) -> list:
+    # silk (debug settings) records requests, in savepoints of the same database
+    return [
+        q["sql"]
+        for q in captured.captured_queries
+        if q["sql"].startswith(("SELECT", "INSERT", "UPDATE", "DELETE"))
+        and "silk_" not in q["sql"]
+    ]
+
+
+@pytest.fixture(autouse=True, scope="function")
+def no_commit_window(settings):
+    # the requests of a test run within the window
+    settings.SCHEDULE_SYNC_COMMIT_WINDOW = 0
+
+
+class TestScheduleSync(object):
+    def setup_class(cls):
+        cls.client = APIClient()
+        cls.request = ClientRequest(cls.client)
+        cls.url = "/api/events/dbWUg9io46UXYNsiJrPhfR/schedules"
+
+    def sync(self, cursor: str, name: str = None) -> dict:
+        url = f"{self.url}?since={cursor}"
+        if name is not None:
+            url += f"&name={name}"
+        res = self.request("get", url)
+        assert res.status_code == 200
+        return res.data
+
+    def post_schedule(self, name: str) -> None:
+        res = self.request(
+            "post", self.url, {"name": name, "availability": ["1" * 48] * 3}
+        )
+        assert res.status_code == 201
+
+    def test_reset(self, create_event, create_event_dates, create_schedule):
+        data = self.sync("0")
+        assert data["reset"] is True
+        assert [s["id"] for s in data["schedules"]] == [998, 999, 997]
+        assert data["deleted"] == []
+        assert int(data["cursor"]) > 0
+
+    def test_changes_since_cursor(
+        self, create_event, create_event_dates, create_schedule
+    ):
+        cursor = self.sync("0")["cursor"]
+        data = self.sync(cursor)
+        assert data["reset"] is False
+        assert data["schedules"] == [] and data["deleted"] == []
+
+        self.post_schedule("금성")
+        data = self.sync(data["cursor"])
+        assert [(s["name"], s["date"]) for s in data["schedules"]] == [
+            ("금성", "2023-02-21"),
+            ("금성", "2023-02-22"),
+            ("금성", "2023-02-23"),
+        ]
+
+        # updates of existing schedules
+        self.post_schedule("지구")
+        data = self.sync(data["cursor"])
+        assert {s["name"] for s in data["schedules"]} == {"지구"}
+        assert {s["id"] for s in data["schedules"]} >= {999}
+
+        data = self.sync(data["cursor"], name="금성")
+        assert data["schedules"] == []
+
+    def test_deletions(self, create_event, create_event_dates, create_schedule):
+        cursor = self.sync("0")["cursor"]
+
+        res = self.request("del", f"{self.url}/지구2")
+        assert res.status_code == 204
+        data = self.sync(cursor)
+        assert data["schedules"] == []
+        assert [(d["id"], d["name"], d["date"]) for d in data["deleted"]] == [
+            (998, "지구2", "2023-02-21")
+        ]
+
+        # schedules are deleted with their date
+        res = self.request("del", "/api/events/dates/997")
+        assert res.status_code == 204
+        data = self.sync(data["cursor"])
+        assert [(d["id"], d["name"]) for d in data["deleted"]] == [(997, "지구3")]
+        assert not Schedule.objects.filter(id__in=[997, 998]).exists()
+
+    def test_expired_tombstones(
+        self, create_event, create_event_dates, create_schedule, settings
+    ):
+        self.request("del", f"{self.url}/지구2")
+        expired = timezone.now() - datetime.timedelta(
+            seconds=settings.SCHEDULE_TOMBSTONE_RETENTION + 1
+        )
+        ScheduleTombstone.objects.update(deleted_at=expired)
+
+        self.request("del", f"{self.url}/지구3")
+        assert list(
+            ScheduleTombstone.objects.values_list("schedule_id", flat=True)
+        ) == [997]
+
+        # older than the tombstones, every schedule again
+        cursor = ScheduleTombstone.objects.get().deleted_at - datetime.timedelta(
+            seconds=settings.SCHEDULE_TOMBSTONE_RETENTION + 1
+        )
+        data = self.sync(ScheduleService.encode_cursor(cursor))
+        assert data["reset"] is True
+        assert [s["id"] for s in data["schedules"]] == [999]
+
+    def test_poll_cost_does_not_grow_with_the_event(
+        self, create_event, create_event_dates
+    ):
+        for i in range(30):
+            self.post_schedule(f"member{i}")
+        cursor = self.sync("0")["cursor"]
+        self.post_schedule("late")
+
+        with CaptureQueriesContext(connection) as captured:
+            data = self.sync(cursor)
+        queries = app_queries(captured)
+
+        assert len(data["schedules"]) == 3
+        # event identity (cached), schedules and tombstones since the cursor
+        assert len(queries) == 2
+        assert all("updated_at" in q or "deleted_at" in q for q in queries)
+
+    def test_invalid_cursor(self, create_event):
+        res = self.request("get", f"{self.url}?since=yesterday")
+        assert res.status_code == 400
@@ -0,0 +1,64 @@
+import threading
+import time
+
+import pytest
+from django.db import connection
+
+from apps.event.models import Event
+from apps.event.services import EventService
+
+CONCURRENCY = [1, 4, 16, 32]
+
+
+def run_concurrent_reads(concurrency: int) -> int:
+    """
+    concurrency threads reading the availability of a cold event at the same moment,
+    returns the number of queries they made
+    """
+    barrier = threading.Barrier(concurrency)
+    queries, lock = [], threading.Lock()
+
+    def count(execute, sql, params, many, context):
+        with lock:
+            queries.append(sql)
+        return execute(sql, params, many, context)
+
+    def read():
+        event = Event.objects.get(id=999)
+        with connection.execute_wrapper(count):
+            barrier.wait()
+            EventService.get_availability_str(event)
+        connection.close()
+
+    threads = [threading.Thread(target=read) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    return len(queries)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_availability_queries_flat_under_concurrency(
+    create_event, create_event_dates, create_schedule, availability_table, monkeypatch
+):
+    calculate = EventService.calculate_availability
+
+    def slow_calculate(event):
+        # a hot event with many schedules, long enough for the readers to pile up
+        time.sleep(0.05)
+        return calculate(event)
+
+    monkeypatch.setattr(EventService, "calculate_availability", slow_calculate)
+
+    results = {}
+    for concurrency in CONCURRENCY:
+        availability_table.clear()
+        results[concurrency] = run_concurrent_reads(concurrency)
+
+    print(
+        "availability queries by concurrency: "
+        + ", ".join(f"{c}: {q}" for c, q in results.items())
+    )
+    assert len(set(results.values())) == 1
+    assert EventService.availability_flight.in_flight() == 0
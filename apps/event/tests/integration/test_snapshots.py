@@ -0,0 +1,107 @@
+import gzip
+import json
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from config.client_request_for_test import ClientRequest
+
+
+def app_queries(captured) -> list:
+    # silk (debug settings) records requests, in savepoints of the same database
+    return [
+        q["sql"]
+        for q in captured.captured_queries
+        if q["sql"].startswith(("SELECT", "INSERT", "UPDATE", "DELETE"))
+        and "silk_" not in q["sql"]
+    ]
+
+
+class TestEventSnapshots(object):
+    def setup_class(cls):
+        cls.client = APIClient()
+        cls.request = ClientRequest(cls.client)
+        cls.url = "/api/events/dbWUg9io46UXYNsiJrPhfR"
+        cls.accept_header = "application/json; version=1;"
+
+    def get(self, **headers):
+        with CaptureQueriesContext(connection) as captured:
+            res = self.client.get(self.url, HTTP_ACCEPT=self.accept_header, **headers)
+        assert res.status_code == 200
+        return res, app_queries(captured)
+
+    def test_hit_serves_the_live_bytes(self, create_event, create_event_dates):
+        live, live_queries = self.get()
+        snapshot, snapshot_queries = self.get()
+
+        assert hasattr(live, "data") and not hasattr(snapshot, "data")
+        assert snapshot.content == live.content
+        assert snapshot["Content-Type"] == live["Content-Type"]
+        assert snapshot["ETag"] == live["ETag"]
+        # the content version lookup only
+        assert len(snapshot_queries) == 1 < len(live_queries)
+
+    def test_gzip_variant(
+        self, create_event, create_event_dates, create_schedule, settings
+    ):
+        settings.COMPRESSION_MIN_SIZE = 0
+        identity, _ = self.get()
+        res, _ = self.get(HTTP_ACCEPT_ENCODING="gzip, deflate, br")
+
+        assert res["Content-Encoding"] == "gzip"
+        assert "Accept-Encoding" in res["Vary"]
+        assert res["ETag"] == f"W/{identity['ETag']}"
+        assert gzip.decompress(res.content) == identity.content
+
+        res = self.client.get(
+            self.url,
+            HTTP_ACCEPT=self.accept_header,
+            HTTP_ACCEPT_ENCODING="gzip",
+            HTTP_IF_NONE_MATCH=res["ETag"],
+        )
+        assert res.status_code == 304
+
+    def test_writes_render_the_snapshot(
+        self,
+        create_event,
+        create_event_dates,
+        django_capture_on_commit_callbacks,
+        refresh_executor,
+    ):
+        before, _ = self.get()
+
+        for _ in range(2):
+            with django_capture_on_commit_callbacks(execute=True):
+                res = self.request(
+                    "post",
+                    self.url + "/schedules",
+                    {"name": "지구", "availability": ["1" * 48] * 3},
+                )
+        # a burst of writes is refreshed once, off the request thread
+        assert refresh_executor.submitted == [("dbWUg9io46UXYNsiJrPhfR",)]
+        refresh_executor.run()
+
+        res, queries = self.get()
+        assert not hasattr(res, "data")
+        assert len(queries) == 1
+        assert res["ETag"] != before["ETag"]
+        assert (
+            json.loads(res.content)["availability"]
+            != json.loads(before.content)["availability"]
+        )
+
+        with django_capture_on_commit_callbacks(execute=True):
+            res = self.request("patch", self.url, {"title": "renamed"})
+        assert res.status_code == 200
+        refresh_executor.run()
+
+        res, queries = self.get()
+        assert not hasattr(res, "data") and len(queries) == 1
+        assert json.loads(res.content)["title"] == "renamed"
+
+    def test_query_string_is_rendered_live(self, create_event, create_event_dates):
+        self.get()
+        res = self.client.get(self.url + "?x=1", HTTP_ACCEPT=self.accept_header)
+        assert res.status_code == 200
+        assert res.data["uuid"] == "dbWUg9io46UXYNsiJrPhfR"
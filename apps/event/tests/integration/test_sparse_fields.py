@@ -0,0 +1,105 @@
+import pytest
+from rest_framework.test import APIClient
+
+from apps.event.models import Event
+from apps.event.services import EventService
+from config.client_request_for_test import ClientRequest
+
+
+@pytest.fixture(autouse=False, scope="function")
+def no_availability(monkeypatch):
+    def fail(event):
+        raise AssertionError("availability should not be computed")
+
+    monkeypatch.setattr(EventService, "get_availability_str", staticmethod(fail))
+
+
+class TestSparseFieldsets(object):
+    def setup_class(cls):
+        cls.client = APIClient()
+        cls.request = ClientRequest(cls.client)
+        cls.url = "/api/events/dbWUg9io46UXYNsiJrPhfR"
+
+    def test_omit(self, create_event, create_event_dates, no_availability):
+        res = self.request("get", self.url + "?omit=availability")
+        assert res.status_code == 200
+        assert "availability" not in res.data
+        assert res.data["title"] == "test event 1"
+
+        res = self.request("get", "/api/events?omit=availability,createdAt")
+        assert res.status_code == 200
+        assert res.data["count"] == 2
+        for event in res.data["results"]:
+            assert set(event) == {
+                "id",
+                "uuid",
+                "associated_team",
+                "title",
+                "start_time",
+                "end_time",
+                "updated_at",
+            }
+
+    def test_fields(self, create_event, create_event_dates, no_availability):
+        res = self.request("get", self.url + "?fields=uuid,startTime,end_time")
+        assert res.status_code == 200
+        assert res.json() == {
+            "uuid": "dbWUg9io46UXYNsiJrPhfR",
+            "startTime": "09:00",
+            "endTime": "21:00",
+        }
+
+    def test_unknown_field(self, create_event):
+        res = self.request("get", self.url + "?fields=title,secret")
+        assert res.status_code == 400
+        assert res.data["detail"] == "unknown fields: secret"
+
+    def test_writes_keep_input_fields(self, db, no_availability):
+        res = self.request(
+            "post",
+            "/api/events?fields=uuid",
+            {"title": "sparse", "start_time": "10:00", "end_time": "12:00"},
+        )
+        assert res.status_code == 201
+        assert set(res.data) == {"uuid"}
+
+        event = Event.objects.get(uuid=res.data["uuid"])
+        assert (event.title, event.start_time, event.end_time) == (
+            "sparse",
+            "10:00",
+            "12:00",
+        )
+
+        res = self.request(
+            "patch", f"/api/events/{event.uuid}?omit=availability", {"endTime": "13:00"}
+        )
+        assert res.status_code == 200
+        assert "availability" not in res.data
+        assert res.data["end_time"] == "13:00"
+
+
+class TestEventAvailabilityView(object):
+    def setup_class(cls):
+        cls.client = APIClient()
+        cls.request = ClientRequest(cls.client)
+        cls.url = "/api/events/dbWUg9io46UXYNsiJrPhfR"
+
+    def test_availability(self, create_event, create_event_dates, create_schedule):
+        detail = self.request("get", self.url)
+        res = self.request("get", self.url + "/availability")
+
+        assert res.status_code == 200
+        assert res.json() == {"availability": detail.json()["availability"]}
+        assert res.json()["availability"]["2023-02-21"] == "1" * 48
+        assert res["ETag"] == detail["ETag"]
+
+        res = self.client.get(
+            self.url + "/availability",
+            HTTP_ACCEPT="application/json; version=1;",
+            HTTP_IF_NONE_MATCH=res["ETag"],
+        )
+        assert res.status_code == 304
+
+    def test_not_found(self, db):
+        res = self.request("get", "/api/events/unknown/availability")
+        assert res.status_code == 404
@@ -0,0 +1,203 @@
+import multiprocessing
+import threading
+import time
+
+import numpy as np
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.event.availability import (
+    EventAvailability,
+    SharedAvailabilityTable,
+    get_availability_table,
+    set_availability_table,
+)
+from apps.event.models import Event
+from apps.event.services import EventService
+
+DATES = [738572, 738573, 738574]
+
+
+def availability(value: int, dates=DATES) -> EventAvailability:
+    return EventAvailability(
+        list(dates), np.full((len(dates), 48), value, dtype=np.int64)
+    )
+
+
+def write_continuously(path: str, stop) -> None:
+    table = SharedAvailabilityTable(path, slots=64, max_dates=31)
+    value = 0
+    while not stop.is_set():
+        value = (value + 1) % 1000
+        table.put(999, value, availability(value))
+
+
+class TestSharedAvailabilityTable:
+    """
+    unit tests for the availability table shared by the workers of a host
+    """
+
+    def test_round_trip(self, availability_table):
+        availability_table.put(999, 3, availability(2))
+
+        result = availability_table.get(999, 3)
+        assert result.dates == DATES
+        assert result.counters.tolist() == [[2] * 48] * 3
+
+    def test_other_version_misses(self, availability_table):
+        availability_table.put(999, 3, availability(2))
+
+        assert availability_table.get(999, 4) is None
+        assert availability_table.get(998, 3) is None
+
+    def test_newer_version_is_kept(self, availability_table):
+        availability_table.put(999, 4, availability(4))
+
+        assert not availability_table.put(999, 3, availability(3))
+        assert availability_table.get(999, 4).counters[0][0] == 4
+
+    def test_too_many_dates_are_not_stored(self, availability_table):
+        assert not availability_table.put(999, 1, availability(1, range(40)))
+        assert availability_table.get(999, 1) is None
+
+    def test_shared_between_workers(self, availability_table):
+        other_worker = SharedAvailabilityTable(
+            availability_table.path, slots=64, max_dates=31
+        )
+        availability_table.put(999, 1, availability(5))
+
+        assert other_worker.get(999, 1).counters[2][47] == 5
+        other_worker.close()
+
+    def test_other_layout_is_not_resized(self, availability_table):
+        availability_table.put(999, 1, availability(5))
+
+        with pytest.raises(OSError):
+            SharedAvailabilityTable(availability_table.path, slots=128, max_dates=31)
+
+        assert availability_table.get(999, 1).counters[0][0] == 5
+
+    def test_file_per_layout(self, tmp_path, settings):
+        settings.AVAILABILITY_SHM_PATH = str(tmp_path / "availability")
+        settings.AVAILABILITY_SHM_SLOTS, settings.AVAILABILITY_SHM_MAX_DATES = 64, 31
+        set_availability_table(None)
+        try:
+            table = get_availability_table()
+            assert table.path == str(tmp_path / "availability-64x31")
+
+            # a worker of another deploy
+            settings.AVAILABILITY_SHM_SLOTS = 32
+            set_availability_table(None)
+            other = get_availability_table()
+            assert other.path == str(tmp_path / "availability-32x31")
+            table.close()
+            other.close()
+
+            # a file of another format is left as is, the worker reads without a table
+            settings.AVAILABILITY_SHM_SLOTS = 64
+            (tmp_path / "availability-64x31").write_bytes(b"other")
+            set_availability_table(None)
+            assert get_availability_table() is None
+            assert (tmp_path / "availability-64x31").read_bytes() == b"other"
+            assert settings.AVAILABILITY_SHM_PATH == str(tmp_path / "availability")
+        finally:
+            set_availability_table(None)
+
+    def test_no_torn_reads_under_concurrent_writes(self, availability_table):
+        context = multiprocessing.get_context("fork")
+        stop = context.Event()
+        writer = context.Process(
+            target=write_continuously, args=(availability_table.path, stop)
+        )
+        writer.start()
+
+        reads, deadline = 0, time.monotonic() + 1
+        try:
+            while time.monotonic() < deadline:
+                for version in range(1000):
+                    result = availability_table.get(999, version)
+                    if result is not None:
+                        reads += 1
+                        # every counter of a slot is written with the version
+                        assert (result.counters == version).all()
+        finally:
+            stop.set()
+            writer.join(timeout=5)
+
+        assert reads > 0
+
+    def test_compute_lock_excludes_threads_of_a_worker(self, availability_table):
+        entered = threading.Event()
+
+        def compute() -> None:
+            with availability_table.compute_lock(999 + 64):
+                entered.set()
+
+        with availability_table.compute_lock(999):
+            other = threading.Thread(target=compute)
+            other.start()
+            # fcntl locks are per process, only the thread lock keeps it out
+            assert not entered.wait(0.1)
+
+            # other slots are not held
+            with availability_table.compute_lock(998):
+                pass
+        other.join(timeout=5)
+        assert entered.is_set()
+
+
+@pytest.mark.django_db
+class TestSharedAvailability:
+    def test_computed_once_per_host(
+        self, create_event, create_event_dates, create_schedule, availability_table
+    ):
+        event = Event.objects.prefetch_related("event_date").get(id=999)
+        first = EventService.get_availability_str(event)
+
+        # another worker of the host, mapping the same file
+        other_worker = SharedAvailabilityTable(
+            availability_table.path, slots=64, max_dates=31
+        )
+        set_availability_table(other_worker)
+        event = Event.objects.get(id=999)
+        with CaptureQueriesContext(connection) as queries:
+            assert EventService.get_availability_str(event) == first
+        assert not [q for q in queries.captured_queries if "schedule" in q["sql"]]
+        assert other_worker.stats()["hits"] == 1
+        other_worker.close()
+
+    def test_version_bump_retires_the_slot(
+        self, create_event, create_event_dates, create_schedule, availability_table
+    ):
+        event = Event.objects.get(id=999)
+        EventService.get_availability_str(event)
+
+        Event.bump_content_version(id=999)
+        event = Event.objects.get(id=999)
+        EventService.get_availability_str(event)
+
+        assert availability_table.stats()["misses"] == 2
+        assert availability_table.get(999, event.content_version) is not None
+
+    def test_writes_refresh_the_slot(
+        self,
+        create_event,
+        create_event_dates,
+        create_schedule,
+        availability_table,
+        refresh_executor,
+        django_capture_on_commit_callbacks,
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            EventService.invalidate_event("dbWUg9io46UXYNsiJrPhfR")
+        version = Event.objects.get(id=999).content_version
+        assert availability_table.peek(999, version) is None
+
+        # on the refresh thread, the next read is a hit
+        refresh_executor.run()
+        assert availability_table.peek(999, version) is not None
+        event = Event.objects.get(id=999)
+        with CaptureQueriesContext(connection) as queries:
+            EventService.get_availability_str(event)
+        assert not [q for q in queries.captured_queries if "schedule" in q["sql"]]
@@ -1,7 +1,14 @@
+from django.conf import settings
 from django.urls import path
 
+from apps.event.async_views import (
+    EventAvailabilityAsyncView,
+    EventDetailAsyncView,
+    ScheduleListAsyncView,
+)
 from apps.event.views import (
     EventView,
+    EventAvailabilityView,
     EventDateView,
     EventDateDestroyView,
     EventDetailView,
@@ -9,12 +16,27 @@ from apps.event.views import (
     ScheduleDestroyView,
 )
 
+if settings.ASYNC_EVENT_VIEWS:
+    # under ASGI, the hot reads do not hold a worker thread while they wait on the database
+    event_detail_view = EventDetailAsyncView.as_view()
+    event_availability_view = EventAvailabilityAsyncView.as_view()
+    schedule_list_view = ScheduleListAsyncView.as_view()
+else:
+    event_detail_view = EventDetailView.as_view()
+    event_availability_view = EventAvailabilityView.as_view()
+    schedule_list_view = ScheduleView.as_view()
+
 urlpatterns = [
     path("", EventView.as_view(), name="event-list"),
-    path("/<str:uuid>", EventDetailView.as_view(), name="event-detail"),
+    path("/<str:uuid>", event_detail_view, name="event-detail"),
     path("/<str:uuid>/dates", EventDateView.as_view(), name="event-dates-list"),
+    path(
+        "/<str:uuid>/availability",
+        event_availability_view,
+        name="event-availability",
+    ),
     path("/dates/<int:pk>", EventDateDestroyView.as_view(), name="dates-detail"),
-    path("/<str:uuid>/schedules", ScheduleView.as_view(), name="schedule-list"),
+    path("/<str:uuid>/schedules", schedule_list_view, name="schedule-list"),
     path(
         "/<str:uuid>/schedules/<str:name>",
         ScheduleDestroyView.as_view(),
@@ -1,6 +1,7 @@
 from datetime import date, datetime
 from typing import Any, List, Dict
 
+from django.db import transaction
 from django.db.models import Prefetch
 from django.http import Http404
 from django.shortcuts import get_object_or_404, get_list_or_404
@@ -14,21 +15,43 @@ from rest_framework import generics, status, filters
 from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.request import Request
-from silk.profiling.profiler import silk_profile
 
 from apps.event.models import Event, EventDate, Schedule
 from apps.event.serializers import (
     EventSerializer,
     EventDateSerializer,
     ScheduleSerializer,
+    ScheduleTombstoneSerializer,
 )
-from apps.event.services import EventService, EventDateService
+from apps.event.services import EventService, EventDateService, ScheduleService
 from apps.team.models import Team
+from config.conditional import content_version_condition, get_content_version
+from config.edge_cache import edge_cached, purge_surrogate_key
 from config.exceptions import InstanceNotFound, InvalidInputException
+from config.profiling import profile_section
+from config.snapshots import serve_snapshot
 
 name_param = openapi.Parameter(
     "name", openapi.IN_QUERY, description="팀원 이름", type=openapi.TYPE_STRING
 )
+since_param = openapi.Parameter(
+    "since",
+    openapi.IN_QUERY,
+    description="이전 응답의 cursor, 그 이후에 변경된 스케줄만 조회",
+    type=openapi.TYPE_STRING,
+)
+fields_param = openapi.Parameter(
+    "fields",
+    openapi.IN_QUERY,
+    description="응답에 포함할 필드 (comma separated)",
+    type=openapi.TYPE_STRING,
+)
+omit_param = openapi.Parameter(
+    "omit",
+    openapi.IN_QUERY,
+    description="응답에서 제외할 필드 (comma separated), e.g. availability",
+    type=openapi.TYPE_STRING,
+)
 
 
 @method_decorator(
@@ -36,6 +59,7 @@ name_param = openapi.Parameter(
     decorator=swagger_auto_schema(
         operation_summary="Get all events",
         responses={200: openapi.Response("Success", EventSerializer)},
+        manual_parameters=[fields_param, omit_param],
     ),
 )
 class EventView(generics.ListCreateAPIView):
@@ -95,6 +119,7 @@ class EventView(generics.ListCreateAPIView):
             200: openapi.Response("Success", EventDateSerializer),
             404: "Not found",
         },
+        manual_parameters=[fields_param, omit_param],
     ),
 )
 @method_decorator(
@@ -134,6 +159,9 @@ class EventView(generics.ListCreateAPIView):
         ),
     ),
 )
+@method_decorator(name="get", decorator=edge_cached("event"))
+@method_decorator(name="get", decorator=content_version_condition(Event))
+@method_decorator(name="get", decorator=serve_snapshot("event", Event))
 class EventDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = EventSerializer
     queryset = Event.objects.all()
@@ -150,6 +178,45 @@ class EventDetailView(generics.RetrieveUpdateDestroyAPIView):
 
     def perform_update(self, serializer):
         serializer.save(updated_at=timezone.now())
+        uuid = serializer.instance.uuid
+        EventService.invalidate_event_identity(uuid)
+        transaction.on_commit(lambda: EventService.refresh_in_background(uuid))
+        purge_surrogate_key("event", uuid)
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        EventService.invalidate_event_identity(instance.uuid)
+        purge_surrogate_key("event", instance.uuid)
+
+
+@method_decorator(
+    name="get",
+    decorator=swagger_auto_schema(
+        operation_summary="Get the availability of an event",
+        operation_description="number of available participants per date and 30-minute slot",
+        responses={200: "Success", 404: "Not found"},
+    ),
+)
+@method_decorator(name="get", decorator=edge_cached("event"))
+@method_decorator(name="get", decorator=content_version_condition(Event))
+@method_decorator(name="get", decorator=serve_snapshot("event-availability", Event))
+class EventAvailabilityView(generics.GenericAPIView):
+    queryset = Event.objects.all()
+    allowed_methods = ["GET"]
+    lookup_field = "uuid"
+
+    def get(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        # read by the conditional GET already
+        version = get_content_version(request, Event, "uuid", kwargs.get("uuid"))
+        if version is None:
+            raise InstanceNotFound("event with the provided uuid does not exist")
+
+        event = Event(
+            id=version.pk,
+            uuid=kwargs.get("uuid"),
+            content_version=version.content_version,
+        )
+        return Response({"availability": EventService.get_availability_str(event)})
 
 
 @method_decorator(
@@ -159,6 +226,7 @@ class EventDetailView(generics.RetrieveUpdateDestroyAPIView):
         responses={200: openapi.Response("Success", EventDateSerializer)},
     ),
 )
+@method_decorator(name="get", decorator=edge_cached("event"))
 class EventDateView(generics.ListCreateAPIView):
     serializer_class = EventDateSerializer
     queryset = EventDate.objects.all()
@@ -221,6 +289,9 @@ class EventDateView(generics.ListCreateAPIView):
 
                 associated_dates.append(serializer.data)
 
+        if associated_dates:
+            EventService.invalidate_event(associated_event_uuid)
+
         service = EventDateService(request, self)
         serialized_dates = service.get_serialized_event_dates()
 
@@ -240,16 +311,29 @@ class EventDateDestroyView(generics.DestroyAPIView):
     queryset = EventDate.objects.all()
     allowed_methods = ["DELETE"]
 
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            # schedules of the date are deleted with it
+            ScheduleService.record_tombstones(
+                Schedule.objects.filter(date_id=instance.id)
+            )
+            instance.delete()
+        EventService.invalidate_event(instance.event.uuid)
+
 
 @method_decorator(
     name="get",
     decorator=swagger_auto_schema(
         operation_summary="Get all schedule data associated with a single instant event",
+        operation_description="with since, only the schedules created, updated or deleted "
+        "since the cursor, and the cursor of the next sync. "
+        "since=0 returns every schedule (reset)",
         tags=["schedules"],
         responses={200: openapi.Response("Success", ScheduleSerializer)},
-        manual_parameters=[name_param],
+        manual_parameters=[name_param, since_param],
     ),
 )
+@method_decorator(name="get", decorator=edge_cached("event"))
 class ScheduleView(generics.ListCreateAPIView, generics.UpdateAPIView):
     serializer_class = ScheduleSerializer
     queryset = Schedule.objects.all()
@@ -267,6 +351,24 @@ class ScheduleView(generics.ListCreateAPIView, generics.UpdateAPIView):
         )
         return qs
 
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        cursor = request.query_params.get("since")
+        if cursor is None:
+            return super().list(request, *args, **kwargs)
+
+        event = EventService.get_event_identity(kwargs.get("uuid"))
+        changes = ScheduleService.get_changes(
+            event.id, cursor, request.query_params.get("name")
+        )
+        return Response(
+            {
+                "cursor": changes.cursor,
+                "reset": changes.reset,
+                "schedules": self.get_serializer(changes.schedules, many=True).data,
+                "deleted": ScheduleTombstoneSerializer(changes.deleted, many=True).data,
+            }
+        )
+
     @swagger_auto_schema(
         operation_summary="Add user's schedule to an event for all dates",
         tags=["schedules"],
@@ -291,6 +393,7 @@ class ScheduleView(generics.ListCreateAPIView, generics.UpdateAPIView):
             },
         ),
     )
+    @profile_section("schedule create")
     def post(self, request: Request, *args: Any, **kwargs: Any) -> Response:
         event_uuid: str = kwargs.get("uuid")
         name: str = request.data.get("name")
@@ -346,6 +449,7 @@ class ScheduleView(generics.ListCreateAPIView, generics.UpdateAPIView):
                     serializer.save(event=associated_event, date=associated_dates[i])
                 schedules.append(serializer.data)
 
+        EventService.invalidate_event(event_uuid)
         return Response(schedules, status=status.HTTP_201_CREATED)
 
     @swagger_auto_schema(
@@ -373,6 +477,7 @@ class ScheduleView(generics.ListCreateAPIView, generics.UpdateAPIView):
             },
         ),
     )
+    @profile_section("schedule update")
     def patch(self, request: Request, *args: Any, **kwargs: Any) -> Response:
         event_uuid: str = kwargs.get("uuid")
 
@@ -403,6 +508,7 @@ class ScheduleView(generics.ListCreateAPIView, generics.UpdateAPIView):
                 )
                 if serializer.is_valid(raise_exception=True):
                     serializer.save(updated_at=timezone.now())
+                EventService.invalidate_event(event_uuid)
 
                 return Response(serializer.data, status=status.HTTP_200_OK)
             except Http404 as e:
@@ -414,6 +520,7 @@ class ScheduleView(generics.ListCreateAPIView, generics.UpdateAPIView):
                 serializer = self.get_serializer(data=data)
                 if serializer.is_valid(raise_exception=True):
                     serializer.save(event=associated_event, date=existing_date)
+                EventService.invalidate_event(event_uuid)
                 return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         except Http404:
@@ -436,5 +543,9 @@ class ScheduleDestroyView(generics.DestroyAPIView):
         tags=["schedules"],
     )
     def delete(self, request: Request, *args: Any, **kwargs) -> Response:
-        self.get_queryset().delete()
+        with transaction.atomic():
+            ScheduleService.record_tombstones(self.get_queryset())
+            deleted, _ = self.get_queryset().delete()
+        if deleted:
+            EventService.invalidate_event(self.kwargs.get("uuid"))
         return Response(status=status.HTTP_204_NO_CONTENT)
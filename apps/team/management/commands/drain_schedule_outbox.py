@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from apps.team.outbox import ScheduleOutboxWorker
+from apps.team.storage import FileSystemScheduleStore
+
+
+class Command(BaseCommand):
+    help = "Uploads pending week schedules from the outbox to the schedule store"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="drain the entries that are currently due and exit",
+        )
+        parser.add_argument(
+            "--store-root",
+            type=str,
+            default=None,
+            help="write to a local directory instead of S3",
+        )
+
+    def handle(self, *args, **options):
+        store = None
+        if options["store_root"]:
+            store = FileSystemScheduleStore(options["store_root"])
+
+        worker = ScheduleOutboxWorker(store=store)
+
+        if options["once"]:
+            processed = worker.drain()
+            self.stdout.write(f"uploaded {processed} schedules")
+        else:
+            worker.run_forever()
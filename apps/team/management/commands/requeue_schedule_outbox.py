@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from apps.team.outbox import ScheduleOutboxWorker
+
+
+class Command(BaseCommand):
+    help = "Retries the outbox schedules whose uploads failed, or deletes them"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--team",
+            type=str,
+            default=None,
+            help="only the schedules of this team",
+        )
+        parser.add_argument(
+            "--purge",
+            action="store_true",
+            help="delete the failed schedules instead of retrying them",
+        )
+
+    def handle(self, *args, **options):
+        if options["purge"]:
+            deleted = ScheduleOutboxWorker.purge_failed(options["team"])
+            self.stdout.write(f"deleted {deleted} failed schedules")
+        else:
+            requeued = ScheduleOutboxWorker.requeue_failed(options["team"])
+            self.stdout.write(f"requeued {requeued} failed schedules")
@@ -0,0 +1,62 @@
+# Generated by Django 4.1.5 on 2026-10-20 01:14
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("team", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScheduleOutbox",
+            fields=[
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("team_name", models.CharField(max_length=100)),
+                ("member_name", models.CharField(max_length=20)),
+                (
+                    "week_schedule",
+                    models.CharField(
+                        help_text="7개의 48자리 0/1 문자열을 이어붙인 문자열", max_length=336
+                    ),
+                ),
+                (
+                    "status",
+                    models.IntegerField(
+                        choices=[(0, "PENDING"), (1, "FAILED")], default=0
+                    ),
+                ),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                (
+                    "next_attempt_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                (
+                    "last_error",
+                    models.CharField(blank=True, default="", max_length=500),
+                ),
+            ],
+            options={
+                "db_table": "schedule_outbox",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="scheduleoutbox",
+            index=models.Index(
+                fields=["status", "next_attempt_at"],
+                name="schedule_ou_status_42e254_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="scheduleoutbox",
+            index=models.Index(
+                fields=["team_name", "member_name"],
+                name="schedule_ou_team_na_9669af_idx",
+            ),
+        ),
+    ]
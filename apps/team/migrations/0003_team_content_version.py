@@ -0,0 +1,33 @@
+# Generated by Django 4.1.5 on 2026-10-20 01:39
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("team", "0002_schedule_outbox"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="team",
+            name="content_updated_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name="team",
+            name="content_version",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name="team",
+            name="uuid",
+            field=models.CharField(
+                db_index=True,
+                help_text="팀을 구분하거나, 팀 뷰 url 생성을 위한 uuid 문자열",
+                max_length=23,
+            ),
+        ),
+    ]
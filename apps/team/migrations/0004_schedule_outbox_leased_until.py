@@ -0,0 +1,18 @@
+# Generated by Django 4.1.5 on 2026-10-20 02:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("team", "0003_team_content_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="scheduleoutbox",
+            name="leased_until",
+            field=models.DateTimeField(default=None, null=True),
+        ),
+    ]
@@ -1,9 +1,10 @@
 from django.db import models
+from django.utils import timezone
 from django.core.validators import MinLengthValidator
-from config.mixins import TimeStampMixin, TimeBlockMixin
+from config.mixins import TimeStampMixin, TimeBlockMixin, ContentVersionMixin
 
 
-class Team(TimeStampMixin, TimeBlockMixin):
+class Team(TimeStampMixin, TimeBlockMixin, ContentVersionMixin):
     """
     For team mode
     """
@@ -18,6 +19,7 @@ class Team(TimeStampMixin, TimeBlockMixin):
     uuid = models.CharField(
         max_length=23,
         null=False,
+        db_index=True,
         help_text="팀을 구분하거나, 팀 뷰 url 생성을 위한 uuid 문자열",
     )
     name = models.CharField(max_length=100, null=False, unique=True)
@@ -111,3 +113,44 @@ class TeamMember(TimeStampMixin):
 
     def __repr__(self) -> str:
         return f"TeamMember({self.id}, {self.name}, {self.team})"
+
+
+class ScheduleOutbox(TimeStampMixin):
+    """
+    Week schedule uploads waiting to be written to the schedule store.
+    Rows are written in the same transaction as the member change and drained by ScheduleOutboxWorker
+    """
+
+    class Status(models.IntegerChoices):
+        PENDING = (0, "PENDING")
+        FAILED = (1, "FAILED")
+
+    id = models.BigAutoField(primary_key=True)
+    team_name = models.CharField(max_length=100, null=False)
+    member_name = models.CharField(max_length=20, null=False)
+    week_schedule = models.CharField(
+        max_length=7 * 48,
+        null=False,
+        help_text="7개의 48자리 0/1 문자열을 이어붙인 문자열",
+    )
+    status = models.IntegerField(
+        choices=Status.choices, null=False, default=Status.PENDING
+    )
+    attempts = models.PositiveIntegerField(null=False, default=0)
+    next_attempt_at = models.DateTimeField(null=False, default=timezone.now)
+    # set while a worker uploads the row, the other rows of the member wait for it
+    leased_until = models.DateTimeField(null=True, default=None)
+    last_error = models.CharField(max_length=500, null=False, blank=True, default="")
+
+    class Meta:
+        db_table = "schedule_outbox"
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"]),
+            models.Index(fields=["team_name", "member_name"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"[{self.id}] {self.team_name}/{self.member_name} ({self.get_status_display()})"
+
+    def __repr__(self) -> str:
+        return f"ScheduleOutbox({self.id}, {self.team_name}, {self.member_name})"
@@ -0,0 +1,247 @@
+import asyncio
+import logging
+import threading
+from datetime import datetime, timedelta
+from functools import reduce
+from operator import or_
+from typing import List, Dict, Set, Tuple, Optional
+
+from django.conf import settings
+from django.db import transaction, close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.team.models import ScheduleOutbox
+from apps.team.services import TeamMemberService
+from apps.team.storage import get_schedule_store
+
+logger = logging.getLogger("bistime")
+
+
+class ScheduleOutboxWorker(object):
+    """
+    Drains ScheduleOutbox rows to the schedule store in batches, retrying failed uploads with
+    exponential backoff. Claimed rows are leased by pushing next_attempt_at forward, so a crashed
+    worker's batch is picked up again once the lease expires. A member is not claimed while
+    another of their rows is leased, their uploads land in order
+    """
+
+    _thread: Optional[threading.Thread] = None
+    _thread_lock = threading.Lock()
+    _wake_event = threading.Event()
+
+    def __init__(
+        self,
+        store=None,
+        batch_size: int = None,
+        max_attempts: int = None,
+        concurrency: int = None,
+    ):
+        self.store = store if store is not None else get_schedule_store()
+        self.batch_size = batch_size or settings.SCHEDULE_OUTBOX_BATCH_SIZE
+        self.max_attempts = max_attempts or settings.SCHEDULE_OUTBOX_MAX_ATTEMPTS
+        self.concurrency = concurrency or settings.SCHEDULE_OUTBOX_CONCURRENCY
+
+    def claim_batch(self) -> List[ScheduleOutbox]:
+        now = timezone.now()
+        with transaction.atomic():
+            entries: List[ScheduleOutbox] = list(
+                ScheduleOutbox.objects.select_for_update(skip_locked=True)
+                .filter(status=ScheduleOutbox.Status.PENDING, next_attempt_at__lte=now)
+                .order_by("id")[: self.batch_size]
+            )
+            if len(entries) == 0:
+                return []
+
+            # uploads of a member are ordered, an older row in flight would
+            # finish after the newer one and overwrite it
+            busy = self.__members_in_flight(entries, now)
+
+            # only the latest schedule of each member needs to be uploaded
+            latest: Dict[Tuple[str, str], ScheduleOutbox] = {}
+            for e in entries:
+                if (e.team_name, e.member_name) not in busy:
+                    latest[(e.team_name, e.member_name)] = e
+            superseded = [
+                e.id
+                for e in entries
+                if (e.team_name, e.member_name) in latest
+                and latest[(e.team_name, e.member_name)] != e
+            ]
+
+            if superseded:
+                ScheduleOutbox.objects.filter(id__in=superseded).delete()
+
+            claimed = list(latest.values())
+            lease = now + timedelta(seconds=settings.SCHEDULE_OUTBOX_LEASE_SECONDS)
+            ScheduleOutbox.objects.filter(id__in=[e.id for e in claimed]).update(
+                next_attempt_at=lease, leased_until=lease
+            )
+
+        return claimed
+
+    @staticmethod
+    def __members_in_flight(
+        entries: List[ScheduleOutbox], now: datetime
+    ) -> Set[Tuple[str, str]]:
+        """
+        Members of the entries with a row leased by a worker or being claimed by one
+        """
+        members = {(e.team_name, e.member_name) for e in entries}
+        rows = ScheduleOutbox.objects.filter(
+            reduce(or_, (Q(team_name=t, member_name=m) for t, m in members)),
+            status=ScheduleOutbox.Status.PENDING,
+        )
+        # the locking read comes first, rows claimed meanwhile are then read leased
+        lockable = set(
+            rows.select_for_update(skip_locked=True).values_list("id", flat=True)
+        )
+        return {
+            (team_name, member_name)
+            for pk, team_name, member_name, leased_until in rows.values_list(
+                "id", "team_name", "member_name", "leased_until"
+            )
+            if pk not in lockable or (leased_until is not None and leased_until > now)
+        }
+
+    async def aupload(self, entry: ScheduleOutbox) -> None:
+        week_schedule: List[str] = [
+            entry.week_schedule[i : i + 48]
+            for i in range(0, len(entry.week_schedule), 48)
+        ]
+        await self.store.aput(
+            TeamMemberService.schedule_key(entry.team_name, entry.member_name),
+            TeamMemberService.encode_schedule(week_schedule),
+        )
+
+    def mark_done(self, entry: ScheduleOutbox) -> None:
+        # with the failed uploads of the member it supersedes
+        ScheduleOutbox.objects.filter(
+            team_name=entry.team_name, member_name=entry.member_name, id__lte=entry.id
+        ).delete()
+        TeamMemberService.schedule_cache.delete((entry.team_name, entry.member_name))
+
+    def mark_failed(self, entry: ScheduleOutbox, error: Exception) -> None:
+        attempts = entry.attempts + 1
+        backoff = min(
+            settings.SCHEDULE_OUTBOX_MAX_BACKOFF,
+            settings.SCHEDULE_OUTBOX_BASE_BACKOFF * (2 ** (attempts - 1)),
+        )
+        status = (
+            ScheduleOutbox.Status.FAILED
+            if attempts >= self.max_attempts
+            else ScheduleOutbox.Status.PENDING
+        )
+        ScheduleOutbox.objects.filter(id=entry.id).update(
+            leased_until=None,
+            attempts=attempts,
+            status=status,
+            next_attempt_at=timezone.now() + timedelta(seconds=backoff),
+            last_error=str(error)[:500],
+            updated_at=timezone.now(),
+        )
+        logger.warning(
+            f"schedule upload for {entry.team_name}/{entry.member_name} failed "
+            f"(attempt {attempts}/{self.max_attempts}): {error}"
+        )
+
+    @staticmethod
+    def requeue_failed(team: str = None) -> int:
+        """
+        Gives the failed entries a new round of attempts, returns their number
+        """
+        queryset = ScheduleOutbox.objects.filter(status=ScheduleOutbox.Status.FAILED)
+        if team is not None:
+            queryset = queryset.filter(team_name=team)
+        return queryset.update(
+            status=ScheduleOutbox.Status.PENDING,
+            attempts=0,
+            next_attempt_at=timezone.now(),
+            updated_at=timezone.now(),
+        )
+
+    @staticmethod
+    def purge_failed(team: str = None) -> int:
+        """
+        Deletes the failed entries, returns their number
+        """
+        queryset = ScheduleOutbox.objects.filter(status=ScheduleOutbox.Status.FAILED)
+        if team is not None:
+            queryset = queryset.filter(team_name=team)
+        deleted, _ = queryset.delete()
+        return deleted
+
+    def drain_once(self) -> int:
+        """
+        Claims and uploads one batch, returns the number of claimed entries
+        """
+        entries = self.claim_batch()
+        if len(entries) == 0:
+            return 0
+
+        results = asyncio.run(self.__aupload_batch(entries))
+
+        for entry, error in zip(entries, results):
+            if error is None:
+                self.mark_done(entry)
+            else:
+                self.mark_failed(entry, error)
+
+        return len(entries)
+
+    async def __aupload_batch(
+        self, entries: List[ScheduleOutbox]
+    ) -> List[Optional[Exception]]:
+        # at most `concurrency` uploads of the batch are in flight at once
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def try_upload(entry: ScheduleOutbox) -> Optional[Exception]:
+            async with semaphore:
+                try:
+                    await self.aupload(entry)
+                except Exception as e:
+                    return e
+            return None
+
+        try:
+            return await asyncio.gather(*(try_upload(e) for e in entries))
+        finally:
+            await self.store.aclose()
+
+    def drain(self) -> int:
+        """
+        Drains every entry that is currently due
+        """
+        total = 0
+        while True:
+            processed = self.drain_once()
+            if processed == 0:
+                return total
+            total += processed
+
+    def run_forever(self, poll_interval: float = None) -> None:
+        poll_interval = poll_interval or settings.SCHEDULE_OUTBOX_POLL_INTERVAL
+        while True:
+            ScheduleOutboxWorker._wake_event.wait(timeout=poll_interval)
+            ScheduleOutboxWorker._wake_event.clear()
+            close_old_connections()
+            try:
+                self.drain()
+            except Exception as e:
+                logger.error(f"schedule outbox drain failed: {e}")
+
+    @classmethod
+    def wake(cls) -> None:
+        """
+        Starts the in-process background worker if needed and signals it that entries are due
+        """
+        if cls._thread is None or not cls._thread.is_alive():
+            with cls._thread_lock:
+                if cls._thread is None or not cls._thread.is_alive():
+                    cls._thread = threading.Thread(
+                        target=cls().run_forever,
+                        name="schedule-outbox-worker",
+                        daemon=True,
+                    )
+                    cls._thread.start()
+        cls._wake_event.set()
@@ -159,22 +159,14 @@ class WeekScheduleSerializer(serializers.Serializer):
 
         return value
 
-    def save(self):
-        schedule_bytes: List[bytearray] = []
-
-        try:
-            team = get_object_or_404(Team, id=self.validated_data["team"].id)
-        except Http404:
-            raise InstanceNotFound("team with the provided uuid does not exist")
-
-        for bytes_string in self.validated_data["week_schedule"]:
-            schedule_bytes.append(bytearray([int(x) for x in bytes_string]))
-
-        bitmap_bytes: bytes = TeamMemberService.create_schedule_bitmap_bytes(
-            schedule_bytes
-        )
-        TeamMemberService.save_schedule(
-            bitmap_bytes,
+    def save(self, **kwargs):
+        """
+        Queues the schedule in the outbox, within the caller's transaction.
+        The team is passed as in the other serializers, save(team=...)
+        """
+        team: Team = kwargs["team"]
+        TeamMemberService.enqueue_schedule(
             team.name,
             self.validated_data["name"],
+            self.validated_data["week_schedule"],
         )
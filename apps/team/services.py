@@ -1,30 +1,48 @@
-import os
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-from botocore.exceptions import ClientError
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
 from django.db.models import QuerySet
 from django.http import Http404
 from django.shortcuts import get_list_or_404, get_object_or_404
 from django.utils import timezone
 from dotenv import load_dotenv
 from io import BytesIO
-from typing import Union, List
+from typing import Union, List, NamedTuple, Dict, Optional, Set, Any, Tuple
 
 import PIL
+import numpy as np
 import shortuuid
 from PIL import Image
 from rest_framework.request import Request
 
 from apps.event.services import EventService
-from apps.team.models import Team, TeamRegularEvent, SubGroup, TeamMember
-from config import s3_config
-from config.exceptions import (
-    InstanceNotFound,
-    S3ImagesUploadFailed,
-    InternalServerError,
+from apps.team.models import (
+    Team,
+    TeamRegularEvent,
+    SubGroup,
+    TeamMember,
+    ScheduleOutbox,
 )
+from apps.team.storage import get_schedule_store, StoredSchedule
+from config.cache import cached, invalidation_bus, service_cache
+from config.edge_cache import purge_surrogate_key
+from config.exceptions import InstanceNotFound
+from config.lru_cache import LRUCache
+from config.mixins import TimeBlockMixin
 
 load_dotenv()
 
+logger = logging.getLogger("bistime")
+
+# runs S3 deletions of teams and subgroups outside of the request cycle
+schedule_deletion_executor = ThreadPoolExecutor(
+    max_workers=1, thread_name_prefix="schedule-deletion"
+)
+
 
 class TeamService(object):
     def __init__(self, request: Request, team: Union[Team, None] = None):
@@ -48,6 +66,74 @@ class TeamService(object):
 
         return team
 
+    @staticmethod
+    def find_free_time(
+        team: Team, subgroup: Optional[str] = None, quorum: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Slots, per weekday, within the team's working hours where at least `quorum` members
+        (of the team or of a subgroup) are available and no regular event is booked.
+        Defaults to every member being available
+        """
+        heatmap = TeamMemberService.get_team_heatmap(team)
+        if subgroup:
+            if subgroup not in heatmap["subgroups"]:
+                raise InstanceNotFound(
+                    "subgroup with the provided name does not exist in the team"
+                )
+            scope = heatmap["subgroups"][subgroup]
+        else:
+            scope = heatmap["team"]
+
+        if quorum is None:
+            quorum = max(scope["members"], 1)
+
+        # (7, 48) availability counts -> one 48-bit mask per weekday
+        quorum_reached = np.array(scope["counts"], dtype=np.int32) >= quorum
+        slot_bits = np.left_shift(np.uint64(1), np.arange(48, dtype=np.uint64))
+        quorum_masks = (quorum_reached.astype(np.uint64) * slot_bits).sum(
+            axis=1, dtype=np.uint64
+        )
+
+        working_hours = TeamRegularEventService.time_range_mask(
+            team.start_time, team.end_time
+        )
+        occupancy = TeamRegularEventService.get_weekly_occupancy_masks(team.id)
+
+        free_masks = [
+            int(quorum_masks[day]) & working_hours & ~occupancy[day] for day in range(7)
+        ]
+
+        return {
+            "subgroup": subgroup,
+            "members": scope["members"],
+            "quorum": quorum,
+            "free_slots": [
+                "".join("1" if mask >> i & 1 else "0" for i in range(48))
+                for mask in free_masks
+            ],
+            "free_ranges": [TeamService.mask_to_ranges(mask) for mask in free_masks],
+        }
+
+    @staticmethod
+    def mask_to_ranges(mask: int) -> List[Dict[str, str]]:
+        ranges = []
+        slot = 0
+        while mask >> slot:
+            if not mask >> slot & 1:
+                slot += 1
+                continue
+            start = slot
+            while mask >> slot & 1:
+                slot += 1
+            ranges.append(
+                {
+                    "start_time": TimeBlockMixin.slot_to_time(start),
+                    "end_time": TimeBlockMixin.slot_to_time(slot),
+                }
+            )
+        return ranges
+
 
 class TeamRegularEventService(object):
     def __init__(self, request: Request, r_event: Union[TeamRegularEvent, None] = None):
@@ -58,10 +144,50 @@ class TeamRegularEventService(object):
     def generate_r_event_uuid() -> str:
         return "R" + EventService.generate_uuid()
 
+    @staticmethod
+    def time_range_mask(start_time: str, end_time: str) -> int:
+        """
+        48-bit mask of the slots in [start_time, end_time), bit i is the slot starting at i * 30 minutes
+        """
+        start = TimeBlockMixin.time_to_slot(start_time)
+        end = TimeBlockMixin.time_to_slot(end_time)
+        if end <= start:
+            return 0
+        return ((1 << (end - start)) - 1) << start
+
+    @staticmethod
+    @cached(
+        "team-occupancy:{team_id}",
+        ttl=lambda: settings.TEAM_OCCUPANCY_CACHE_TTL,
+        tags=["team-regular-events:{team_id}"],
+    )
+    def get_weekly_occupancy_masks(team_id: int) -> List[int]:
+        """
+        Regular events of a team compiled into one 48-bit occupancy mask per weekday
+        """
+        masks = [0] * 7
+        for day, start_time, end_time in TeamRegularEvent.objects.filter(
+            team_id=team_id
+        ).values_list("day", "start_time", "end_time"):
+            masks[day] |= TeamRegularEventService.time_range_mask(start_time, end_time)
+        return masks
+
+    @staticmethod
+    def invalidate_team(team_id: int) -> None:
+        service_cache.invalidate_tags(f"team-regular-events:{team_id}")
 
-class TeamMemberService(object):
 
-    bucket_name = os.environ.get("S3_BUCKET_NAME")
+class CachedWeekSchedule(NamedTuple):
+    etag: str
+    week_schedule: List[List[int]]
+    validated_at: float
+
+
+class TeamMemberService(object):
+    # (team name, member name) -> CachedWeekSchedule
+    schedule_cache = LRUCache(
+        maxsize=settings.MEMBER_SCHEDULE_CACHE_SIZE, name="member_schedule"
+    )
 
     @staticmethod
     def create_schedule_bitmap_bytes(schedule: List[bytearray]):
@@ -73,136 +199,512 @@ class TeamMemberService(object):
                 pixel_map[i, j] = schedule[i][j]
 
         bitmap.tobitmap(name="image")
-        print(type(bitmap))
         return bitmap
 
     @staticmethod
-    def save_schedule(bitmap: PIL.Image.Image, team: str, name: str) -> bool:
-        s3 = s3_config.s3_client_connection()
+    def schedule_key(team: str, name: str) -> str:
+        return f"Teams/{team}/{name}.xbm"
 
+    @staticmethod
+    def encode_schedule(week_schedule: List[str]) -> bytes:
+        """
+        Encodes 7 strings of 48 '0'/'1' characters into XBM bytes
+        """
+        schedule_bytes: List[bytearray] = [
+            bytearray([int(x) for x in bytes_string]) for bytes_string in week_schedule
+        ]
+        bitmap = TeamMemberService.create_schedule_bitmap_bytes(schedule_bytes)
+
+        buffer = BytesIO()
+        bitmap.save(buffer, "XBM")
+        return buffer.getvalue()
+
+    @staticmethod
+    def save_schedule(bitmap: PIL.Image.Image, team: str, name: str) -> bool:
         buffer = BytesIO()
         bitmap.save(buffer, "XBM")
-        buffer.seek(0)
 
-        sent_data = s3.put_object(
-            Body=buffer,
-            Bucket=TeamMemberService.bucket_name,
-            Key=f"Teams/{team}/{name}.xbm",
+        get_schedule_store().put(
+            TeamMemberService.schedule_key(team, name), buffer.getvalue()
         )
-        if sent_data["ResponseMetadata"]["HTTPStatusCode"] != 200:
-            raise S3ImagesUploadFailed()
+        TeamMemberService.schedule_cache.delete((team, name))
+        # other workers may have read the previous schedule since the write was enqueued
+        service_cache.invalidate_tags(f"team:{team}")
 
         return True
 
+    @staticmethod
+    def enqueue_schedule(
+        team: str, name: str, week_schedule: List[str]
+    ) -> ScheduleOutbox:
+        """
+        Writes the schedule to the outbox inside the caller's transaction.
+        The upload to the schedule store happens after commit, in ScheduleOutboxWorker
+        """
+        entry = ScheduleOutbox.objects.create(
+            team_name=team, member_name=name, week_schedule="".join(week_schedule)
+        )
+        TeamMemberService.schedule_cache.delete((team, name))
+        TeamMemberService.invalidate_team(team)
+
+        if settings.SCHEDULE_OUTBOX_AUTODRAIN:
+            from apps.team.outbox import ScheduleOutboxWorker
+
+            transaction.on_commit(ScheduleOutboxWorker.wake)
+
+        return entry
+
+    @staticmethod
+    def get_pending_schedules(
+        team: str, names: Optional[List[str]] = None
+    ) -> Dict[str, List[List[int]]]:
+        """
+        Latest not-yet-uploaded schedule of each member, so reads observe accepted writes.
+        Failed uploads are included until they are retried or purged, an upload that
+        succeeds deletes the rows of the member it supersedes
+        """
+        queryset = ScheduleOutbox.objects.filter(team_name=team)
+        if names is not None:
+            queryset = queryset.filter(member_name__in=names)
+
+        pending: Dict[str, List[List[int]]] = {}
+        for member_name, week_schedule in queryset.order_by("id").values_list(
+            "member_name", "week_schedule"
+        ):
+            pending[member_name] = [
+                [int(x) for x in day]
+                for day in TeamMemberService.__list_chunker(week_schedule, 48)
+            ]
+        return pending
+
     @staticmethod
     def __list_chunker(target_list: list, size: int):
         for i in range(0, len(target_list), size):
             yield target_list[i : i + size]
 
     @staticmethod
-    def get_member_schedule(team: str, name: str, s3_connection=None):
+    def __decode_schedule(file_byte_string: bytes) -> List[List[int]]:
+        # bitmap is 7 (days) wide and 48 (slots) high, getdata() walks it row by row
+        img = Image.open(BytesIO(file_byte_string))
+        pixel_map = [int(x / 255) for x in list(img.getdata())]
+        days = img.size[0]
 
-        if s3_connection:
-            s3 = s3_connection
-        else:
-            s3 = s3_config.s3_client_connection()
+        return [pixel_map[day::days] for day in range(days)]
 
-        try:
-            file_byte_string = s3.get_object(
-                Bucket=TeamMemberService.bucket_name,
-                Key=f"Teams/{team}/{name}.xbm",
-            )["Body"].read()
-        except ClientError:
+    @staticmethod
+    def __split_cached(
+        team: str,
+        names: List[str],
+        pending: Dict[str, List[List[int]]],
+        now: float,
+    ) -> Tuple[Dict[str, List[List[int]]], Dict[str, tuple]]:
+        """
+        Splits members into schedules served from the outbox or a fresh cache entry,
+        and stale ones keyed by their store key
+        """
+        schedules: Dict[str, List[List[int]]] = {}
+        stale: Dict[str, tuple] = {}
+
+        for name in names:
+            if name in pending:
+                schedules[name] = pending[name]
+                continue
+
+            cached: Optional[CachedWeekSchedule] = TeamMemberService.schedule_cache.get(
+                (team, name)
+            )
+            if (
+                cached is not None
+                and now - cached.validated_at < settings.MEMBER_SCHEDULE_CACHE_TTL
+            ):
+                schedules[name] = cached.week_schedule
+            else:
+                stale[TeamMemberService.schedule_key(team, name)] = (name, cached)
+
+        return schedules, stale
+
+    @staticmethod
+    def __stale_etags(stale: Dict[str, tuple]) -> Dict[str, str]:
+        return {
+            key: cached.etag for key, (_, cached) in stale.items() if cached is not None
+        }
+
+    @staticmethod
+    def __merge_stored(
+        team: str,
+        schedules: Dict[str, List[List[int]]],
+        stale: Dict[str, tuple],
+        stored: Dict[str, StoredSchedule],
+        now: float,
+    ) -> Dict[str, List[List[int]]]:
+        for key, (name, cached) in stale.items():
+            cache_key = (team, name)
+            stored_schedule: Optional[StoredSchedule] = stored.get(key)
+
+            if stored_schedule is None:
+                TeamMemberService.schedule_cache.delete(cache_key)
+            elif stored_schedule.body is None:
+                # not modified since the cached etag
+                TeamMemberService.schedule_cache.set(
+                    cache_key, cached._replace(validated_at=now)
+                )
+                schedules[name] = cached.week_schedule
+            else:
+                week_schedule = TeamMemberService.__decode_schedule(
+                    stored_schedule.body
+                )
+                TeamMemberService.schedule_cache.set(
+                    cache_key,
+                    CachedWeekSchedule(
+                        etag=stored_schedule.etag,
+                        week_schedule=week_schedule,
+                        validated_at=now,
+                    ),
+                )
+                schedules[name] = week_schedule
+
+        return schedules
+
+    @staticmethod
+    def get_member_schedules(
+        team: str,
+        names: List[str],
+        pending: Optional[Dict[str, List[List[int]]]] = None,
+    ) -> Dict[str, List[List[int]]]:
+        """
+        Read-through cache of decoded week schedules.
+        Entries older than MEMBER_SCHEDULE_CACHE_TTL are revalidated with conditional GETs,
+        and every miss is fetched in one batched store call.
+        Schedules still waiting in the outbox take precedence over the stored ones.
+        Members without a stored schedule are left out of the result
+        """
+        if pending is None:
+            pending = TeamMemberService.get_pending_schedules(team, names)
+
+        now = time.monotonic()
+        schedules, stale = TeamMemberService.__split_cached(team, names, pending, now)
+        if len(stale) == 0:
+            return schedules
+
+        stored = get_schedule_store().get_many(
+            stale.keys(), if_none_match=TeamMemberService.__stale_etags(stale)
+        )
+        return TeamMemberService.__merge_stored(team, schedules, stale, stored, now)
+
+    @staticmethod
+    async def aget_member_schedules(
+        team: str,
+        names: List[str],
+        pending: Optional[Dict[str, List[List[int]]]] = None,
+    ) -> Dict[str, List[List[int]]]:
+        """
+        Async get_member_schedules, stale schedules are fetched with concurrent requests
+        """
+        if pending is None:
+            pending = await sync_to_async(TeamMemberService.get_pending_schedules)(
+                team, names
+            )
+
+        now = time.monotonic()
+        schedules, stale = TeamMemberService.__split_cached(team, names, pending, now)
+        if len(stale) == 0:
+            return schedules
+
+        stored = await get_schedule_store().aget_many(
+            stale.keys(), if_none_match=TeamMemberService.__stale_etags(stale)
+        )
+        return TeamMemberService.__merge_stored(team, schedules, stale, stored, now)
+
+    @staticmethod
+    def get_member_schedule(
+        team: str,
+        name: str,
+        pending: Optional[Dict[str, List[List[int]]]] = None,
+    ) -> List[List[int]]:
+        schedules = TeamMemberService.get_member_schedules(team, [name], pending)
+        if name not in schedules:
             raise InstanceNotFound(
                 "schedule for the provided information does not exist"
             )
+        return schedules[name]
 
-        img = Image.open(BytesIO(file_byte_string))
-        pixel_map = [int(x / 255) for x in list(img.getdata())]
-
-        return list(TeamMemberService.__list_chunker(pixel_map, 48))
+    @staticmethod
+    async def aget_member_schedule(team: str, name: str) -> List[List[int]]:
+        schedules = await TeamMemberService.aget_member_schedules(team, [name])
+        if name not in schedules:
+            raise InstanceNotFound(
+                "schedule for the provided information does not exist"
+            )
+        return schedules[name]
 
     @staticmethod
-    def __get_schedules(team_name: str, members: List[TeamMember], s3_connection=None):
-        if not s3_connection:
-            s3 = s3_config.s3_client_connection()
-        else:
-            s3 = s3_connection
+    def get_schedule_cache_stats() -> Dict[str, Optional[float]]:
+        return TeamMemberService.schedule_cache.stats()
 
+    @staticmethod
+    def __format_schedules(
+        members: List[TeamMember], week_schedules: Dict[str, List[List[int]]]
+    ):
         schedules = []
         for m in members:
+            if m.name not in week_schedules:
+                # neither stored nor in the outbox, e.g. a purged failed upload
+                logger.warning(f"no schedule for member {m.name}, left out")
+                continue
             data = {
                 "name": m.name,
-                "subgroup": m.subgroup.name,
-                "week_schedule": TeamMemberService.get_member_schedule(
-                    team_name, name=m.name, s3_connection=s3
-                ),
+                "subgroup": m.subgroup.name if m.subgroup else None,
+                "week_schedule": week_schedules[m.name],
             }
             schedules.append(data)
 
         return schedules
 
+    @staticmethod
+    def __get_schedules(team_name: str, members: List[TeamMember]):
+        members = list(members)
+        week_schedules = TeamMemberService.get_member_schedules(
+            team_name, [m.name for m in members]
+        )
+        return TeamMemberService.__format_schedules(members, week_schedules)
+
+    @staticmethod
+    async def __aget_schedules(team_name: str, members: List[TeamMember]):
+        week_schedules = await TeamMemberService.aget_member_schedules(
+            team_name, [m.name for m in members]
+        )
+        return TeamMemberService.__format_schedules(members, week_schedules)
+
+    @staticmethod
+    @cached(
+        "team-heatmap:{team.name}",
+        ttl=lambda: settings.TEAM_HEATMAP_CACHE_TTL,
+        tags=["team:{team.name}"],
+        stale_ttl=lambda: settings.TEAM_HEATMAP_STALE_TTL,
+    )
+    def get_team_heatmap(team: Team) -> Dict[str, Any]:
+        """
+        Number of available members per weekday and slot, for the team and for each subgroup.
+        Member schedules are stacked into a (members, 7, 48) array and summed per subgroup in one pass
+        """
+        members: List[TeamMember] = list(
+            TeamMember.objects.select_related("subgroup").filter(team_id=team.id)
+        )
+        subgroup_names: List[str] = list(
+            SubGroup.objects.filter(team_id=team.id)
+            .order_by("id")
+            .values_list("name", flat=True)
+        )
+        subgroup_index: Dict[str, int] = {n: i for i, n in enumerate(subgroup_names)}
+
+        schedules = TeamMemberService.__get_schedules(team.name, members)
+
+        # members without a subgroup are only counted for the team
+        no_subgroup = len(subgroup_names)
+        stacked = np.array(
+            [s["week_schedule"] for s in schedules], dtype=np.int32
+        ).reshape(len(schedules), 7, 48)
+        member_groups = np.array(
+            [subgroup_index.get(s["subgroup"], no_subgroup) for s in schedules],
+            dtype=np.intp,
+        )
+
+        per_subgroup = np.zeros((no_subgroup + 1, 7, 48), dtype=np.int32)
+        np.add.at(per_subgroup, member_groups, stacked)
+        member_counts = np.bincount(member_groups, minlength=no_subgroup + 1)
+
+        heatmap = {
+            "team": {
+                "members": len(schedules),
+                "counts": per_subgroup.sum(axis=0).tolist(),
+            },
+            "subgroups": {
+                name: {
+                    "members": int(member_counts[i]),
+                    "counts": per_subgroup[i].tolist(),
+                }
+                for name, i in subgroup_index.items()
+            },
+        }
+        return heatmap
+
+    @staticmethod
+    def invalidate_team(team_name: str) -> None:
+        """
+        Drops aggregated data of a team after its members or schedules changed,
+        bumps its content version so conditional GETs of the team miss,
+        and purges it from the edge cache
+        """
+        service_cache.invalidate_tags(f"team:{team_name}")
+        Team.bump_content_version(name=team_name)
+        if settings.EDGE_CACHE_URL:
+            # surrogate keys are per uuid
+            purge_surrogate_key(
+                "team",
+                Team.objects.filter(name=team_name)
+                .values_list("uuid", flat=True)
+                .first(),
+            )
+
+    @staticmethod
+    def drop_invalidated_schedules(tags: List[str]) -> None:
+        """
+        Drops the cached schedules of the teams invalidated by other workers
+        """
+        team_names = {tag[len("team:") :] for tag in tags if tag.startswith("team:")}
+        if team_names:
+            TeamMemberService.schedule_cache.delete_where(
+                lambda key: key[0] in team_names
+            )
+
     @staticmethod
     def get_all_member_schedules(team: Team):
-        members: QuerySet = team.members.all()
+        members: QuerySet = team.members.select_related("subgroup").all()
         return TeamMemberService.__get_schedules(team.name, members)
 
     @staticmethod
-    def get_subgroup_schedules(team: Team, subgroup: str):
-        members: QuerySet = team.members.all()
-        subgroup_members: List[TeamMember] = []
-
-        for m in members:
-            if m.subgroup.name == subgroup:
-                subgroup_members.append(m)
+    def get_subgroup_members(team: Team, subgroup: str) -> List[TeamMember]:
+        subgroup_members: List[TeamMember] = list(
+            TeamMember.objects.select_related("subgroup").filter(
+                team_id=team.id, subgroup__name=subgroup
+            )
+        )
 
-        if members is None:
+        if (
+            len(subgroup_members) == 0
+            and not SubGroup.objects.filter(team_id=team.id, name=subgroup).exists()
+        ):
             raise InstanceNotFound(
                 "subgroup with the provided name does not exist in the team"
             )
 
-        return TeamMemberService.__get_schedules(team.name, members)
+        return subgroup_members
 
     @staticmethod
-    def __delete_all_object_versions(object_key: str, s3_bucket=None):
-        if not s3_bucket:
-            bucket = s3_config.s3_bucket()
-        else:
-            bucket = s3_bucket
+    def get_subgroup_schedules(team: Team, subgroup: str):
+        return TeamMemberService.__get_schedules(
+            team.name, TeamMemberService.get_subgroup_members(team, subgroup)
+        )
+
+    @staticmethod
+    async def aget_all_member_schedules(team: Team):
+        members: List[TeamMember] = await sync_to_async(list)(
+            team.members.select_related("subgroup").all()
+        )
+        return await TeamMemberService.__aget_schedules(team.name, members)
+
+    @staticmethod
+    async def aget_subgroup_schedules(team: Team, subgroup: str):
+        members = await sync_to_async(TeamMemberService.get_subgroup_members)(
+            team, subgroup
+        )
+        return await TeamMemberService.__aget_schedules(team.name, members)
+
+    @staticmethod
+    def __delete_prefix_in_background(
+        prefix: str, keys: Optional[Set[str]] = None
+    ) -> None:
         try:
-            res = bucket.object_versions.filter(Prefix=object_key).delete()
-            print(res)
-            print(f"Permanently deleted all versions of object {object_key}")
-        except ClientError as e:
-            print(e)
-            raise InternalServerError(e.MSG_TEMPLATE)
+            get_schedule_store().delete_prefix(prefix, keys)
+        except Exception as e:
+            logger.error(f"background schedule deletion under {prefix} failed: {e}")
 
     @staticmethod
-    def delete_schedule(
-        team_name: str, subgroup: Union[str, None] = None, name: Union[str, None] = None
-    ):
-        s3_bucket = s3_config.s3_bucket()
+    def __prepare_schedule_deletion(
+        team_name: str,
+        subgroup: Union[str, None] = None,
+        name: Union[str, None] = None,
+    ) -> Optional[Tuple[str, Optional[Set[str]]]]:
+        """
+        Drops cached and pending schedules of the deleted members.
+        Returns the store prefix and keys to delete, None if there is nothing to delete
+        """
+        team_prefix = f"Teams/{team_name}/"
 
         if subgroup:
-            print(team_name, subgroup)
-            try:
-                members = get_list_or_404(
-                    TeamMember, team__name=team_name, subgroup__name=subgroup
-                )
-            except Http404:
-                print("no member schedules to delete from s3")
-                return
-
-            for m in members:
-                object_key = f"Teams/{team_name}/{name}.xbm"
-                TeamMemberService.__delete_all_object_versions(object_key, s3_bucket)
+            member_names: List[str] = list(
+                TeamMember.objects.filter(
+                    team__name=team_name, subgroup__name=subgroup
+                ).values_list("name", flat=True)
+            )
+            if len(member_names) == 0:
+                logger.info("no member schedules to delete from s3")
+                return None
+
+            prefix = team_prefix
+            keys = {TeamMemberService.schedule_key(team_name, n) for n in member_names}
+            for n in member_names:
+                TeamMemberService.schedule_cache.delete((team_name, n))
+            ScheduleOutbox.objects.filter(
+                team_name=team_name, member_name__in=member_names
+            ).delete()
 
         elif not subgroup and name:
             # 한명의 스케줄 삭제
-            object_key = f"Teams/{team_name}/{name}.xbm"
-            TeamMemberService.__delete_all_object_versions(object_key, s3_bucket)
+            prefix = TeamMemberService.schedule_key(team_name, name)
+            keys = {prefix}
+            TeamMemberService.schedule_cache.delete((team_name, name))
+            ScheduleOutbox.objects.filter(
+                team_name=team_name, member_name=name
+            ).delete()
 
-        elif not subgroup and not name:
+        else:
             # 팀 삭제
-            object_key = f"Teams/{team_name}"
-            TeamMemberService.__delete_all_object_versions(object_key, s3_bucket)
+            prefix = team_prefix
+            keys = None
+            TeamMemberService.schedule_cache.delete_where(lambda k: k[0] == team_name)
+            ScheduleOutbox.objects.filter(team_name=team_name).delete()
+
+        TeamMemberService.invalidate_team(team_name)
+        return prefix, keys
+
+    @staticmethod
+    def delete_schedule(
+        team_name: str,
+        subgroup: Union[str, None] = None,
+        name: Union[str, None] = None,
+        background: bool = False,
+    ):
+        """
+        Deletes every version of the schedules of a subgroup, a single member or a whole team.
+        With background=True the S3 deletion is handed to a worker thread once the current
+        transaction commits, so it does not block the request
+        """
+        deletion = TeamMemberService.__prepare_schedule_deletion(
+            team_name, subgroup, name
+        )
+        if deletion is None:
+            return
+        prefix, keys = deletion
+
+        if background:
+            transaction.on_commit(
+                lambda: schedule_deletion_executor.submit(
+                    TeamMemberService.__delete_prefix_in_background,
+                    prefix,
+                    keys,
+                )
+            )
+        else:
+            get_schedule_store().delete_prefix(prefix, keys)
+
+    @staticmethod
+    async def adelete_schedule(
+        team_name: str,
+        subgroup: Union[str, None] = None,
+        name: Union[str, None] = None,
+    ):
+        """
+        Async delete_schedule, the store deletion runs on the event loop
+        """
+        deletion = await sync_to_async(TeamMemberService.__prepare_schedule_deletion)(
+            team_name, subgroup, name
+        )
+        if deletion is None:
+            return
+        prefix, keys = deletion
+
+        await get_schedule_store().adelete_prefix(prefix, keys)
+
+
+invalidation_bus.subscribe(TeamMemberService.drop_invalidated_schedules)
@@ -1,6 +1,14 @@
 import pytest
 
 from apps.team.models import Team, SubGroup, TeamRegularEvent
+from config.cache import service_cache
+
+
+@pytest.fixture(autouse=True, scope="function")
+def clear_service_cache():
+    # ids and names of the fixtures are reused across tests
+    service_cache.clear()
+    yield
 
 
 @pytest.fixture(autouse=False, scope="function")
@@ -46,3 +54,82 @@ def create_regular_events(db):
         start_time="18:00",
         end_time="19:00",
     )
+
+
+class FakeS3Client(object):
+    """
+    In-memory stand-in for the boto3 s3 client of a versioned bucket.
+    Answers conditional GETs with 304 and pages version listings by 1000
+    """
+
+    def __init__(self):
+        self.objects = {}
+        self.versions = []
+        self.get_calls = 0
+        self.delete_requests = []
+
+    def put_object(self, Body, Bucket, Key):
+        data = Body.read() if hasattr(Body, "read") else Body
+        etag = f'"{hash(data)}"'
+        self.objects[Key] = (data, etag)
+        self.versions.append({"Key": Key, "VersionId": str(len(self.versions))})
+        return {"ResponseMetadata": {"HTTPStatusCode": 200}, "ETag": etag}
+
+    def get_object(self, Bucket, Key, IfNoneMatch=None):
+        from botocore.exceptions import ClientError
+
+        self.get_calls += 1
+        if Key not in self.objects:
+            raise ClientError(
+                {
+                    "Error": {"Code": "NoSuchKey"},
+                    "ResponseMetadata": {"HTTPStatusCode": 404},
+                },
+                "GetObject",
+            )
+        data, etag = self.objects[Key]
+        if IfNoneMatch == etag:
+            raise ClientError(
+                {"Error": {"Code": "304"}, "ResponseMetadata": {"HTTPStatusCode": 304}},
+                "GetObject",
+            )
+        from io import BytesIO
+
+        return {"Body": BytesIO(data), "ETag": etag}
+
+    def get_paginator(self, operation_name):
+        client = self
+
+        class Paginator(object):
+            def paginate(self, Bucket, Prefix):
+                matched = [v for v in client.versions if v["Key"].startswith(Prefix)]
+                for i in range(0, len(matched), 1000):
+                    yield {"Versions": matched[i : i + 1000]}
+
+        return Paginator()
+
+    def delete_objects(self, Bucket, Delete):
+        objects = Delete["Objects"]
+        assert len(objects) <= 1000
+        self.delete_requests.append(len(objects))
+        removed = {(o["Key"], o["VersionId"]) for o in objects}
+        self.versions = [
+            v for v in self.versions if (v["Key"], v["VersionId"]) not in removed
+        ]
+        remaining_keys = {v["Key"] for v in self.versions}
+        self.objects = {k: v for k, v in self.objects.items() if k in remaining_keys}
+        return {"ResponseMetadata": {"HTTPStatusCode": 200}}
+
+
+@pytest.fixture(autouse=False, scope="function")
+def fake_s3():
+    from apps.team.services import TeamMemberService
+    from apps.team.storage import S3ScheduleStore, set_schedule_store
+
+    client = FakeS3Client()
+    set_schedule_store(S3ScheduleStore(bucket_name="bucket", s3_connection=client))
+    TeamMemberService.schedule_cache.clear()
+    TeamMemberService.schedule_cache.reset_stats()
+    yield client
+    set_schedule_store(None)
+    TeamMemberService.schedule_cache.clear()
@@ -0,0 +1,123 @@
+import multiprocessing
+import time
+
+import pytest
+from django.db import connection, connections
+
+from config.cache import InvalidationBus, TwoTierCache
+from config.cache.models import CacheInvalidation
+
+TAG = "team:Team1"
+WORKERS = 4
+POLL_INTERVAL = 0.1
+TIMEOUT = 10
+
+
+def worker_cache(bus: InvalidationBus) -> TwoTierCache:
+    # in-process tier only, the shared tier has its own invalidation
+    return TwoTierCache(name="bus-test", maxsize=16, bus=bus)
+
+
+def run_worker(bus: InvalidationBus, ready, results) -> None:
+    cache = worker_cache(bus)
+    bus.poll()
+    cache.set("heatmap", "cached", ttl=60, tags=[TAG])
+    ready.put(True)
+
+    deadline = time.monotonic() + TIMEOUT
+    while cache.get("heatmap") is not None:
+        if time.monotonic() > deadline:
+            results.put(None)
+            return
+        # a request every 5ms
+        bus.maybe_poll()
+        time.sleep(0.005)
+    results.put(time.time())
+    connections.close_all()
+
+
+@pytest.mark.django_db
+class TestInvalidationBus:
+    """
+    invalidations of one worker reaching the in-process caches of the others
+    """
+
+    def test_invalidation_reaches_other_worker(self, settings):
+        settings.CACHE_BUS_POLL_INTERVAL = POLL_INTERVAL
+        first_bus, second_bus = InvalidationBus(), InvalidationBus()
+        first, second = worker_cache(first_bus), worker_cache(second_bus)
+        second_bus.poll()
+        second.set("heatmap", "cached", ttl=60, tags=[TAG])
+        second.set("other", "cached", ttl=60, tags=["team:Team2"])
+
+        first.invalidate_tags(TAG)
+        assert second.get("heatmap") == "cached"
+
+        second_bus.poll()
+        assert second.get("heatmap") is None
+        assert second.get("other") == "cached"
+        assert second_bus.stats()["received"] == 1
+
+    def test_rows_committed_out_of_order(self, settings):
+        settings.CACHE_BUS_POLL_INTERVAL = POLL_INTERVAL
+        bus = InvalidationBus()
+        cache = worker_cache(bus)
+        bus.poll()
+        cache.set("heatmap", "cached", ttl=60, tags=[TAG])
+
+        # a transaction holding a lower id commits after the poll
+        reserved = CacheInvalidation.objects.create(tag=TAG)
+        reserved_id = reserved.id
+        reserved.delete()
+        CacheInvalidation.objects.create(tag="team:Team2")
+        bus.poll()
+        assert cache.get("heatmap") == "cached"
+
+        CacheInvalidation.objects.create(id=reserved_id, tag=TAG)
+        bus.poll()
+        assert cache.get("heatmap") is None
+
+    def test_disabled_bus_does_not_write(self, settings):
+        settings.CACHE_BUS_POLL_INTERVAL = 0
+        cache = worker_cache(InvalidationBus())
+
+        cache.invalidate_tags(TAG)
+
+        assert not CacheInvalidation.objects.exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_staleness_across_worker_processes(settings):
+    if connection.vendor == "sqlite" and connection.is_in_memory_db():
+        pytest.skip("worker processes need a database they can share")
+
+    settings.CACHE_BUS_POLL_INTERVAL = POLL_INTERVAL
+    bus = InvalidationBus()
+    context = multiprocessing.get_context("fork")
+    ready, results = context.Queue(), context.Queue()
+
+    # workers open their own connections
+    connections.close_all()
+    processes = [
+        context.Process(target=run_worker, args=(bus, ready, results))
+        for _ in range(WORKERS)
+    ]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        ready.get(timeout=TIMEOUT)
+
+    published_at = time.time()
+    worker_cache(bus).invalidate_tags(TAG)
+
+    staleness = [results.get(timeout=TIMEOUT) for _ in processes]
+    for process in processes:
+        process.join(timeout=TIMEOUT)
+
+    assert None not in staleness
+    staleness = [t - published_at for t in staleness]
+    print(
+        f"staleness over {WORKERS} workers: max {max(staleness) * 1000:.0f}ms, "
+        f"mean {sum(staleness) / WORKERS * 1000:.0f}ms"
+    )
+    assert max(staleness) < POLL_INTERVAL + 0.5
@@ -0,0 +1,44 @@
+import pytest
+from rest_framework.test import APIClient
+
+from apps.team.services import TeamMemberService
+from config.client_request_for_test import ClientRequest
+
+
+class TestTeamConditionalGet(object):
+    def setup_class(cls):
+        cls.client = APIClient()
+        cls.request = ClientRequest(cls.client)
+        cls.base_url = "/api/teams/TCBSqtMWXVC22sGebhSW5QL"
+        cls.accept_header = "application/json; version=1;"
+
+    def conditional_get(self, url: str, etag: str):
+        return self.client.get(
+            url, HTTP_ACCEPT=self.accept_header, HTTP_IF_NONE_MATCH=etag
+        )
+
+    @pytest.mark.django_db
+    def test_team_detail(self, create_team, create_subgroups):
+        res = self.request("get", self.base_url)
+        etag = res["ETag"]
+        # holds the admin code, not stored by nginx
+        assert res["Cache-Control"] == "private, no-cache"
+        assert not res.has_header("X-Accel-Expires")
+        assert self.conditional_get(self.base_url, etag).status_code == 304
+
+        res = self.request("del", "/api/teams/subgroups/997")
+        assert res.status_code == 204
+
+        res = self.conditional_get(self.base_url, etag)
+        assert res.status_code == 200
+        assert "subgroup3" not in res.data["subgroups"]
+
+    @pytest.mark.django_db
+    def test_member_list(self, create_team, create_subgroups, fake_s3):
+        url = self.base_url + "/members"
+        etag = self.request("get", url)["ETag"]
+        assert self.conditional_get(url, etag).status_code == 304
+
+        TeamMemberService.invalidate_team("Team1")
+
+        assert self.conditional_get(url, etag).status_code == 200
@@ -0,0 +1,171 @@
+import pytest
+from rest_framework.test import APIClient
+
+from apps.team.models import ScheduleOutbox, TeamMember
+from apps.team.outbox import ScheduleOutboxWorker
+from apps.team.storage import FileSystemScheduleStore
+from config.client_request_for_test import ClientRequest
+
+
+class TestTeamMemberEnd2End(object):
+    def setup_class(cls):
+        cls.request = ClientRequest(APIClient())
+        cls.base_url = "/api/teams"
+        cls.test_team_uuid = "TCBSqtMWXVC22sGebhSW5QL"
+
+    @pytest.mark.django_db
+    def test_create_member_queues_schedule(
+        self, create_team, create_subgroups, tmp_path, settings
+    ):
+        settings.SCHEDULE_OUTBOX_AUTODRAIN = False
+        week_schedule = ["1" * 48] * 3 + ["0" * 48] * 4
+        res = self.request(
+            "post",
+            self.base_url + "/members",
+            {
+                "team": self.test_team_uuid,
+                "subgroup": "subgroup1",
+                "name": "member1",
+                "weekSchedule": week_schedule,
+            },
+        )
+
+        assert res.status_code == 201
+        assert TeamMember.objects.filter(name="member1").exists()
+        assert ScheduleOutbox.objects.filter(member_name="member1").count() == 1
+
+        # pending schedule is served before it reaches the store
+        res = self.request(
+            "get", self.base_url + f"/{self.test_team_uuid}/members?name=member1"
+        )
+        assert res.status_code == 200
+        assert res.data["week_schedule"][0] == [1] * 48
+
+        store = FileSystemScheduleStore(str(tmp_path))
+        assert ScheduleOutboxWorker(store=store).drain() == 1
+        assert ScheduleOutbox.objects.count() == 0
+        assert (tmp_path / "Teams" / "Team1" / "member1.xbm").exists()
+
+    @pytest.mark.django_db
+    def test_create_member_with_invalid_schedule_rolls_back(
+        self, create_team, create_subgroups, settings
+    ):
+        settings.SCHEDULE_OUTBOX_AUTODRAIN = False
+        res = self.request(
+            "post",
+            self.base_url + "/members",
+            {
+                "team": self.test_team_uuid,
+                "subgroup": "subgroup1",
+                "name": "member1",
+                "weekSchedule": ["1" * 47] * 7,
+            },
+        )
+
+        assert res.status_code == 400
+        assert not TeamMember.objects.filter(name="member1").exists()
+        assert ScheduleOutbox.objects.count() == 0
+
+    @pytest.mark.django_db
+    def test_team_heatmap(self, create_team, create_subgroups, settings):
+        settings.SCHEDULE_OUTBOX_AUTODRAIN = False
+        from apps.team.services import TeamMemberService
+
+        for name, subgroup_id, first_day in [
+            ("member1", 999, "1" * 48),
+            ("member2", 999, "1" * 24 + "0" * 24),
+            ("member3", 998, "0" * 48),
+        ]:
+            TeamMember.objects.create(team_id=999, subgroup_id=subgroup_id, name=name)
+            TeamMemberService.enqueue_schedule(
+                "Team1", name, [first_day] + ["0" * 48] * 6
+            )
+
+        res = self.request("get", self.base_url + f"/{self.test_team_uuid}/heatmap")
+        assert res.status_code == 200
+        assert res.data["team"]["members"] == 3
+        assert res.data["team"]["counts"][0] == [2] * 24 + [1] * 24
+        assert res.data["team"]["counts"][1] == [0] * 48
+        assert res.data["subgroups"]["subgroup1"]["members"] == 2
+        assert res.data["subgroups"]["subgroup2"]["counts"][0] == [0] * 48
+        assert res.data["subgroups"]["subgroup3"]["members"] == 0
+
+        res = self.request(
+            "get", self.base_url + f"/{self.test_team_uuid}/heatmap?subgroup=subgroup2"
+        )
+        assert list(res.data["subgroups"].keys()) == ["subgroup2"]
+
+        # member writes invalidate the cached heatmap
+        TeamMemberService.enqueue_schedule("Team1", "member3", ["1" * 48] * 7)
+        res = self.request("get", self.base_url + f"/{self.test_team_uuid}/heatmap")
+        assert res.data["team"]["counts"][1] == [1] * 48
+
+    @pytest.mark.django_db
+    def test_team_free_time(
+        self, create_team, create_subgroups, create_regular_events, settings
+    ):
+        settings.SCHEDULE_OUTBOX_AUTODRAIN = False
+        from apps.team.services import TeamMemberService
+
+        for name, subgroup_id, monday in [
+            ("member1", 999, "1" * 48),
+            ("member2", 999, "1" * 30 + "0" * 18),
+            ("member3", 998, "0" * 48),
+        ]:
+            TeamMember.objects.create(team_id=999, subgroup_id=subgroup_id, name=name)
+            TeamMemberService.enqueue_schedule("Team1", name, [monday] + ["1" * 48] * 6)
+
+        url = self.base_url + f"/{self.test_team_uuid}/free-time"
+
+        # subgroup1 is free on monday until 15:00, regular event 1 books 14:00 ~ 16:00
+        # and the team works from 09:00 to 21:00
+        res = self.request("get", url + "?subgroup=subgroup1")
+        assert res.status_code == 200
+        assert res.data["quorum"] == 2
+        assert res.data["free_ranges"][0] == [
+            {"start_time": "09:00", "end_time": "14:00"}
+        ]
+        # regular event 2 books saturday 18:00 ~ 19:00
+        assert res.data["free_ranges"][5] == [
+            {"start_time": "09:00", "end_time": "18:00"},
+            {"start_time": "19:00", "end_time": "21:00"},
+        ]
+
+        res = self.request("get", url + "?quorum=2")
+        assert res.data["free_ranges"][0] == [
+            {"start_time": "09:00", "end_time": "14:00"}
+        ]
+        assert res.data["free_slots"][1] == "0" * 18 + "1" * 24 + "0" * 6
+
+        res = self.request("get", url + "?quorum=0")
+        assert res.status_code == 400
+
+    @pytest.mark.django_db
+    def test_failed_upload_of_new_member(
+        self, create_team, create_subgroups, fake_s3, settings
+    ):
+        settings.SCHEDULE_OUTBOX_AUTODRAIN = False
+        from apps.team.services import TeamMemberService
+
+        for name in ["member1", "member2"]:
+            TeamMember.objects.create(team_id=999, subgroup_id=999, name=name)
+            TeamMemberService.enqueue_schedule("Team1", name, ["1" * 48] * 7)
+        ScheduleOutbox.objects.filter(member_name="member2").update(
+            status=ScheduleOutbox.Status.FAILED
+        )
+        url = self.base_url + f"/{self.test_team_uuid}/heatmap"
+
+        # the failed upload is served until it is retried
+        res = self.request("get", url)
+        assert res.status_code == 200
+        assert res.data["team"]["members"] == 2
+
+        # once purged the member has no schedule, the rest of the team is still served
+        ScheduleOutboxWorker.purge_failed("Team1")
+        TeamMemberService.invalidate_team("Team1")
+        res = self.request("get", url)
+        assert res.status_code == 200
+        assert res.data["team"]["members"] == 1
+        res = self.request("get", self.base_url + f"/{self.test_team_uuid}/members")
+        assert res.status_code == 200
+        assert [m["name"] for m in res.data] == ["member1"]
@@ -0,0 +1,154 @@
+import json
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncRequestFactory
+
+from apps.team.models import TeamMember
+from apps.team.outbox import ScheduleOutboxWorker
+from apps.team.services import TeamMemberService
+from apps.team.storage import InMemoryScheduleStore, set_schedule_store
+from apps.team.views.async_views import (
+    TeamMemberCreateAsyncView,
+    TeamMemberListAsyncView,
+    TeamMemberDetailAsyncView,
+)
+
+
+@pytest.fixture(autouse=False, scope="function")
+def memory_store(settings):
+    settings.SCHEDULE_OUTBOX_AUTODRAIN = False
+    store = InMemoryScheduleStore()
+    set_schedule_store(store)
+    TeamMemberService.schedule_cache.clear()
+    yield store
+    set_schedule_store(None)
+    TeamMemberService.schedule_cache.clear()
+
+
+class TestTeamMemberAsyncViews(object):
+    def setup_class(cls):
+        cls.factory = AsyncRequestFactory()
+        cls.base_url = "/api/teams"
+        cls.test_team_uuid = "TCBSqtMWXVC22sGebhSW5QL"
+
+    def call(self, view_class, method: str, path: str, data=None, **kwargs):
+        if method == "get":
+            request = self.factory.get(path)
+        else:
+            request = getattr(self.factory, method)(
+                path,
+                data=json.dumps(data or {}),
+                content_type="application/json",
+            )
+        response = async_to_sync(view_class.as_view())(request, **kwargs)
+        return response.status_code, json.loads(response.content)
+
+    @pytest.mark.django_db
+    def test_member_schedule_lifecycle(
+        self, create_team, create_subgroups, memory_store
+    ):
+        for name, first_day in [("member1", "1" * 48), ("member2", "0" * 48)]:
+            status_code, data = self.call(
+                TeamMemberCreateAsyncView,
+                "post",
+                self.base_url + "/members",
+                {
+                    "team": self.test_team_uuid,
+                    "subgroup": "subgroup1",
+                    "name": name,
+                    "weekSchedule": [first_day] + ["0" * 48] * 6,
+                },
+            )
+            assert status_code == 201 and data["name"] == name
+
+        assert ScheduleOutboxWorker(store=memory_store).drain() == 2
+        assert set(memory_store.objects) == {
+            "Teams/Team1/member1.xbm",
+            "Teams/Team1/member2.xbm",
+        }
+
+        status_code, data = self.call(
+            TeamMemberListAsyncView,
+            "get",
+            self.base_url + f"/{self.test_team_uuid}/members?name=member1",
+            uuid=self.test_team_uuid,
+        )
+        assert status_code == 200
+        assert data["subgroup"] == "subgroup1"
+        assert data["weekSchedule"][0] == [1] * 48
+
+        status_code, data = self.call(
+            TeamMemberListAsyncView,
+            "get",
+            self.base_url + f"/{self.test_team_uuid}/members?subgroup=subgroup1",
+            uuid=self.test_team_uuid,
+        )
+        assert status_code == 200
+        assert sorted(m["name"] for m in data) == ["member1", "member2"]
+
+        member = TeamMember.objects.get(name="member1")
+        status_code, _ = self.call(
+            TeamMemberDetailAsyncView,
+            "delete",
+            self.base_url + f"/members/{member.id}",
+            pk=member.id,
+        )
+        assert status_code == 200
+        assert set(memory_store.objects) == {"Teams/Team1/member2.xbm"}
+
+        member = TeamMember.objects.get(name="member2")
+        for method, first_day in [("put", "1" * 48), ("patch", "0" * 48)]:
+            status_code, data = self.call(
+                TeamMemberDetailAsyncView,
+                method,
+                self.base_url + f"/members/{member.id}",
+                {"weekSchedule": [first_day] + ["0" * 48] * 6},
+                pk=member.id,
+            )
+            assert status_code == 200 and data["name"] == "member2"
+            assert TeamMemberService.get_pending_schedules("Team1") == {
+                "member2": [[int(x) for x in first_day]] + [[0] * 48] * 6
+            }
+
+    @pytest.mark.django_db
+    def test_errors_keep_api_format(self, create_team, memory_store):
+        status_code, data = self.call(
+            TeamMemberListAsyncView,
+            "get",
+            self.base_url + "/unknown/members",
+            uuid="unknown",
+        )
+        assert status_code == 404
+        assert data == {
+            "code": 404,
+            "detail": "team with the provided uuid does not exist",
+        }
+
+        status_code, data = self.call(
+            TeamMemberListAsyncView,
+            "get",
+            self.base_url + f"/{self.test_team_uuid}/members?name=nobody",
+            uuid=self.test_team_uuid,
+        )
+        assert status_code == 404
+
+    @pytest.mark.django_db
+    def test_member_list_conditional_get(self, create_team, memory_store):
+        path = self.base_url + f"/{self.test_team_uuid}/members"
+        view = async_to_sync(TeamMemberListAsyncView.as_view())
+
+        def get(etag=None):
+            request = self.factory.get(path)
+            if etag:
+                # AsyncRequestFactory of Django 4.1 drops extra headers
+                request.META["HTTP_IF_NONE_MATCH"] = etag
+            return view(request, uuid=self.test_team_uuid)
+
+        response = get()
+        assert response.status_code == 200
+        etag = response.headers["ETag"]
+        assert get(etag).status_code == 304
+
+        TeamMemberService.invalidate_team("Team1")
+        assert get(etag).status_code == 200
@@ -0,0 +1,125 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from apps.team.models import ScheduleOutbox
+from apps.team.outbox import ScheduleOutboxWorker
+from apps.team.services import TeamMemberService
+from apps.team.storage import InMemoryScheduleStore
+
+
+class FlakyStore(InMemoryScheduleStore):
+    def __init__(self, failures: int):
+        super().__init__()
+        self.failures = failures
+        self.puts = []
+
+    def put(self, key: str, body: bytes) -> str:
+        if self.failures > 0:
+            self.failures -= 1
+            raise ConnectionError("s3 unavailable")
+        self.puts.append(key)
+        return super().put(key, body)
+
+
+@pytest.mark.django_db
+class TestScheduleOutboxWorker:
+    """
+    unit tests for the write-behind schedule upload worker
+    """
+
+    @staticmethod
+    def _enqueue(name: str, value: str = "1"):
+        return ScheduleOutbox.objects.create(
+            team_name="Team1", member_name=name, week_schedule=value * 7 * 48
+        )
+
+    def test_only_latest_schedule_of_member_is_uploaded(self):
+        self._enqueue("member1", "0")
+        self._enqueue("member1", "1")
+        self._enqueue("member2")
+        store = FlakyStore(failures=0)
+
+        assert ScheduleOutboxWorker(store=store).drain() == 2
+        assert sorted(store.puts) == [
+            "Teams/Team1/member1.xbm",
+            "Teams/Team1/member2.xbm",
+        ]
+        assert ScheduleOutbox.objects.count() == 0
+
+    def test_member_is_not_claimed_while_an_older_row_is_leased(self):
+        self._enqueue("member1", "0")
+        worker = ScheduleOutboxWorker(store=FlakyStore(failures=0))
+        [leased] = worker.claim_batch()
+
+        # written while the upload of the older row is in flight
+        newer = self._enqueue("member1", "1")
+        self._enqueue("member2")
+        claimed = worker.claim_batch()
+        assert [e.member_name for e in claimed] == ["member2"]
+        assert ScheduleOutbox.objects.filter(id=newer.id).exists()
+
+        worker.mark_done(leased)
+        assert [e.id for e in worker.claim_batch()] == [newer.id]
+
+    def test_failed_upload_is_retried_with_backoff(self, settings):
+        settings.SCHEDULE_OUTBOX_BASE_BACKOFF = 0
+        self._enqueue("member1")
+        store = FlakyStore(failures=1)
+        worker = ScheduleOutboxWorker(store=store)
+
+        worker.drain_once()
+        entry = ScheduleOutbox.objects.get()
+        assert entry.attempts == 1
+        assert entry.status == ScheduleOutbox.Status.PENDING
+        assert "s3 unavailable" in entry.last_error
+
+        worker.drain()
+        assert store.puts == ["Teams/Team1/member1.xbm"]
+        assert ScheduleOutbox.objects.count() == 0
+
+    def test_entry_fails_after_max_attempts(self, settings):
+        settings.SCHEDULE_OUTBOX_BASE_BACKOFF = 0
+        self._enqueue("member1")
+        worker = ScheduleOutboxWorker(store=FlakyStore(failures=10), max_attempts=2)
+
+        worker.drain()
+
+        entry = ScheduleOutbox.objects.get()
+        assert entry.attempts == 2
+        assert entry.status == ScheduleOutbox.Status.FAILED
+
+    def test_failed_entry_is_read_until_superseded(self, settings):
+        settings.SCHEDULE_OUTBOX_BASE_BACKOFF = 0
+        self._enqueue("member1", "0")
+        ScheduleOutboxWorker(store=FlakyStore(failures=10), max_attempts=1).drain()
+        assert TeamMemberService.get_pending_schedules("Team1") == {
+            "member1": [[0] * 48] * 7
+        }
+
+        self._enqueue("member1", "1")
+        assert TeamMemberService.get_pending_schedules("Team1") == {
+            "member1": [[1] * 48] * 7
+        }
+
+        ScheduleOutboxWorker(store=FlakyStore(failures=0)).drain()
+        assert ScheduleOutbox.objects.count() == 0
+
+    def test_requeue_and_purge_failed(self, settings):
+        settings.SCHEDULE_OUTBOX_BASE_BACKOFF = 0
+        self._enqueue("member1")
+        ScheduleOutboxWorker(store=FlakyStore(failures=10), max_attempts=1).drain()
+
+        call_command("requeue_schedule_outbox", stdout=StringIO())
+        entry = ScheduleOutbox.objects.get()
+        assert (entry.status, entry.attempts) == (ScheduleOutbox.Status.PENDING, 0)
+
+        store = FlakyStore(failures=0)
+        assert ScheduleOutboxWorker(store=store).drain() == 1
+        assert store.puts == ["Teams/Team1/member1.xbm"]
+
+        self._enqueue("member2")
+        ScheduleOutboxWorker(store=FlakyStore(failures=10), max_attempts=1).drain()
+        call_command("requeue_schedule_outbox", "--purge", stdout=StringIO())
+        assert ScheduleOutbox.objects.count() == 0
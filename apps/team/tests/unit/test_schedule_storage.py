@@ -0,0 +1,258 @@
+import pytest
+
+from apps.team.services import TeamMemberService
+from config.exceptions import InvalidInputException
+from apps.team.storage import (
+    FileSystemScheduleStore,
+    InMemoryScheduleStore,
+    ScheduleNotFound,
+    ScheduleStore,
+    set_schedule_store,
+)
+
+
+@pytest.fixture(params=["filesystem", "memory"])
+def store(request, tmp_path):
+    if request.param == "filesystem":
+        return FileSystemScheduleStore(root=tmp_path)
+    return InMemoryScheduleStore()
+
+
+class TestScheduleStore:
+    """
+    unit tests for the local schedule storage backends
+    """
+
+    def test_incomplete_backend_fails_at_construction(self):
+        class ReadOnlyStore(ScheduleStore):
+            def get(self, key, if_none_match=None):
+                raise ScheduleNotFound(key)
+
+        with pytest.raises(TypeError):
+            ReadOnlyStore()
+
+    def test_put_get_and_conditional_get(self, store):
+        etag = store.put("Teams/Team1/member1.xbm", b"schedule")
+
+        stored = store.get("Teams/Team1/member1.xbm")
+        assert stored.body == b"schedule" and stored.etag == etag
+
+        not_modified = store.get("Teams/Team1/member1.xbm", if_none_match=etag)
+        assert not_modified.body is None and not_modified.etag == etag
+
+        with pytest.raises(ScheduleNotFound):
+            store.get("Teams/Team1/member2.xbm")
+
+    def test_get_many_skips_missing_keys(self, store):
+        store.put_many({"Teams/Team1/a.xbm": b"a", "Teams/Team1/b.xbm": b"b"})
+
+        result = store.get_many(
+            ["Teams/Team1/a.xbm", "Teams/Team1/b.xbm", "Teams/Team1/c.xbm"]
+        )
+
+        assert {k: v.body for k, v in result.items()} == {
+            "Teams/Team1/a.xbm": b"a",
+            "Teams/Team1/b.xbm": b"b",
+        }
+
+    def test_delete_prefix(self, store):
+        for key in ["Teams/Team1/a.xbm", "Teams/Team1/b.xbm", "Teams/Team10/a.xbm"]:
+            store.put(key, b"x")
+
+        assert store.delete_prefix("Teams/Team1/", keys={"Teams/Team1/a.xbm"}) == 1
+        assert store.delete_prefix("Teams/Team1/") == 1
+        assert list(store.get_many(["Teams/Team1/b.xbm", "Teams/Team10/a.xbm"])) == [
+            "Teams/Team10/a.xbm"
+        ]
+
+    def test_keys_outside_the_root_are_rejected(self, tmp_path):
+        store = FileSystemScheduleStore(root=tmp_path / "schedules")
+        store.put("Teams/Team1/a.xbm", b"a")
+
+        for team, name in [("..", "a"), ("Team1", "../../../a"), ("/etc", "passwd")]:
+            key = TeamMemberService.schedule_key(team, name)
+            with pytest.raises(InvalidInputException):
+                store.put(key, b"x")
+            with pytest.raises(ScheduleNotFound):
+                store.get(key)
+        with pytest.raises(InvalidInputException):
+            store.delete_prefix("Teams/../../")
+
+        assert [p.name for p in tmp_path.rglob("*") if p.is_file()] == ["a.xbm"]
+
+    @pytest.mark.django_db
+    def test_member_schedules_through_store(self, store):
+        set_schedule_store(store)
+        TeamMemberService.schedule_cache.clear()
+        try:
+            for name, value in [("member1", 0), ("member2", 1)]:
+                TeamMemberService.save_schedule(
+                    TeamMemberService.create_schedule_bitmap_bytes(
+                        [bytearray([value] * 48) for _ in range(7)]
+                    ),
+                    "Team1",
+                    name,
+                )
+
+            schedules = TeamMemberService.get_member_schedules(
+                "Team1", ["member1", "member2", "member3"]
+            )
+
+            assert schedules == {
+                "member1": [[0] * 48] * 7,
+                "member2": [[1] * 48] * 7,
+            }
+        finally:
+            set_schedule_store(None)
+            TeamMemberService.schedule_cache.clear()
+
+
+class FakeS3Server(object):
+    """
+    Minimal S3 REST endpoint for the async S3 store: objects, conditional GETs,
+    paged version listings and DeleteObjects
+    """
+
+    namespace = "http://s3.amazonaws.com/doc/2006-03-01/"
+
+    def __init__(self, page_size: int = 2):
+        self.objects = {}
+        self.page_size = page_size
+        self.authorized = True
+
+    async def handle(self, request):
+        from aiohttp import web
+
+        if "AWS4-HMAC-SHA256" not in request.headers.get("Authorization", ""):
+            self.authorized = False
+            return web.Response(status=403)
+
+        key = request.path.lstrip("/")
+        if request.method == "PUT":
+            body = await request.read()
+            self.objects[key] = (body, f'"{len(self.objects)}"')
+            return web.Response(headers={"ETag": self.objects[key][1]})
+        if request.method == "GET" and "versions" in request.query:
+            return self.list_versions(request.query)
+        if request.method == "GET":
+            if key not in self.objects:
+                return web.Response(status=404)
+            body, etag = self.objects[key]
+            if request.headers.get("If-None-Match") == etag:
+                return web.Response(status=304)
+            return web.Response(body=body, headers={"ETag": etag})
+        if request.method == "POST" and "delete" in request.query:
+            from xml.etree import ElementTree
+
+            assert "Content-MD5" in request.headers
+            for o in ElementTree.fromstring(await request.read()).iter("Object"):
+                self.objects.pop(o.findtext("Key"), None)
+            return web.Response(body=f'<DeleteResult xmlns="{self.namespace}"/>')
+        return web.Response(status=400)
+
+    def list_versions(self, query):
+        from aiohttp import web
+
+        keys = sorted(k for k in self.objects if k.startswith(query.get("prefix", "")))
+        if "key-marker" in query:
+            keys = [k for k in keys if k > query["key-marker"]]
+        page, rest = keys[: self.page_size], keys[self.page_size :]
+
+        versions = "".join(
+            f"<Version><Key>{k}</Key><VersionId>v1</VersionId></Version>" for k in page
+        )
+        truncated = (
+            f"<IsTruncated>true</IsTruncated><NextKeyMarker>{page[-1]}</NextKeyMarker>"
+            f"<NextVersionIdMarker>v1</NextVersionIdMarker>"
+            if rest
+            else "<IsTruncated>false</IsTruncated>"
+        )
+        return web.Response(
+            body=f'<ListVersionsResult xmlns="{self.namespace}">{truncated}{versions}</ListVersionsResult>'
+        )
+
+
+class TestAsyncS3ScheduleStore:
+    """
+    unit tests for the aiohttp based async methods of the S3 store
+    """
+
+    def test_async_round_trip(self):
+        import asyncio
+
+        from aiohttp import web
+        from aiohttp.test_utils import TestServer
+        from botocore.credentials import Credentials
+
+        from apps.team.storage import S3ScheduleStore
+
+        from prometheus_client import REGISTRY
+
+        def s3_sample(name: str, **labels) -> float:
+            return REGISTRY.get_sample_value(name, labels) or 0
+
+        puts_before = s3_sample(
+            "bistime_s3_requests_total", operation="put_object", outcome="ok"
+        )
+        sent_before = s3_sample(
+            "bistime_s3_bytes_total", operation="put_object", direction="sent"
+        )
+        not_modified_before = s3_sample(
+            "bistime_s3_requests_total", operation="get_object", outcome="not_modified"
+        )
+
+        fake = FakeS3Server()
+
+        async def scenario():
+            app = web.Application()
+            app.router.add_route("*", "/{key:.*}", fake.handle)
+            async with TestServer(app) as server:
+                store = S3ScheduleStore(
+                    bucket_name="bucket",
+                    endpoint_url=str(server.make_url("")).rstrip("/"),
+                    credentials=Credentials("access", "secret"),
+                )
+                etags = await store.aput_many(
+                    {f"Teams/Team1/m{i}.xbm": b"x" for i in range(5)}
+                )
+                fetched = await store.aget_many(
+                    ["Teams/Team1/m0.xbm", "Teams/Team1/m1.xbm", "Teams/Team1/m9.xbm"],
+                    if_none_match={"Teams/Team1/m0.xbm": etags["Teams/Team1/m0.xbm"]},
+                )
+                deleted = await store.adelete_prefix(
+                    "Teams/Team1/", keys={"Teams/Team1/m1.xbm", "Teams/Team1/m4.xbm"}
+                )
+                await store.aclose()
+                return fetched, deleted
+
+        fetched, deleted = asyncio.run(scenario())
+
+        assert fake.authorized
+        assert fetched["Teams/Team1/m0.xbm"].body is None
+        assert fetched["Teams/Team1/m1.xbm"].body == b"x"
+        assert "Teams/Team1/m9.xbm" not in fetched
+        assert deleted == 2
+        assert sorted(fake.objects) == [
+            "Teams/Team1/m0.xbm",
+            "Teams/Team1/m2.xbm",
+            "Teams/Team1/m3.xbm",
+        ]
+
+        assert (
+            s3_sample("bistime_s3_requests_total", operation="put_object", outcome="ok")
+            == puts_before + 5
+        )
+        assert (
+            s3_sample(
+                "bistime_s3_bytes_total", operation="put_object", direction="sent"
+            )
+            == sent_before + 5
+        )
+        assert (
+            s3_sample(
+                "bistime_s3_requests_total",
+                operation="get_object",
+                outcome="not_modified",
+            )
+            == not_modified_before + 1
+        )
@@ -0,0 +1,240 @@
+import threading
+import time
+from typing import List
+
+import pytest
+
+from apps.team.models import Team
+from config.cache import SingleFlight, TwoTierCache, cached, service_cache
+
+
+def worker(maxsize: int = 16) -> TwoTierCache:
+    # caches of two workers share the "service" backend under the same name
+    return TwoTierCache(name="test", maxsize=maxsize, alias="service")
+
+
+class Counter(object):
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self) -> List[int]:
+        self.calls += 1
+        return [self.calls]
+
+
+class TestTwoTierCache:
+    """
+    unit tests for the two-tier service cache
+    """
+
+    def setup_method(self):
+        worker().clear()
+
+    def test_get_or_set_computes_once(self):
+        cache, compute = worker(), Counter()
+
+        assert cache.get_or_set("key", compute, ttl=60) == [1]
+        assert cache.get_or_set("key", compute, ttl=60) == [1]
+
+        assert compute.calls == 1
+        stats = cache.stats()
+        assert stats["local_hits"] == 1 and stats["misses"] == 1
+
+    def test_none_is_cached(self):
+        cache, calls = worker(), []
+
+        for _ in range(2):
+            cache.get_or_set("key", lambda: calls.append(1), ttl=60)
+
+        assert len(calls) == 1
+
+    def test_shared_tier_between_workers(self):
+        first, second, compute = worker(), worker(), Counter()
+
+        first.get_or_set("key", compute, ttl=60)
+        assert second.get_or_set("key", compute, ttl=60) == [1]
+
+        assert compute.calls == 1
+        assert second.stats()["shared_hits"] == 1
+
+    def test_expired_entries_are_recomputed(self):
+        cache, compute = worker(), Counter()
+
+        cache.get_or_set("key", compute, ttl=0)
+        assert cache.get_or_set("key", compute, ttl=0) == [2]
+
+    def test_tag_invalidation_retires_local_and_shared_entries(self):
+        first, second, compute = worker(), worker(), Counter()
+        first.get_or_set("key", compute, ttl=60, tags=["team:Team1"])
+        first.get_or_set("other", compute, ttl=60, tags=["team:Team2"])
+
+        first.invalidate_tags("team:Team1")
+
+        assert first.get("key") is None
+        assert second.get("key") is None
+        assert second.get("other") == [2]
+
+    @pytest.mark.django_db
+    def test_invalidation_is_repeated_on_commit(
+        self, django_capture_on_commit_callbacks
+    ):
+        first, second, compute = worker(), worker(), Counter()
+        first.get_or_set("key", compute, ttl=60, tags=["team:Team1"])
+
+        with django_capture_on_commit_callbacks(execute=True):
+            first.invalidate_tags("team:Team1")
+            # another worker reads the data before the write is committed
+            assert second.get_or_set("key", compute, ttl=60, tags=["team:Team1"]) == [2]
+
+        # the local copy of the other worker is dropped through the bus
+        assert first.get("key") is None
+        assert worker().get("key") is None
+
+    def test_invalidation_during_compute_is_not_stored(self):
+        cache = worker()
+
+        def compute():
+            cache.invalidate_tags("team:Team1")
+            return "stale"
+
+        assert cache.get_or_set("key", compute, ttl=60, tags=["team:Team1"]) == "stale"
+        assert cache.get("key") is None
+
+    def test_invalidations_are_bounded(self):
+        cache = worker()
+
+        def compute():
+            # still rejected after the older invalidations were pruned
+            cache.invalidate_local_tags("team:Team1")
+            for i in range(1000):
+                cache.invalidate_local_tags(f"event:{i}")
+            return "stale"
+
+        assert cache.get_or_set("key", compute, ttl=60, tags=["team:Team1"]) == "stale"
+        assert cache.get("key") is None
+
+        for i in range(1000, 2000):
+            cache.invalidate_local_tags(f"event:{i}")
+        assert len(cache._invalidated) <= 2 * 256
+
+    def test_local_evictions(self):
+        cache, compute = worker(maxsize=2), Counter()
+
+        for key in ("a", "b", "c"):
+            cache.get_or_set(key, compute, ttl=60)
+
+        stats = cache.stats()
+        assert stats["size"] == 2 and stats["evictions"] == 1
+        # evicted locally, still in the shared tier
+        assert cache.get("a") == [1]
+        assert cache.stats()["shared_hits"] == 1
+
+    def test_without_shared_backend(self, settings):
+        settings.CACHES = {"default": settings.CACHES["default"]}
+        cache, compute = worker(), Counter()
+
+        cache.get_or_set("key", compute, ttl=60, tags=["tag"])
+        cache.invalidate_tags("tag")
+        cache.get_or_set("key", compute, ttl=60, tags=["tag"])
+
+        assert compute.calls == 2
+        assert cache.stats()["shared_backend"] is None
+
+
+class TestCachedDecorator:
+    def test_key_and_tags_from_arguments(self):
+        calls = []
+
+        @cached("heatmap:{team.name}:{days}", ttl=60, tags=["team:{team.name}"])
+        def heatmap(team: Team, days: int = 7) -> int:
+            calls.append(team.name)
+            return days
+
+        team = Team(name="Team1")
+        assert heatmap(team) == heatmap(team, days=7) == 7
+        assert heatmap.cache_key(team, 7) == "heatmap:Team1:7"
+        assert calls == ["Team1"]
+
+        service_cache.invalidate_tags("team:Team1")
+        heatmap(team)
+        assert calls == ["Team1", "Team1"]
+
+
+class TestSingleFlight:
+    def test_concurrent_calls_share_one_computation(self):
+        flight, calls, results = SingleFlight(), [], []
+        started = threading.Event()
+        release = threading.Event()
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(timeout=5)
+            return "value"
+
+        threads = [
+            threading.Thread(target=lambda: results.append(flight.do("key", compute)))
+            for _ in range(8)
+        ]
+        threads[0].start()
+        started.wait(timeout=5)
+        for thread in threads[1:]:
+            thread.start()
+        while flight.stats()["coalesced"] < 7:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join(timeout=5)
+
+        assert calls == [1]
+        assert results == ["value"] * 8
+        assert flight.in_flight() == 0
+
+    def test_errors_reach_every_caller(self):
+        flight = SingleFlight()
+
+        def compute():
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError):
+            flight.do("key", compute)
+        # nothing is kept after a failure
+        assert flight.do("key", lambda: 1) == 1
+
+
+class TestStaleWhileRevalidate:
+    def wait_for_refresh(self, cache: TwoTierCache) -> None:
+        for _ in range(500):
+            if cache.stats()["refreshes"]:
+                return
+            time.sleep(0.01)
+
+    def test_stale_value_is_served_and_refreshed_once(self):
+        cache, calls, release = worker(), [], threading.Event()
+
+        def compute() -> int:
+            calls.append(1)
+            if len(calls) > 1:
+                # the background refresh takes a while
+                release.wait(timeout=5)
+            return len(calls)
+
+        cache.get_or_set("key", compute, ttl=0, stale_ttl=60)
+        for _ in range(5):
+            assert cache.get_or_set("key", compute, ttl=60, stale_ttl=60) == 1
+        release.set()
+        self.wait_for_refresh(cache)
+
+        assert len(calls) == 2
+        assert cache.get("key") == 2
+        assert cache.stats()["stale_hits"] == 5
+
+    def test_invalidated_values_are_not_served_stale(self):
+        cache, compute = worker(), Counter()
+        cache.get_or_set("key", compute, ttl=0, tags=["tag"], stale_ttl=60)
+
+        cache.invalidate_tags("tag")
+
+        assert cache.get_or_set("key", compute, ttl=0, tags=["tag"], stale_ttl=60) == [
+            2
+        ]
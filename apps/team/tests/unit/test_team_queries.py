@@ -42,3 +42,34 @@ class TestTeamQueries:
 
             # queryset 에서 2개, unique name check, update 문
             assert len(expected_num_query.captured_queries) == 4
+
+    def test_subgroup_schedule_queries(self, create_team, create_subgroups, fake_s3):
+        from django.db import connection
+
+        from apps.team.models import TeamMember
+        from apps.team.services import TeamMemberService
+
+        for i in range(5):
+            TeamMember.objects.create(team_id=999, subgroup_id=999, name=f"member{i}")
+            TeamMember.objects.create(team_id=999, subgroup_id=998, name=f"other{i}")
+            for name in [f"member{i}", f"other{i}"]:
+                TeamMemberService.save_schedule(
+                    TeamMemberService.create_schedule_bitmap_bytes(
+                        [bytearray([1] * 48)] * 7
+                    ),
+                    "Team1",
+                    name,
+                )
+        team = Team.objects.get(id=999)
+
+        with CaptureQueriesContext(connection) as captured:
+            schedules = TeamMemberService.get_subgroup_schedules(team, "subgroup1")
+
+        # silk (debug settings) issues an EXPLAIN for every profiled query
+        queries = [
+            q for q in captured.captured_queries if not q["sql"].startswith("EXPLAIN")
+        ]
+        # joined member query, pending outbox query
+        assert len(queries) == 2
+        assert sorted(s["name"] for s in schedules) == [f"member{i}" for i in range(5)]
+        assert fake_s3.get_calls == 5
@@ -1,7 +1,7 @@
 import pytest
 
-from apps.team.models import Team
-from apps.team.services import TeamService
+from apps.team.models import Team, TeamMember
+from apps.team.services import TeamService, TeamMemberService
 
 
 class TestTeamServices:
@@ -17,3 +17,98 @@ class TestTeamServices:
         new_admin_code = updated_team.admin_code
 
         assert old_admin_code != new_admin_code
+
+
+@pytest.mark.django_db
+class TestMemberScheduleCache:
+    """
+    unit tests for read-through member schedule cache
+    """
+
+    @staticmethod
+    def _save(team: str, name: str, value: int):
+        bitmap = TeamMemberService.create_schedule_bitmap_bytes(
+            [bytearray([value] * 48) for _ in range(7)]
+        )
+        TeamMemberService.save_schedule(bitmap, team, name)
+
+    def test_cache_hit_skips_s3(self, fake_s3):
+        self._save("Team1", "member1", 1)
+
+        first = TeamMemberService.get_member_schedule("Team1", "member1")
+        second = TeamMemberService.get_member_schedule("Team1", "member1")
+
+        assert first == second == [[1] * 48] * 7
+        assert fake_s3.get_calls == 1
+        stats = TeamMemberService.get_schedule_cache_stats()
+        assert stats["hits"] == 1 and stats["misses"] == 1
+
+    def test_schedule_days_round_trip(self, fake_s3):
+        week_schedule = [str(day % 2) * 24 + "1" * 24 for day in range(7)]
+        TeamMemberService.save_schedule(
+            TeamMemberService.create_schedule_bitmap_bytes(
+                [bytearray([int(x) for x in day]) for day in week_schedule]
+            ),
+            "Team1",
+            "member1",
+        )
+
+        result = TeamMemberService.get_member_schedule("Team1", "member1")
+        assert ["".join(str(x) for x in day) for day in result] == week_schedule
+
+    def test_stale_entry_revalidated_with_etag(self, fake_s3, settings):
+        settings.MEMBER_SCHEDULE_CACHE_TTL = 0
+        self._save("Team1", "member1", 0)
+
+        TeamMemberService.get_member_schedule("Team1", "member1")
+        result = TeamMemberService.get_member_schedule("Team1", "member1")
+
+        assert result == [[0] * 48] * 7
+        assert fake_s3.get_calls == 2
+
+    def test_save_and_delete_invalidate(self, fake_s3):
+        self._save("Team1", "member1", 0)
+        TeamMemberService.get_member_schedule("Team1", "member1")
+
+        self._save("Team1", "member1", 1)
+        assert ("Team1", "member1") not in TeamMemberService.schedule_cache
+        assert (
+            TeamMemberService.get_member_schedule("Team1", "member1") == [[1] * 48] * 7
+        )
+
+        TeamMemberService.delete_schedule("Team1", name="member1")
+        assert ("Team1", "member1") not in TeamMemberService.schedule_cache
+
+
+class TestScheduleDeletion:
+    """
+    unit tests for batched S3 schedule deletion
+    """
+
+    @pytest.mark.django_db
+    def test_team_deletion_is_batched(self, fake_s3):
+        for i in range(2500):
+            fake_s3.put_object(Body=b"x", Bucket="bucket", Key=f"Teams/Team1/m{i}.xbm")
+        fake_s3.put_object(Body=b"x", Bucket="bucket", Key="Teams/Team10/m0.xbm")
+
+        TeamMemberService.delete_schedule("Team1")
+
+        assert sorted(fake_s3.delete_requests) == [500, 1000, 1000]
+        assert [v["Key"] for v in fake_s3.versions] == ["Teams/Team10/m0.xbm"]
+
+    @pytest.mark.django_db
+    def test_subgroup_deletion_removes_member_keys_only(
+        self, fake_s3, create_team, create_subgroups
+    ):
+        TeamMember.objects.create(team_id=999, subgroup_id=999, name="member1")
+        TeamMember.objects.create(team_id=999, subgroup_id=999, name="member2")
+        TeamMember.objects.create(team_id=999, subgroup_id=998, name="member3")
+        for name in ["member1", "member2", "member3"]:
+            fake_s3.put_object(
+                Body=b"x", Bucket="bucket", Key=f"Teams/Team1/{name}.xbm"
+            )
+
+        TeamMemberService.delete_schedule("Team1", subgroup="subgroup1")
+
+        assert fake_s3.delete_requests == [2]
+        assert set(fake_s3.objects.keys()) == {"Teams/Team1/member3.xbm"}
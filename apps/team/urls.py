@@ -1,5 +1,11 @@
+from django.conf import settings
 from django.urls import path
 
+from apps.team.views.async_views import (
+    TeamMemberCreateAsyncView,
+    TeamMemberListAsyncView,
+    TeamMemberDetailAsyncView,
+)
 from apps.team.views.admin_views import (
     TeamAdminCodeVerificationView,
     TeamAdminCodeResetView,
@@ -8,6 +14,8 @@ from apps.team.views.member_views import (
     TeamMemberCreateView,
     TeamMemberListView,
     TeamMemberDetailView,
+    TeamHeatmapView,
+    TeamFreeTimeView,
 )
 from apps.team.views.views import (
     TeamView,
@@ -18,16 +26,26 @@ from apps.team.views.views import (
     SubgroupDetailView,
 )
 
+if settings.ASYNC_TEAM_VIEWS:
+    # under ASGI, member schedule reads, writes and deletes do not block the worker
+    member_create_view = TeamMemberCreateAsyncView.as_view()
+    member_list_view = TeamMemberListAsyncView.as_view()
+    member_detail_view = TeamMemberDetailAsyncView.as_view()
+else:
+    member_create_view = TeamMemberCreateView.as_view()
+    member_list_view = TeamMemberListView.as_view()
+    member_detail_view = TeamMemberDetailView.as_view()
+
 urlpatterns = [
     path("", TeamView.as_view(), name="team-list-create"),
     path(
         "/members",
-        TeamMemberCreateView.as_view(),
+        member_create_view,
         name="create-member",
     ),
     path(
         "/members/<int:pk>",
-        TeamMemberDetailView.as_view(),
+        member_detail_view,
         name="member-detail",
     ),
     path("/<str:uuid>", TeamDetailView.as_view(), name="team-detail"),
@@ -49,9 +67,11 @@ urlpatterns = [
     path("/<str:uuid>/subgroups", SubgroupListView.as_view(), name="subgroup-create"),
     path(
         "/<str:uuid>/members",
-        TeamMemberListView.as_view(),
+        member_list_view,
         name="member-list",
     ),
+    path("/<str:uuid>/heatmap", TeamHeatmapView.as_view(), name="team-heatmap"),
+    path("/<str:uuid>/free-time", TeamFreeTimeView.as_view(), name="team-free-time"),
     path(
         "/regular-events/<str:uuid>",
         TeamRegularEventDetailView.as_view(),
@@ -0,0 +1,127 @@
+"""
+Async variants of the team member endpoints, served instead of the DRF views under ASGI
+(settings.ASYNC_TEAM_VIEWS). ORM calls run on the thread of sync_to_async, schedule store
+requests run on the event loop, so a worker keeps serving while S3 answers
+"""
+from typing import Any
+
+from asgiref.sync import sync_to_async
+from django.http import HttpRequest, HttpResponse
+from rest_framework import status
+
+from apps.team.models import Team, TeamMember
+from apps.team.serializers import TeamMemberSerializer
+from apps.team.services import TeamMemberService
+from apps.team.views.member_views import TeamMemberCreateView, TeamMemberDetailView
+from config.async_views import AsyncAPIView
+from config.conditional import (
+    conditional_response,
+    get_content_version,
+    set_validators,
+)
+from config.edge_cache import set_cache_headers, surrogate_key
+from config.exceptions import InstanceNotFound
+
+
+class TeamMemberCreateAsyncView(AsyncAPIView):
+    async def post(
+        self, request: HttpRequest, *args: Any, **kwargs: Any
+    ) -> HttpResponse:
+        data = await sync_to_async(TeamMemberCreateView.create_member)(
+            self.get_data(request)
+        )
+        return self.respond(data, status=status.HTTP_201_CREATED)
+
+
+class TeamMemberListAsyncView(AsyncAPIView):
+    async def get(
+        self, request: HttpRequest, *args: Any, **kwargs: Any
+    ) -> HttpResponse:
+        version = await sync_to_async(get_content_version)(
+            request, Team, "uuid", kwargs.get("uuid")
+        )
+        if version is None:
+            raise InstanceNotFound("team with the provided uuid does not exist")
+
+        response = conditional_response(request, version)
+        if response is None:
+            response = await self.get_schedules(request, kwargs.get("uuid"))
+        return set_cache_headers(
+            set_validators(response, version),
+            surrogate_key("team", kwargs.get("uuid")),
+        )
+
+    async def get_schedules(self, request: HttpRequest, uuid: str) -> HttpResponse:
+        name = request.GET.get("name")
+        subgroup = request.GET.get("subgroup")
+
+        team = await Team.objects.filter(uuid=uuid).afirst()
+        if team is None:
+            raise InstanceNotFound("team with the provided uuid does not exist")
+
+        if name:
+            member = (
+                await team.members.select_related("subgroup").filter(name=name).afirst()
+            )
+            if member is None:
+                raise InstanceNotFound(
+                    "team member with the provided name does not exist in the team"
+                )
+
+            # 개인 스케줄
+            member_schedule = await TeamMemberService.aget_member_schedule(
+                team.name, name
+            )
+            data = {
+                "name": name,
+                "subgroup": member.subgroup.name,
+                "week_schedule": member_schedule,
+            }
+            return self.respond(data)
+        elif subgroup:
+            # Subgroup 내 모든 스케줄
+            return self.respond(
+                await TeamMemberService.aget_subgroup_schedules(team, subgroup)
+            )
+        else:
+            # Team 내 모든 fixed schedule
+            return self.respond(await TeamMemberService.aget_all_member_schedules(team))
+
+
+class TeamMemberDetailAsyncView(AsyncAPIView):
+    @staticmethod
+    async def get_object(pk: int) -> TeamMember:
+        instance = (
+            await TeamMember.objects.select_related("team", "subgroup")
+            .filter(id=pk)
+            .afirst()
+        )
+        if instance is None:
+            raise InstanceNotFound()
+        return instance
+
+    async def patch(
+        self, request: HttpRequest, *args: Any, **kwargs: Any
+    ) -> HttpResponse:
+        instance = await self.get_object(kwargs.get("pk"))
+        data = await sync_to_async(TeamMemberDetailView.update_member)(
+            instance, self.get_data(request)
+        )
+        return self.respond(data)
+
+    async def put(
+        self, request: HttpRequest, *args: Any, **kwargs: Any
+    ) -> HttpResponse:
+        # updates partially, as the DRF view does
+        return await self.patch(request, *args, **kwargs)
+
+    async def delete(
+        self, request: HttpRequest, *args: Any, **kwargs: Any
+    ) -> HttpResponse:
+        instance = await self.get_object(kwargs.get("pk"))
+
+        await sync_to_async(instance.delete)()
+        await TeamMemberService.adelete_schedule(instance.team.name, name=instance.name)
+        # the subgroup field queries the database while serializing
+        data = await sync_to_async(lambda: TeamMemberSerializer(instance).data)()
+        return self.respond(data)
@@ -1,5 +1,6 @@
 from typing import Any, Union
 
+from django.db import transaction
 from django.db.models import Prefetch
 from django.http import Http404
 from django.shortcuts import get_object_or_404
@@ -14,8 +15,14 @@ from rest_framework.response import Response
 
 from apps.team.models import Team, TeamMember
 from apps.team.serializers import TeamMemberSerializer, WeekScheduleSerializer
-from apps.team.services import TeamMemberService
-from config.exceptions import InstanceNotFound, DuplicateInstance
+from apps.team.services import TeamMemberService, TeamService
+from config.conditional import content_version_condition
+from config.edge_cache import edge_cached
+from config.exceptions import (
+    InstanceNotFound,
+    DuplicateInstance,
+    InvalidInputException,
+)
 
 
 class TeamMemberCreateView(generics.CreateAPIView):
@@ -57,32 +64,36 @@ class TeamMemberCreateView(generics.CreateAPIView):
         ),
     )
     def post(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        return Response(
+            self.create_member(request.data), status=status.HTTP_201_CREATED
+        )
+
+    @staticmethod
+    def create_member(request_data: dict) -> dict:
         try:
-            existing_team = get_object_or_404(Team, uuid=request.data.get("team"))
+            existing_team = get_object_or_404(Team, uuid=request_data.get("team"))
         except Http404:
             raise InstanceNotFound("team with the provided uuid does not exist")
 
-        serializer = self.get_serializer(data=request.data)
-
-        saved_member: Union[TeamMember, None] = None
+        serializer = TeamMemberSerializer(data=request_data)
 
-        try:
+        # member row and schedule outbox entry are committed together
+        with transaction.atomic():
             if serializer.is_valid(raise_exception=True):
-                saved_member = serializer.save()
+                serializer.save(team=existing_team)
 
                 data = serializer.data
-                data["week_schedule"] = request.data.get("week_schedule")
+                data["week_schedule"] = request_data.get("week_schedule")
 
                 s_serializer = WeekScheduleSerializer(data=data)
                 if s_serializer.is_valid(raise_exception=True):
-                    s_serializer.save()
-        except ValidationError as e:
-            saved_member.delete()
-            raise e
+                    s_serializer.save(team=existing_team)
 
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return serializer.data
 
 
+@method_decorator(name="get", decorator=edge_cached("team"))
+@method_decorator(name="get", decorator=content_version_condition(Team))
 class TeamMemberListView(generics.ListAPIView):
     queryset = Team.objects.all()
     allowed_methods = ["GET"]
@@ -99,9 +110,8 @@ class TeamMemberListView(generics.ListAPIView):
     )
 
     def get_team_queryset(self):
-        return self.queryset.prefetch_related(
-            Prefetch("members", queryset=TeamMember.objects.select_related("subgroup"))
-        ).filter(uuid=self.kwargs.get("uuid"))
+        # members are queried per request type (single member, subgroup, whole team)
+        return self.queryset.filter(uuid=self.kwargs.get("uuid"))
 
     @swagger_auto_schema(
         tags=["team-members"],
@@ -125,7 +135,7 @@ class TeamMemberListView(generics.ListAPIView):
             raise InstanceNotFound("team with the provided uuid does not exist")
 
         if name:
-            member = team.members.filter(name=name).first()
+            member = team.members.select_related("subgroup").filter(name=name).first()
             if member is None:
                 raise InstanceNotFound(
                     "team member with the provided name does not exist in the team"
@@ -199,27 +209,115 @@ class TeamMemberDetailView(generics.UpdateAPIView, generics.DestroyAPIView):
         return self.queryset.filter(id=self.kwargs.get("pk"))
 
     def update(self, request: Request, *args: Any, **kwargs: Any) -> Response:
-        instance = self.get_object()
-        serializer = self.get_serializer(
+        return Response(
+            self.update_member(self.get_object(), request.data),
+            status=status.HTTP_200_OK,
+        )
+
+    @staticmethod
+    @transaction.atomic
+    def update_member(instance: TeamMember, request_data: dict) -> dict:
+        serializer = TeamMemberSerializer(
             instance,
-            data={"subgroup": instance.subgroup.name, **request.data},
+            data={"subgroup": instance.subgroup.name, **request_data},
             partial=True,
         )
         if serializer.is_valid(raise_exception=True):
             serializer.save(updated_at=timezone.now())
+        TeamMemberService.invalidate_team(instance.team.name)
 
         data = serializer.data
-        if request.data.get("week_schedule"):
-            data["week_schedule"] = self.request.data.get("week_schedule")
+        if request_data.get("week_schedule"):
+            data["week_schedule"] = request_data.get("week_schedule")
 
             s_serializer = WeekScheduleSerializer(data=data)
             if s_serializer.is_valid(raise_exception=True):
-                s_serializer.save()
+                s_serializer.save(team=instance.team)
 
-        return Response(data, status=status.HTTP_200_OK)
+        return data
 
     def destroy(self, request: Request, *args: Any, **kwargs: Any) -> Response:
         instance = self.get_object()
         self.perform_destroy(instance)
-        TeamMemberService.delete_schedule(instance.team.name, name=kwargs.get("name"))
+        TeamMemberService.delete_schedule(instance.team.name, name=instance.name)
         return Response(self.get_serializer(instance).data, status=status.HTTP_200_OK)
+
+
+class TeamHeatmapView(generics.GenericAPIView):
+    queryset = Team.objects.all()
+    allowed_methods = ["GET"]
+
+    subgroup_param = openapi.Parameter(
+        "subgroup",
+        openapi.IN_QUERY,
+        description="조회하고자 하는 서브그룹의 이름. 없으면 모든 서브그룹",
+        type=openapi.TYPE_STRING,
+    )
+
+    @swagger_auto_schema(
+        tags=["team-members"],
+        operation_summary="Get availability heatmap of a team",
+        operation_description="요일(7) x 30분 단위 슬롯(48) 별로 가능한 멤버 수를 팀 전체와 서브그룹 별로 반환",
+        responses={200: "Success", 404: "Not found"},
+        manual_parameters=[subgroup_param],
+    )
+    def get(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        team = self.get_queryset().filter(uuid=kwargs.get("uuid")).first()
+        if team is None:
+            raise InstanceNotFound("team with the provided uuid does not exist")
+
+        heatmap = TeamMemberService.get_team_heatmap(team)
+
+        subgroup = request.GET.get("subgroup")
+        if subgroup:
+            if subgroup not in heatmap["subgroups"]:
+                raise InstanceNotFound(
+                    "subgroup with the provided name does not exist in the team"
+                )
+            heatmap = {
+                "team": heatmap["team"],
+                "subgroups": {subgroup: heatmap["subgroups"][subgroup]},
+            }
+
+        return Response(heatmap, status=status.HTTP_200_OK)
+
+
+class TeamFreeTimeView(generics.GenericAPIView):
+    queryset = Team.objects.all()
+    allowed_methods = ["GET"]
+
+    subgroup_param = openapi.Parameter(
+        "subgroup",
+        openapi.IN_QUERY,
+        description="서브그룹의 이름. 없으면 팀 전체",
+        type=openapi.TYPE_STRING,
+    )
+    quorum_param = openapi.Parameter(
+        "quorum",
+        openapi.IN_QUERY,
+        description="가능해야 하는 최소 멤버 수. 없으면 모든 멤버",
+        type=openapi.TYPE_INTEGER,
+    )
+
+    @swagger_auto_schema(
+        tags=["team-members"],
+        operation_summary="Find free time slots of a team",
+        operation_description="요일 별로 quorum 이상의 멤버가 가능하고 정기 일정이 없는 팀 워크아워 내의 30분 단위 슬롯을 반환",
+        responses={200: "Success", 400: "Validation error", 404: "Not found"},
+        manual_parameters=[subgroup_param, quorum_param],
+    )
+    def get(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        team = self.get_queryset().filter(uuid=kwargs.get("uuid")).first()
+        if team is None:
+            raise InstanceNotFound("team with the provided uuid does not exist")
+
+        quorum: Union[str, int, None] = request.GET.get("quorum")
+        if quorum is not None:
+            if not quorum.isdigit() or int(quorum) < 1:
+                raise InvalidInputException("quorum should be a positive integer")
+            quorum = int(quorum)
+
+        free_time = TeamService.find_free_time(
+            team, subgroup=request.GET.get("subgroup"), quorum=quorum
+        )
+        return Response(free_time, status=status.HTTP_200_OK)
@@ -13,6 +13,8 @@ from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from apps.event.models import Event
+from apps.event.services import EventService
 from apps.team.models import Team, TeamRegularEvent, SubGroup
 from apps.team.serializers import (
     TeamSerializer,
@@ -20,6 +22,8 @@ from apps.team.serializers import (
     SubgroupSerializer,
 )
 from apps.team.services import TeamService, TeamRegularEventService, TeamMemberService
+from config.conditional import content_version_condition
+from config.edge_cache import edge_cached, purge_surrogate_key
 from config.exceptions import InstanceNotFound
 
 team_name_param = openapi.Parameter(
@@ -144,6 +148,9 @@ class TeamView(generics.ListCreateAPIView):
         ),
     ),
 )
+# the team detail holds the admin code, no shared cache may keep it
+@method_decorator(name="get", decorator=edge_cached("team", private=True))
+@method_decorator(name="get", decorator=content_version_condition(Team))
 class TeamDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = TeamSerializer
     queryset = Team.objects.all()
@@ -160,12 +167,24 @@ class TeamDetailView(generics.RetrieveUpdateDestroyAPIView):
         serializer = self.get_serializer(instance, data=request.data, partial=True)
         if serializer.is_valid(raise_exception=True):
             serializer.save(updated_at=timezone.now())
+            if "name" in serializer.validated_data:
+                # events show the name of their team
+                Event.bump_content_version(associated_team_id=instance.id)
+            purge_surrogate_key("team", instance.uuid)
 
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     def perform_destroy(self, instance):
-        TeamMemberService.delete_schedule(instance.name)
+        TeamMemberService.delete_schedule(instance.name, background=True)
+        # events of the team are deleted with it
+        event_uuids = list(
+            Event.objects.filter(associated_team_id=instance.id).values_list(
+                "uuid", flat=True
+            )
+        )
         instance.delete()
+        EventService.invalidate_event_identity(*event_uuids)
+        purge_surrogate_key("team", instance.uuid)
 
 
 @method_decorator(
@@ -230,6 +249,7 @@ class TeamRegularEventListView(generics.ListCreateAPIView):
                 uuid=TeamRegularEventService.generate_r_event_uuid(),
                 team_id=associated_team.id,
             )
+            TeamRegularEventService.invalidate_team(associated_team.id)
 
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -303,6 +323,11 @@ class TeamRegularEventDetailView(generics.RetrieveUpdateDestroyAPIView):
 
     def perform_update(self, serializer):
         serializer.save(updated_at=timezone.now())
+        TeamRegularEventService.invalidate_team(serializer.instance.team_id)
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        TeamRegularEventService.invalidate_team(instance.team_id)
 
 
 @method_decorator(
@@ -353,7 +378,9 @@ class SubgroupListView(generics.ListCreateAPIView):
         data: dict = request.data
         serializer = self.get_serializer(data=data)
         if serializer.is_valid(raise_exception=True):
-            serializer.save(team_id=self.get_object().id)
+            team = self.get_object()
+            serializer.save(team_id=team.id)
+            TeamMemberService.invalidate_team(team.name)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
@@ -407,7 +434,12 @@ class SubgroupDetailView(generics.RetrieveUpdateDestroyAPIView):
 
     def perform_update(self, serializer):
         serializer.save(updated_at=timezone.now())
+        TeamMemberService.invalidate_team(serializer.instance.team.name)
 
     def perform_destroy(self, instance):
-        TeamMemberService.delete_schedule(instance.team.name, subgroup=instance.name)
+        TeamMemberService.delete_schedule(
+            instance.team.name, subgroup=instance.name, background=True
+        )
         instance.delete()
+        # a subgroup without members has no schedules, so delete_schedule skipped it
+        TeamMemberService.invalidate_team(instance.team.name)
@@ -5,12 +5,36 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.1/howto/deployment/asgi/
+
+Serve it with an ASGI server, e.g.
+gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker
+
+Event availability streams (apps.event.stream) are served by a raw ASGI app
+in front of Django, so an idle stream is a coroutine and not a thread
 """
 
 import os
+import re
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.deploy")
+# team member and event read endpoints are served by async views
+# (settings.ASYNC_TEAM_VIEWS, settings.ASYNC_EVENT_VIEWS)
+os.environ.setdefault("BISTIME_ASYNC_VIEWS", "true")
+
+django_application = get_asgi_application()
+
+# imports models, after the apps are loaded
+from apps.event.stream import availability_stream_app  # noqa: E402
+
+STREAM_PATH = re.compile(r"^/api/events/(?P<uuid>[^/]+)/stream$")
+
 
-application = get_asgi_application()
+async def application(scope, receive, send):
+    if scope["type"] == "http":
+        match = STREAM_PATH.match(scope["path"])
+        if match is not None:
+            await availability_stream_app(scope, receive, send, match["uuid"])
+            return
+    await django_application(scope, receive, send)
@@ -0,0 +1,57 @@
+import json
+from typing import Any
+
+from django.http import HttpRequest, HttpResponse
+from django.views import View
+from djangorestframework_camel_case.render import CamelCaseJSONRenderer
+from djangorestframework_camel_case.settings import api_settings
+from djangorestframework_camel_case.util import underscoreize
+from rest_framework import status
+
+from config.exceptions import custom_exception_handler, InvalidInputException
+
+
+class AsyncAPIView(View):
+    """
+    Async counterpart of a DRF APIView for Django's async class-based views.
+    DRF views are synchronous, so this keeps the API contract by hand:
+    camelCase JSON in and out, and the error body of config.exceptions.custom_exception_handler
+    """
+
+    renderer_class = CamelCaseJSONRenderer
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # like DRF's APIView, the API does not authenticate with the session cookie
+        view.csrf_exempt = True
+        return view
+
+    async def dispatch(self, request: HttpRequest, *args: Any, **kwargs: Any):
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        except Exception as e:
+            return self.handle_exception(e)
+
+    def handle_exception(self, exc: Exception) -> HttpResponse:
+        response = custom_exception_handler(exc, {"view": self})
+        if response is None:
+            raise exc
+        return self.respond(response.data, status=response.status_code)
+
+    @staticmethod
+    def get_data(request: HttpRequest) -> dict:
+        if not request.body:
+            return {}
+        try:
+            data = json.loads(request.body)
+        except ValueError as e:
+            raise InvalidInputException(f"JSON parse error - {e}")
+        return underscoreize(data, **api_settings.JSON_UNDERSCOREIZE)
+
+    def respond(self, data: Any, status: int = status.HTTP_200_OK) -> HttpResponse:
+        return HttpResponse(
+            self.renderer_class().render(data),
+            status=status,
+            content_type="application/json",
+        )
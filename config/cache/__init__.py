@@ -0,0 +1,27 @@
+"""
+Two-tier cache of the service layer, see config.cache.tiered.TwoTierCache.
+service_cache is the cache of every worker, shared through settings.CACHES["service"]
+and kept consistent across workers by config.cache.bus.invalidation_bus
+"""
+from django.conf import settings
+
+from config.cache.bus import InvalidationBus, invalidation_bus
+from config.cache.decorators import cached
+from config.cache.singleflight import SingleFlight
+from config.cache.tiered import TwoTierCache
+
+service_cache = TwoTierCache(
+    name="service",
+    maxsize=settings.SERVICE_CACHE_SIZE,
+    alias="service",
+    bus=invalidation_bus,
+)
+
+__all__ = [
+    "InvalidationBus",
+    "SingleFlight",
+    "TwoTierCache",
+    "cached",
+    "invalidation_bus",
+    "service_cache",
+]
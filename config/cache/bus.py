@@ -0,0 +1,128 @@
+"""
+Cross-worker invalidation of in-process caches through the cache_invalidation table.
+invalidate_tags() of a TwoTierCache appends its tags in the transaction of the write,
+and every worker reads the rows appended since its last poll at the start of a request,
+at most once per settings.CACHE_BUS_POLL_INTERVAL seconds: a primary key range scan
+that usually returns nothing. A write reaches the other workers within the poll interval
+of their next request, workers without requests have nothing to serve stale
+"""
+import logging
+import threading
+import time
+from datetime import timedelta
+from typing import Callable, Iterable, List, Optional, Set
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import Q
+from django.utils import timezone
+
+logger = logging.getLogger("bistime")
+
+
+class InvalidationBus(object):
+    def __init__(self):
+        self.subscribers: List[Callable[[List[str]], None]] = []
+        # id of the last row this worker has seen, None until the first poll
+        self.last_id: Optional[int] = None
+        # ids of the rows inside the commit window at the last poll
+        self.seen_ids: Set[int] = set()
+        self.last_poll = 0.0
+        self.published = 0
+        self.received = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return settings.CACHE_BUS_POLL_INTERVAL > 0
+
+    def subscribe(self, callback: Callable[[List[str]], None]) -> None:
+        """
+        callback receives the tags invalidated by other workers
+        """
+        self.subscribers.append(callback)
+
+    def publish(self, tags: Iterable[str]) -> None:
+        if not self.enabled:
+            return
+        from config.cache.models import CacheInvalidation
+
+        rows = CacheInvalidation.objects.bulk_create(
+            [CacheInvalidation(tag=tag) for tag in tags]
+        )
+        self.published += len(rows)
+        if self.published % settings.CACHE_BUS_PRUNE_EVERY < len(rows):
+            self.prune()
+
+    def maybe_poll(self) -> None:
+        if not self.enabled:
+            return
+        if time.monotonic() - self.last_poll < settings.CACHE_BUS_POLL_INTERVAL:
+            return
+        if not self._lock.acquire(blocking=False):
+            # another thread of the worker is polling
+            return
+        try:
+            self.poll()
+        finally:
+            self._lock.release()
+
+    def poll(self) -> None:
+        from config.cache.models import CacheInvalidation
+
+        self.last_poll = time.monotonic()
+        try:
+            if self.last_id is None:
+                # caches of a new worker are empty, nothing before it is relevant
+                self.last_id = (
+                    CacheInvalidation.objects.order_by("-id")
+                    .values_list("id", flat=True)
+                    .first()
+                    or 0
+                )
+                return
+            # ids are allocated before the commit, a row committed after a higher id
+            # is still found within the commit window
+            rows = list(
+                CacheInvalidation.objects.filter(
+                    Q(id__gt=self.last_id)
+                    | Q(
+                        created_at__gte=timezone.now()
+                        - timedelta(seconds=settings.CACHE_BUS_COMMIT_WINDOW)
+                    )
+                )
+                .order_by("id")
+                .values_list("id", "tag")
+            )
+        except DatabaseError as e:
+            logger.warning(f"failed to poll cache invalidations: {e}")
+            return
+
+        new_rows = [(i, tag) for i, tag in rows if i not in self.seen_ids]
+        self.seen_ids = {i for i, _ in rows}
+        if not new_rows:
+            return
+        self.last_id = max(self.last_id, rows[-1][0])
+        tags = list(dict.fromkeys(tag for _, tag in new_rows))
+        self.received += len(tags)
+        for callback in self.subscribers:
+            callback(tags)
+
+    def prune(self) -> None:
+        from config.cache.models import CacheInvalidation
+
+        CacheInvalidation.objects.filter(
+            created_at__lt=timezone.now()
+            - timedelta(seconds=settings.CACHE_BUS_RETENTION)
+        ).delete()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "last_id": self.last_id,
+            "published": self.published,
+            "received": self.received,
+        }
+
+
+invalidation_bus = InvalidationBus()
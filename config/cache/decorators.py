@@ -0,0 +1,46 @@
+import inspect
+from functools import wraps
+from typing import Callable, Iterable, Optional, Union
+
+from config.cache.tiered import TwoTierCache
+
+
+def cached(
+    key: str,
+    ttl: Union[float, Callable[[], float]],
+    tags: Iterable[str] = (),
+    stale_ttl: Union[float, Callable[[], float]] = 0,
+    cache: Optional[TwoTierCache] = None,
+) -> Callable:
+    """
+    Caches the return value of a function in the service cache.
+    key and tags are format strings of the arguments, e.g. "team-heatmap:{team.name}",
+    ttl and stale_ttl are in seconds or callables returning them (read per call so settings
+    can change), see TwoTierCache.get_or_set
+    """
+
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            from config.cache import service_cache
+
+            target = cache if cache is not None else service_cache
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = bound.arguments
+            return target.get_or_set(
+                key.format(**arguments),
+                lambda: func(*args, **kwargs),
+                ttl() if callable(ttl) else ttl,
+                [tag.format(**arguments) for tag in tags],
+                stale_ttl() if callable(stale_ttl) else stale_ttl,
+            )
+
+        wrapper.cache_key = lambda *args, **kwargs: key.format(
+            **signature.bind(*args, **kwargs).arguments
+        )
+        return wrapper
+
+    return decorator
@@ -0,0 +1,24 @@
+# Generated by Django 4.1.5 on 2026-10-20 01:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="CacheInvalidation",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("tag", models.CharField(max_length=255)),
+                ("created_at", models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                "db_table": "cache_invalidation",
+            },
+        ),
+    ]
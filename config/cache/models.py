@@ -0,0 +1,18 @@
+from django.db import models
+
+
+class CacheInvalidation(models.Model):
+    """
+    Invalidated cache tags, appended by every worker and polled by the others
+    (config.cache.bus) to drop the tags from their in-process caches
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    tag = models.CharField(max_length=255, null=False)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        db_table = "cache_invalidation"
+
+    def __str__(self) -> str:
+        return f"[{self.id}] {self.tag}"
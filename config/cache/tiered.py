@@ -0,0 +1,438 @@
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from django.conf import settings
+from django.core.cache import BaseCache, caches
+from django.db import connections, transaction
+
+from config.cache.singleflight import SingleFlight
+from config.lru_cache import LRUCache
+from config.metrics import CACHE_REQUESTS
+
+if TYPE_CHECKING:
+    from config.cache.bus import InvalidationBus
+
+logger = logging.getLogger("bistime")
+
+MISSING = object()
+
+# refreshes stale entries outside of the request cycle
+cache_refresh_executor = ThreadPoolExecutor(
+    max_workers=2, thread_name_prefix="cache-refresh"
+)
+
+
+class LocalEntry(NamedTuple):
+    value: Any
+    fresh_until: float
+    # served while refreshed in the background until then
+    stale_until: float
+    tags: Tuple[str, ...]
+    # generation of the cache when the value started to be computed
+    generation: int
+
+
+class SharedEntry(NamedTuple):
+    value: Any
+    # wall clock, the shared entry outlives the process that stored it
+    fresh_until: float
+    stale_until: float
+    # shared version of every tag when the value started to be computed
+    tag_versions: Dict[str, int]
+
+
+class TwoTierCache(object):
+    """
+    Per-worker bounded LRU (L1) in front of a Django cache backend shared by the workers
+    of a host (L2, settings.CACHES[alias]). Entries have a TTL and tags:
+    invalidate_tags() drops every entry of a tag from the local LRU and bumps the tag's
+    version in the shared backend, which retires the shared entries of older versions.
+    Called inside a transaction, it does so again once the transaction commits.
+    With a bus (config.cache.bus), the tags are also dropped from the LRUs of the other workers.
+
+    get_or_set() computes a missing key once per worker however many threads ask for it,
+    and with a stale_ttl serves an expired value for that long while a single background
+    refresh replaces it. Invalidated values are never served stale.
+    Cached values are shared between requests and must not be mutated
+    """
+
+    def __init__(
+        self,
+        name: str,
+        maxsize: int,
+        alias: Optional[str] = None,
+        bus: Optional["InvalidationBus"] = None,
+    ):
+        self.name = name
+        self.alias = alias
+        self.local = LRUCache(maxsize=maxsize)
+        self.bus = bus
+        if bus is not None:
+            bus.subscribe(lambda tags: self.invalidate_local_tags(*tags))
+
+        self._generations = itertools.count(1)
+        # tag -> generation of its last local invalidation, kept while a local entry
+        # or a computation of an older generation may need it
+        self._invalidated: Dict[str, int] = {}
+        self._prune_above = max(maxsize, 256)
+        # generations of the lookups and computations in progress
+        self._pinned: Set[int] = set()
+        # bumped by every local invalidation, requests arriving after one never join
+        # a computation started before it
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self.flight = SingleFlight()
+        # keys being refreshed in the background
+        self._refreshing: Set[str] = set()
+
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.invalidations = 0
+        self.stale_hits = 0
+        self.refreshes = 0
+
+        self._local_hit_counter = CACHE_REQUESTS.labels(f"{name}_l1", "hit")
+        self._local_miss_counter = CACHE_REQUESTS.labels(f"{name}_l1", "miss")
+        self._shared_hit_counter = CACHE_REQUESTS.labels(f"{name}_l2", "hit")
+        self._shared_miss_counter = CACHE_REQUESTS.labels(f"{name}_l2", "miss")
+
+    @property
+    def shared(self) -> Optional[BaseCache]:
+        if self.alias is None or self.alias not in settings.CACHES:
+            return None
+        return caches[self.alias]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Fresh value of the key, stale values are only served by get_or_set()
+        """
+        with self.__pinned() as generation:
+            value, stale = self.__lookup(key, generation)
+        if value is MISSING or stale:
+            self.misses += 1
+            return default
+        return value
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: float,
+        tags: Iterable[str] = (),
+        generation: Optional[int] = None,
+        tag_versions: Optional[Dict[str, int]] = None,
+        stale_ttl: float = 0,
+    ) -> None:
+        """
+        generation and tag_versions are snapshots taken before the value was computed,
+        so a value computed while one of its tags was invalidated is never served
+        """
+        tags = tuple(tags)
+        if generation is None:
+            with self.__pinned() as generation:
+                self.__set(key, value, ttl, tags, generation, tag_versions, stale_ttl)
+        else:
+            self.__set(key, value, ttl, tags, generation, tag_versions, stale_ttl)
+
+    def __set(
+        self,
+        key: str,
+        value: Any,
+        ttl: float,
+        tags: Tuple[str, ...],
+        generation: int,
+        tag_versions: Optional[Dict[str, int]],
+        stale_ttl: float,
+    ) -> None:
+        if any(self._invalidated.get(tag, 0) >= generation for tag in tags):
+            return
+
+        self.sets += 1
+        now = time.monotonic()
+        self.local.set(
+            key, LocalEntry(value, now + ttl, now + ttl + stale_ttl, tags, generation)
+        )
+
+        shared = self.shared
+        if shared is not None:
+            if tag_versions is None:
+                tag_versions = self.tag_versions(tags)
+            now = time.time()
+            shared.set(
+                self.__shared_key(key),
+                SharedEntry(value, now + ttl, now + ttl + stale_ttl, tag_versions),
+                ttl + stale_ttl,
+            )
+
+    def get_or_set(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        ttl: float,
+        tags: Iterable[str] = (),
+        stale_ttl: float = 0,
+    ) -> Any:
+        tags = tuple(tags)
+        with self.__pinned() as generation:
+            value, stale = self.__lookup(key, generation)
+            if value is not MISSING:
+                if stale:
+                    self.stale_hits += 1
+                    self.__refresh_in_background(key, compute, ttl, tags, stale_ttl)
+                return value
+
+            self.misses += 1
+            return self.flight.do(
+                (key, self._epoch),
+                lambda: self.__compute(key, compute, ttl, tags, stale_ttl, generation),
+            )
+
+    def delete(self, key: str) -> None:
+        self.local.delete(key)
+        shared = self.shared
+        if shared is not None:
+            shared.delete(self.__shared_key(key))
+
+    def invalidate_tags(self, *tags: str) -> None:
+        if not tags:
+            return
+        self.invalidations += 1
+        self.__invalidate(tags)
+
+        if self.bus is not None:
+            self.bus.publish(tags)
+
+        # reads until the commit may cache the data before the write under the new
+        # tag versions, they are retired again once it is visible
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(lambda: self.__invalidate(tags))
+
+    def __invalidate(self, tags: Tuple[str, ...]) -> None:
+        self.invalidate_local_tags(*tags)
+
+        shared = self.shared
+        if shared is not None:
+            for tag in tags:
+                tag_key = self.__tag_key(tag)
+                # add() is a no-op for existing keys, incr() is atomic in most backends
+                shared.add(tag_key, 0, None)
+                try:
+                    shared.incr(tag_key)
+                except ValueError:
+                    # evicted in between
+                    shared.set(tag_key, 1, None)
+
+    def invalidate_local_tags(self, *tags: str) -> None:
+        """
+        Drops the entries of the tags from the local LRU only
+        """
+        generation = self.generation()
+        with self._lock:
+            for tag in tags:
+                self._invalidated[tag] = generation
+            self._epoch += 1
+            if len(self._invalidated) > self._prune_above:
+                self.__prune_invalidated(generation)
+        self.local.delete_where(lambda key: self.__is_tagged(key, tags))
+
+    def tag_versions(self, tags: Iterable[str]) -> Dict[str, int]:
+        tags = tuple(tags)
+        shared = self.shared
+        if shared is None or not tags:
+            return {}
+        stored = shared.get_many([self.__tag_key(tag) for tag in tags])
+        return {tag: stored.get(self.__tag_key(tag), 0) for tag in tags}
+
+    def generation(self) -> int:
+        return next(self._generations)
+
+    def clear(self) -> None:
+        self.local.clear()
+        with self._lock:
+            self._invalidated = {}
+        shared = self.shared
+        if shared is not None:
+            shared.clear()
+
+    def reset_stats(self) -> None:
+        self.local.reset_stats()
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.invalidations = 0
+        self.stale_hits = 0
+        self.refreshes = 0
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        local = self.local.stats()
+        lookups = self.local_hits + self.shared_hits + self.misses
+        return {
+            "size": local["size"],
+            "maxsize": local["maxsize"],
+            "evictions": local["evictions"],
+            "local_hits": self.local_hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_ratio": (
+                (self.local_hits + self.shared_hits) / lookups if lookups else None
+            ),
+            "stale_hits": self.stale_hits,
+            "refreshes": self.refreshes,
+            "coalesced": self.flight.coalesced,
+            "sets": self.sets,
+            "invalidations": self.invalidations,
+            "shared_backend": self.alias if self.shared is not None else None,
+        }
+
+    def __lookup(self, key: str, generation: int) -> Tuple[Any, bool]:
+        """
+        (value, whether it is stale) of the local tier, then of the shared one
+        """
+        entry: Optional[LocalEntry] = self.local.peek(key)
+        now = time.monotonic()
+        if entry is not None and now < entry.stale_until and self.__is_valid(entry):
+            # touch the recency order
+            self.local.get(key)
+            self.local_hits += 1
+            self._local_hit_counter.inc()
+            return entry.value, now >= entry.fresh_until
+
+        if entry is not None:
+            self.local.delete(key)
+        self._local_miss_counter.inc()
+
+        shared = self.shared
+        if shared is None:
+            return MISSING, False
+
+        entry: Optional[SharedEntry] = shared.get(self.__shared_key(key))
+        now = time.time()
+        if (
+            entry is None
+            or now >= entry.stale_until
+            or self.tag_versions(entry.tag_versions) != entry.tag_versions
+        ):
+            self._shared_miss_counter.inc()
+            return MISSING, False
+
+        self.shared_hits += 1
+        self._shared_hit_counter.inc()
+        # the local copy expires with the shared entry
+        offset = time.monotonic() - now
+        self.local.set(
+            key,
+            LocalEntry(
+                entry.value,
+                entry.fresh_until + offset,
+                entry.stale_until + offset,
+                tuple(entry.tag_versions),
+                generation,
+            ),
+        )
+        return entry.value, now >= entry.fresh_until
+
+    def __compute(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        ttl: float,
+        tags: Tuple[str, ...],
+        stale_ttl: float,
+        generation: int,
+    ) -> Any:
+        tag_versions = self.tag_versions(tags) if self.shared is not None else None
+        value = compute()
+        self.set(key, value, ttl, tags, generation, tag_versions, stale_ttl)
+        return value
+
+    def __refresh_in_background(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        ttl: float,
+        tags: Tuple[str, ...],
+        stale_ttl: float,
+    ) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                with self.__pinned() as generation:
+                    self.__compute(key, compute, ttl, tags, stale_ttl, generation)
+                self.refreshes += 1
+            except Exception as e:
+                # the stale value is served until it expires, then a request computes it
+                logger.warning(f"failed to refresh {key} in the {self.name} cache: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+                connections.close_all()
+
+        cache_refresh_executor.submit(refresh)
+
+    @contextmanager
+    def __pinned(self) -> Iterator[int]:
+        """
+        New generation, the invalidations after it are kept until the block exits
+        """
+        with self._lock:
+            generation = self.generation()
+            self._pinned.add(generation)
+        try:
+            yield generation
+        finally:
+            with self._lock:
+                self._pinned.discard(generation)
+
+    def __prune_invalidated(self, generation: int) -> None:
+        """
+        Drops the invalidations older than every local entry and pinned generation,
+        nothing is checked against them anymore. Called with the lock held
+        """
+        oldest = min(
+            [generation, *self._pinned, *(e.generation for e in self.local.values())]
+        )
+        self._invalidated = {
+            tag: invalidated
+            for tag, invalidated in self._invalidated.items()
+            if invalidated >= oldest
+        }
+        # amortized, when most of them are still needed
+        self._prune_above = max(self.local.maxsize, 256, 2 * len(self._invalidated))
+
+    def __is_valid(self, entry: LocalEntry) -> bool:
+        return all(
+            self._invalidated.get(tag, 0) < entry.generation for tag in entry.tags
+        )
+
+    def __is_tagged(self, key: str, tags: Tuple[str, ...]) -> bool:
+        entry: Optional[LocalEntry] = self.local.peek(key)
+        return entry is not None and any(tag in entry.tags for tag in tags)
+
+    def __shared_key(self, key: str) -> str:
+        return f"{self.name}:{key}"
+
+    def __tag_key(self, tag: str) -> str:
+        return f"{self.name}:tag:{tag}"
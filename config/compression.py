@@ -0,0 +1,116 @@
+"""
+Compression of response bodies (config.middlewares.compression.CompressionMiddleware).
+Availability strings of 0s and 1s shrink by an order of magnitude, so JSON and text bodies
+above settings.COMPRESSION_MIN_SIZE are sent with the best encoding the client accepts:
+br when the brotli package is installed, then gzip.
+The compressed bodies of responses with an ETag are kept in a per-worker LRU, keyed by
+the full path, the ETag and the encoding, so a hot resource is compressed once per version
+"""
+import gzip
+import re
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+from config.lru_cache import LRUCache
+from config.metrics import COMPRESSION_BYTES
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# by order of preference
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+re_accept_encoding = re.compile(r"\s*([^\s;,]+)\s*(?:;\s*q=([0-9.]+))?")
+
+compressed_cache = LRUCache(
+    maxsize=settings.COMPRESSION_CACHE_SIZE, name="compressed_responses"
+)
+
+
+def accepted_encodings(accept_encoding: str) -> Dict[str, float]:
+    """
+    Quality value of every coding of an Accept-Encoding header
+    """
+    qualities = {}
+    for coding in accept_encoding.split(","):
+        match = re_accept_encoding.match(coding)
+        if match is None or not match.group(1):
+            continue
+        try:
+            qualities[match.group(1).lower()] = float(match.group(2) or 1)
+        except ValueError:
+            continue
+    return qualities
+
+
+def negotiate_encoding(
+    request, encodings: Tuple[str, ...] = ENCODINGS
+) -> Optional[str]:
+    """
+    Preferred encoding of the client among the ones offered, None for the identity
+    """
+    qualities = accepted_encodings(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    # mtime=0 keeps the bytes of a body the same across workers
+    return gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+def compress_response(request, response: HttpResponse) -> HttpResponse:
+    if (
+        response.streaming
+        or response.has_header("Content-Encoding")
+        or not response.get("Content-Type", "").startswith(COMPRESSIBLE_TYPES)
+        or len(response.content) < settings.COMPRESSION_MIN_SIZE
+    ):
+        return response
+
+    patch_vary_headers(response, ("Accept-Encoding",))
+    encoding = negotiate_encoding(request)
+    if encoding is None:
+        return response
+
+    etag = response.get("ETag")
+    key = None
+    if etag and response.status_code == 200:
+        key = (
+            request.get_full_path(),
+            response["Content-Type"],
+            etag,
+            len(response.content),
+            encoding,
+        )
+
+    compressed = compressed_cache.get(key) if key is not None else None
+    if compressed is None:
+        compressed = compress(response.content, encoding)
+        if key is not None:
+            compressed_cache.set(key, compressed)
+
+    if len(compressed) >= len(response.content):
+        return response
+
+    COMPRESSION_BYTES.labels(encoding, "original").inc(len(response.content))
+    COMPRESSION_BYTES.labels(encoding, "compressed").inc(len(compressed))
+    response.content = compressed
+    response["Content-Length"] = str(len(compressed))
+    response["Content-Encoding"] = encoding
+    if etag and not etag.startswith("W/"):
+        # the representations differ by their bytes, like GZipMiddleware does
+        response["ETag"] = f"W/{etag}"
+    return response
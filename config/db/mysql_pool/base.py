@@ -0,0 +1,40 @@
+from django.db.backends.mysql.base import DatabaseWrapper as MySQLDatabaseWrapper
+
+from config.db.pool import get_pool
+
+
+class DatabaseWrapper(MySQLDatabaseWrapper):
+    """
+    MySQL backend whose connections come from a process-wide pool shared by the threads
+    of a worker. close() hands the connection back to the pool instead of closing it,
+    so use it with CONN_MAX_AGE = 0 to return connections at the end of every request.
+    Pool options are read from DATABASES[alias]["POOL"]:
+    MAX_SIZE, TIMEOUT (seconds to wait for a free connection), RECYCLE and PING_AFTER (seconds)
+    """
+
+    def get_new_connection(self, conn_params):
+        options = self.settings_dict.get("POOL", {})
+        pool = get_pool(
+            self.alias,
+            lambda: super(DatabaseWrapper, self).get_new_connection(conn_params),
+            max_size=options.get("MAX_SIZE", 10),
+            timeout=options.get("TIMEOUT", 5),
+            recycle=options.get("RECYCLE", 3600),
+            ping_after=options.get("PING_AFTER", 30),
+        )
+        return pool.acquire()
+
+    def _close(self):
+        if self.connection is None:
+            return
+
+        pool = get_pool(self.alias, None)
+        # a connection closed inside a transaction or after an error is not handed out again
+        discard = self.in_atomic_block or (
+            self.errors_occurred and not self.is_usable()
+        )
+        if not discard and not self.get_autocommit():
+            with self.wrap_database_errors:
+                self.connection.rollback()
+
+        pool.release(self.connection, discard=discard)
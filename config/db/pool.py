@@ -0,0 +1,192 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, NamedTuple, Optional
+
+logger = logging.getLogger("bistime")
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class PooledConnection(NamedTuple):
+    connection: Any
+    created_at: float
+    released_at: float
+
+
+class ConnectionPool(object):
+    """
+    Thread-safe pool of DB-API connections shared by the threads of one process.
+    Idle connections are reused most recent first, checked with ping() once they sat idle
+    longer than ping_after, and replaced once they are older than recycle seconds
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        max_size: int = 10,
+        timeout: float = 5,
+        recycle: float = 3600,
+        ping_after: float = 30,
+    ):
+        self.connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_after = ping_after
+
+        self._idle: Deque[PooledConnection] = deque()
+        # connection id -> creation time of the connections handed out
+        self._in_use: Dict[int, float] = {}
+        self._condition = threading.Condition()
+        self._pid = os.getpid()
+
+        self.acquired = 0
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.timeouts = 0
+
+    def acquire(self) -> Any:
+        started = time.monotonic()
+        waited = False
+
+        with self._condition:
+            self.__reset_after_fork()
+            while True:
+                while self._idle:
+                    pooled = self._idle.pop()
+                    if self.__is_reusable(pooled):
+                        self._in_use[id(pooled.connection)] = pooled.created_at
+                        self.acquired += 1
+                        self.reused += 1
+                        self.__record_wait(waited, started)
+                        return pooled.connection
+                    self.__discard(pooled.connection)
+
+                if len(self._in_use) < self.max_size:
+                    # reserve the slot, the connection is opened outside the lock
+                    reservation = object()
+                    self._in_use[id(reservation)] = time.monotonic()
+                    break
+
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(
+                        f"no database connection available after {self.timeout}s "
+                        f"({self.max_size} in use)"
+                    )
+                waited = True
+                self._condition.wait(remaining)
+
+        try:
+            connection = self.connect()
+        except BaseException:
+            with self._condition:
+                self._in_use.pop(id(reservation), None)
+                self._condition.notify()
+            raise
+
+        with self._condition:
+            self._in_use[id(connection)] = self._in_use.pop(id(reservation))
+            self.acquired += 1
+            self.created += 1
+            self.__record_wait(waited, started)
+        return connection
+
+    def release(self, connection: Any, discard: bool = False) -> None:
+        with self._condition:
+            created_at = self._in_use.pop(id(connection), None)
+            if created_at is None:
+                # checked out before a fork or already released
+                return
+
+            now = time.monotonic()
+            if discard or now - created_at >= self.recycle:
+                self.__discard(connection)
+            else:
+                self._idle.append(PooledConnection(connection, created_at, now))
+            self._condition.notify()
+
+    def close_idle(self) -> None:
+        with self._condition:
+            while self._idle:
+                self.__discard(self._idle.pop().connection)
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        with self._condition:
+            return {
+                "max_size": self.max_size,
+                "size": len(self._idle) + len(self._in_use),
+                "idle": len(self._idle),
+                "in_use": len(self._in_use),
+                "acquired": self.acquired,
+                "created": self.created,
+                "reused": self.reused,
+                "discarded": self.discarded,
+                "hit_ratio": (self.reused / self.acquired) if self.acquired else None,
+                "waits": self.waits,
+                "wait_time_total": self.wait_time,
+                "wait_time_avg": (self.wait_time / self.waits) if self.waits else None,
+                "timeouts": self.timeouts,
+            }
+
+    def __is_reusable(self, pooled: PooledConnection) -> bool:
+        now = time.monotonic()
+        if now - pooled.created_at >= self.recycle:
+            return False
+        if now - pooled.released_at < self.ping_after:
+            return True
+        try:
+            pooled.connection.ping()
+        except Exception:
+            return False
+        return True
+
+    def __discard(self, connection: Any) -> None:
+        self.discarded += 1
+        try:
+            connection.close()
+        except Exception as e:
+            logger.warning(f"failed to close pooled database connection: {e}")
+
+    def __record_wait(self, waited: bool, started: float) -> None:
+        if waited:
+            self.waits += 1
+            self.wait_time += time.monotonic() - started
+
+    def __reset_after_fork(self) -> None:
+        # sockets inherited from the parent process must not be used, nor closed
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._idle.clear()
+            self._in_use.clear()
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias: str, connect: Callable[[], Any], **options) -> ConnectionPool:
+    """
+    Process-wide pool of a database alias, created on first use
+    """
+    pool = _pools.get(alias)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(alias)
+            if pool is None:
+                pool = ConnectionPool(connect, **options)
+                _pools[alias] = pool
+    return pool
+
+
+def pool_stats() -> Dict[str, Dict[str, Optional[float]]]:
+    return {alias: pool.stats() for alias, pool in _pools.items()}
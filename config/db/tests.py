@@ -0,0 +1,214 @@
+import threading
+
+import pytest
+
+from config.db import pool as pool_module
+from config.db.pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection(object):
+    def __init__(self, number: int):
+        self.number = number
+        self.closed = False
+        self.pings = 0
+        self.rollbacks = 0
+        self.alive = True
+
+    def ping(self):
+        self.pings += 1
+        if not self.alive:
+            raise OSError("server has gone away")
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnect(object):
+    def __init__(self, failures: int = 0):
+        self.connections = []
+        self.failures = failures
+
+    def __call__(self) -> FakeConnection:
+        if self.failures > 0:
+            self.failures -= 1
+            raise OSError("can't connect")
+        connection = FakeConnection(len(self.connections))
+        self.connections.append(connection)
+        return connection
+
+
+def make_pool(**options) -> ConnectionPool:
+    options.setdefault("timeout", 0.05)
+    return ConnectionPool(FakeConnect(), **options)
+
+
+class TestConnectionPool:
+    """
+    unit tests for the process-wide DB connection pool
+    """
+
+    def test_reuses_most_recently_released_first(self):
+        pool = make_pool()
+        first, second = pool.acquire(), pool.acquire()
+
+        pool.release(first)
+        pool.release(second)
+
+        assert pool.acquire() is second
+        assert pool.acquire() is first
+        stats = pool.stats()
+        assert (stats["created"], stats["reused"], stats["in_use"]) == (2, 2, 2)
+
+    def test_waits_for_a_free_connection_up_to_the_timeout(self):
+        pool = make_pool(max_size=1)
+        connection = pool.acquire()
+
+        with pytest.raises(PoolTimeout):
+            pool.acquire()
+        assert pool.stats()["timeouts"] == 1
+
+        releaser = threading.Timer(0.05, pool.release, args=[connection])
+        releaser.start()
+        pool.timeout = 5
+        assert pool.acquire() is connection
+        releaser.join()
+
+        stats = pool.stats()
+        assert stats["waits"] == 1 and stats["wait_time_total"] > 0
+        assert stats["size"] == 1
+
+    def test_failed_connect_frees_its_slot(self):
+        pool = ConnectionPool(FakeConnect(failures=1), max_size=1, timeout=0.05)
+
+        with pytest.raises(OSError):
+            pool.acquire()
+
+        assert pool.stats()["in_use"] == 0
+        assert pool.acquire().number == 0
+
+    def test_old_connections_are_recycled(self):
+        pool = make_pool(recycle=0)
+        connection = pool.acquire()
+
+        # on release
+        pool.release(connection)
+        assert connection.closed
+        assert pool.stats()["idle"] == 0
+
+        # on reuse
+        pool.recycle = 3600
+        connection = pool.acquire()
+        pool.release(connection)
+        pool.recycle = 0
+        assert pool.acquire() is not connection
+        assert connection.closed
+        assert pool.stats()["discarded"] == 2
+
+    def test_idle_connections_are_pinged(self):
+        pool = make_pool(ping_after=0)
+        connection = pool.acquire()
+        pool.release(connection)
+
+        assert pool.acquire() is connection
+        assert connection.pings == 1
+
+        connection.alive = False
+        pool.release(connection)
+        replacement = pool.acquire()
+        assert replacement is not connection
+        assert connection.closed and not replacement.closed
+
+    def test_recently_released_connections_are_not_pinged(self):
+        pool = make_pool(ping_after=30)
+        connection = pool.acquire()
+        pool.release(connection)
+
+        assert pool.acquire() is connection
+        assert connection.pings == 0
+
+    def test_release_of_unknown_connection_is_ignored(self):
+        pool = make_pool()
+        connection = pool.acquire()
+        pool.release(connection)
+        pool.release(connection)
+        pool.release(FakeConnection(99))
+
+        stats = pool.stats()
+        assert (stats["idle"], stats["in_use"], stats["discarded"]) == (1, 0, 0)
+
+    def test_connections_of_the_parent_process_are_dropped(self, monkeypatch):
+        pool = make_pool(max_size=1)
+        pool.release(pool.acquire())
+        in_use = pool.acquire()
+
+        monkeypatch.setattr(pool_module.os, "getpid", lambda: pool._pid + 1)
+        child = pool.acquire()
+
+        # the sockets belong to the parent, they are neither reused nor closed
+        assert child is not in_use
+        pool.release(in_use)
+        assert not in_use.closed
+        stats = pool.stats()
+        assert (stats["in_use"], stats["idle"]) == (1, 0)
+
+    def test_close_idle(self):
+        pool = make_pool()
+        connections = [pool.acquire() for _ in range(3)]
+        for connection in connections:
+            pool.release(connection)
+
+        pool.close_idle()
+
+        assert all(c.closed for c in connections)
+        assert pool.stats()["size"] == 0
+
+
+class TestPooledDatabaseWrapper:
+    """
+    unit tests for the pooled MySQL backend, closing connections back to the pool
+    """
+
+    @pytest.fixture
+    def wrapper(self, monkeypatch):
+        pytest.importorskip("MySQLdb")
+        from config.db.mysql_pool.base import DatabaseWrapper
+
+        pool = make_pool()
+        monkeypatch.setitem(pool_module._pools, "pooled", pool)
+        wrapper = DatabaseWrapper({"NAME": "test", "POOL": {}}, alias="pooled")
+        wrapper.connection = pool.acquire()
+        wrapper.autocommit = True
+        return wrapper, pool
+
+    def test_close_returns_the_connection(self, wrapper):
+        wrapper, pool = wrapper
+        connection = wrapper.connection
+
+        wrapper._close()
+
+        assert not connection.closed
+        assert pool.stats()["idle"] == 1
+
+    def test_close_rolls_back_outside_autocommit(self, wrapper):
+        wrapper, pool = wrapper
+        connection = wrapper.connection
+        wrapper.autocommit = False
+
+        wrapper._close()
+
+        assert connection.rollbacks == 1
+        assert pool.stats()["idle"] == 1
+
+    def test_close_inside_atomic_discards(self, wrapper):
+        wrapper, pool = wrapper
+        connection = wrapper.connection
+        wrapper.in_atomic_block = True
+
+        wrapper._close()
+
+        assert connection.closed
+        stats = pool.stats()
+        assert (stats["idle"], stats["discarded"]) == (0, 1)
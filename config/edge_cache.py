@@ -0,0 +1,96 @@
+"""
+Micro-caching of public reads in nginx (infra/nginx/configs/api_cache.conf).
+Cached views emit a surrogate key per event or team uuid and X-Accel-Expires for nginx,
+while clients are told to revalidate with the ETag of config.conditional.
+nginx only offers purging in its commercial edition, so a purge of a surrogate key
+re-fetches the paths of that key through the internal listener of nginx,
+which bypasses the cache and stores the fresh responses
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from typing import Callable, Dict, List
+
+import requests
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger("bistime")
+
+# cached paths of every surrogate key kind, query string variants expire with the TTL
+SURROGATE_KEY_PATHS: Dict[str, List[str]] = {
+    "event": [
+        "/api/events/{uuid}",
+        "/api/events/{uuid}/dates",
+        "/api/events/{uuid}/availability",
+        "/api/events/{uuid}/schedules",
+    ],
+    "team": [
+        "/api/teams/{uuid}/members",
+    ],
+}
+
+# refreshes the edge cache outside of the request cycle
+edge_cache_executor = ThreadPoolExecutor(
+    max_workers=2, thread_name_prefix="edge-cache-purge"
+)
+
+
+def surrogate_key(kind: str, uuid: str) -> str:
+    return f"{kind}-{uuid}"
+
+
+def set_cache_headers(response, key: str, private: bool = False):
+    if response.status_code not in (200, 304):
+        return response
+
+    response["Cache-Control"] = "private, no-cache" if private else "public, no-cache"
+    response["Surrogate-Key"] = key
+    # nginx honours X-Accel-Expires over Cache-Control: private, keep it off private responses
+    if settings.EDGE_CACHE_TTL > 0 and not private:
+        # read by nginx only, it takes priority over Cache-Control and is not forwarded
+        response["X-Accel-Expires"] = str(settings.EDGE_CACHE_TTL)
+    return response
+
+
+def edge_cached(kind: str, url_kwarg: str = "uuid", private: bool = False) -> Callable:
+    """
+    View decorator adding the cache headers of the resource of the url kwarg.
+    private responses are revalidated like the others but stored by no shared cache,
+    nginx included
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = view(request, *args, **kwargs)
+            return set_cache_headers(
+                response, surrogate_key(kind, kwargs.get(url_kwarg)), private
+            )
+
+        return wrapper
+
+    return decorator
+
+
+def purge_surrogate_key(kind: str, uuid: str) -> None:
+    """
+    Refreshes the cached paths of a surrogate key once the current transaction commits
+    """
+    if not settings.EDGE_CACHE_URL or not uuid:
+        return
+
+    paths = [path.format(uuid=uuid) for path in SURROGATE_KEY_PATHS[kind]]
+    transaction.on_commit(lambda: edge_cache_executor.submit(refresh_paths, paths))
+
+
+def refresh_paths(paths: List[str]) -> None:
+    for path in paths:
+        try:
+            requests.get(
+                settings.EDGE_CACHE_URL + path,
+                headers={"Accept": "application/json; version=1"},
+                timeout=settings.EDGE_CACHE_PURGE_TIMEOUT,
+            )
+        except requests.RequestException as e:
+            logger.warning(f"failed to refresh {path} in the edge cache: {e}")
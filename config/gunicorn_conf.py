@@ -0,0 +1,222 @@
+"""
+Gunicorn runtime profile for production
+
+    gunicorn config.wsgi.deploy:application -c config/gunicorn_conf.py
+
+Every value can be overridden with the GUNICORN_* environment variables below.
+Workers write their metrics to PROMETHEUS_MULTIPROC_DIR, aggregated by /metrics.
+With GUNICORN_SELF_BENCHMARK=true the master measures requests/s of the health check
+(and of GET /api/events/<GUNICORN_BENCHMARK_EVENT_UUID> if set) once the workers are up
+"""
+import http.client
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+cpu_count = multiprocessing.cpu_count()
+
+name = "bistime"
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8080")
+
+# requests mostly wait on MySQL and S3, so each worker serves several of them on threads
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+workers = int(os.environ.get("GUNICORN_WORKERS", cpu_count * 2 + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", max(2, cpu_count)))
+
+# django is imported once in the master and shared copy-on-write by the workers
+preload_app = os.environ.get("GUNICORN_PRELOAD", "true") == "true"
+
+# recycle workers to bound slow memory leaks, jitter keeps them from restarting together
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 100))
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+
+loglevel = os.environ.get("GUNICORN_LOG_LEVEL", "info")
+accesslog = "./logs/gunicorn-access.log"
+errorlog = "./logs/gunicorn-error.log"
+
+# must be set before prometheus_client is imported, config.metrics then aggregates the workers
+prometheus_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", "/tmp/bistime-prometheus"
+)
+
+self_benchmark = os.environ.get("GUNICORN_SELF_BENCHMARK", "false") == "true"
+benchmark_requests = int(os.environ.get("GUNICORN_BENCHMARK_REQUESTS", 500))
+benchmark_concurrency = int(os.environ.get("GUNICORN_BENCHMARK_CONCURRENCY", 16))
+benchmark_event_uuid = os.environ.get("GUNICORN_BENCHMARK_EVENT_UUID")
+
+
+def on_starting(server):
+    # samples of the workers of a previous run would be aggregated as well
+    shutil.rmtree(prometheus_dir, ignore_errors=True)
+    os.makedirs(prometheus_dir)
+
+    # slots of a previous run may belong to events of another database
+    from django.conf import settings
+
+    from apps.event.availability import availability_table_path
+
+    if settings.AVAILABILITY_SHM_PATH:
+        try:
+            # workers still mapping it keep reading their copy
+            os.remove(availability_table_path())
+        except FileNotFoundError:
+            pass
+
+
+def post_fork(server, worker):
+    # connections the master may have opened while preloading must not be shared
+    from django.db import connections
+
+    connections.close_all()
+
+
+def post_worker_init(worker):
+    """
+    Warm up the worker before it accepts requests: resolve the url conf,
+    check every database and build the schedule store client
+    """
+    restore_log_handlers(worker)
+
+    from django.db import connections
+    from django.urls import get_resolver
+
+    from apps.team.storage import get_schedule_store
+
+    get_resolver().url_patterns
+
+    for connection in connections.all():
+        connection.ensure_connection()
+        # connections are per thread, request threads open their own
+        connection.close()
+
+    store = get_schedule_store()
+    if hasattr(store, "s3"):
+        store.s3
+
+    worker.log.info(f"worker {worker.pid} warmed up")
+
+
+def worker_exit(server, worker):
+    from config.db.pool import pool_stats
+
+    for alias, stats in pool_stats().items():
+        worker.log.info(f"worker {worker.pid} database pool {alias}: {stats}")
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def restore_log_handlers(arbiter_or_worker):
+    # django's LOGGING configures the "gunicorn" logger, and dictConfig drops the handlers
+    # of its children (gunicorn.error, gunicorn.access) when django is set up
+    arbiter_or_worker.log.setup(arbiter_or_worker.cfg)
+
+
+def when_ready(server):
+    if preload_app:
+        restore_log_handlers(server)
+
+    if not self_benchmark:
+        return
+
+    paths = ["/health-check"]
+    if benchmark_event_uuid:
+        paths.append(f"/api/events/{benchmark_event_uuid}")
+
+    threading.Thread(
+        target=run_self_benchmark, args=(server, paths), daemon=True
+    ).start()
+
+
+def run_self_benchmark(server, paths: List[str]) -> None:
+    host, port = _benchmark_address()
+
+    if not _wait_until_serving(host, port):
+        server.log.warning("self benchmark skipped, server did not answer")
+        return
+
+    for path in paths:
+        elapsed, latencies, errors = _benchmark_path(host, port, path)
+        latencies.sort()
+        count = len(latencies)
+        p50 = latencies[len(latencies) // 2] if latencies else 0
+        p99 = latencies[int(len(latencies) * 0.99)] if latencies else 0
+        server.log.info(
+            f"self benchmark GET {path}: {count} requests, "
+            f"concurrency {benchmark_concurrency}, "
+            f"{count / elapsed:.1f} req/s, "
+            f"p50 {p50 * 1000:.1f}ms, p99 {p99 * 1000:.1f}ms, {errors} errors"
+        )
+
+
+def _benchmark_address() -> Tuple[str, int]:
+    host, _, port = bind.rpartition(":")
+    if host in ("", "0.0.0.0"):
+        host = "127.0.0.1"
+    return host, int(port)
+
+
+def _benchmark_headers() -> dict:
+    return {
+        # the bind address is in ALLOWED_HOSTS of the deploy settings, 127.0.0.1 is not
+        "Host": bind.rpartition(":")[0] or "0.0.0.0",
+        # required by config.middlewares.request_middleware for /api paths
+        "Accept": "application/json; version=1",
+    }
+
+
+def _wait_until_serving(host: str, port: int, attempts: int = 50) -> bool:
+    for _ in range(attempts):
+        try:
+            connection = http.client.HTTPConnection(host, port, timeout=2)
+            connection.request("GET", "/health-check", headers=_benchmark_headers())
+            connection.getresponse().read()
+            connection.close()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def _benchmark_path(host: str, port: int, path: str) -> Tuple[float, List[float], int]:
+    per_client = max(1, benchmark_requests // benchmark_concurrency)
+
+    def client(_) -> Tuple[List[float], int]:
+        # one keep-alive connection per simulated client
+        connection = http.client.HTTPConnection(host, port, timeout=10)
+        latencies, errors = [], 0
+        for _ in range(per_client):
+            started = time.perf_counter()
+            try:
+                connection.request("GET", path, headers=_benchmark_headers())
+                response = connection.getresponse()
+                response.read()
+                if response.status >= 400:
+                    errors += 1
+            except (OSError, http.client.HTTPException):
+                errors += 1
+                connection.close()
+                connection = http.client.HTTPConnection(host, port, timeout=10)
+            latencies.append(time.perf_counter() - started)
+        connection.close()
+        return latencies, errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=benchmark_concurrency) as executor:
+        results = list(executor.map(client, range(benchmark_concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for result in results for latency in result[0]]
+    errors = sum(result[1] for result in results)
+    return elapsed, latencies, errors
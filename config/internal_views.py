@@ -0,0 +1,78 @@
+import hmac
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpRequest, HttpResponse, JsonResponse
+
+from apps.event.availability import get_availability_table
+from config.cache import invalidation_bus, service_cache
+from config.db.pool import pool_stats
+from config.metrics import render_latest
+from config.profiling import profile_buffer
+
+
+def require_internal_token(view):
+    """
+    Internal endpoints only answer requests carrying settings.INTERNAL_STATS_TOKEN
+    in the X-Internal-Token header, and look like missing pages to anyone else
+    """
+
+    @wraps(view)
+    def wrapper(request: HttpRequest, *args, **kwargs):
+        token = settings.INTERNAL_STATS_TOKEN
+        provided = request.headers.get("X-Internal-Token", "")
+        if not token or not hmac.compare_digest(token, provided):
+            raise Http404()
+        return view(request, *args, **kwargs)
+
+    return wrapper
+
+
+@require_internal_token
+def db_pool_stats_view(request: HttpRequest) -> JsonResponse:
+    return JsonResponse(
+        {
+            "pools": pool_stats(),
+            "conn_max_age": {
+                alias: connections.settings[alias].get("CONN_MAX_AGE")
+                for alias in connections
+            },
+        }
+    )
+
+
+@require_internal_token
+def profile_list_view(request: HttpRequest) -> JsonResponse:
+    return JsonResponse(
+        {"profiles": [profile.summary() for profile in profile_buffer.list()]}
+    )
+
+
+@require_internal_token
+def profile_detail_view(request: HttpRequest, profile_id: int) -> JsonResponse:
+    profile = profile_buffer.get(profile_id)
+    if profile is None:
+        raise Http404()
+    return JsonResponse(profile.as_dict())
+
+
+@require_internal_token
+def cache_stats_view(request: HttpRequest) -> JsonResponse:
+    # counters of the worker answering the request
+    availability_table = get_availability_table()
+    return JsonResponse(
+        {
+            "service": service_cache.stats(),
+            "bus": invalidation_bus.stats(),
+            "event_availability": (
+                availability_table.stats() if availability_table else None
+            ),
+        }
+    )
+
+
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    # scraped on the app port directly, nginx does not proxy /metrics
+    body, content_type = render_latest()
+    return HttpResponse(body, content_type=content_type)
@@ -0,0 +1,101 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from config.metrics import CACHE_REQUESTS
+
+
+class LRUCache(object):
+    """
+    Thread-safe, bounded in-process LRU cache with hit / miss / eviction counters.
+    Lookups of a named cache are also counted in config.metrics
+    """
+
+    def __init__(self, maxsize: int = 128, name: Optional[str] = None):
+        self.maxsize = maxsize
+        self.name = name
+        self._hit_counter = CACHE_REQUESTS.labels(name, "hit") if name else None
+        self._miss_counter = CACHE_REQUESTS.labels(name, "miss") if name else None
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                if self._miss_counter is not None:
+                    self._miss_counter.inc()
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+        if self._hit_counter is not None:
+            self._hit_counter.inc()
+        return value
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get a value without touching the recency order or the counters
+        """
+        with self._lock:
+            return self._data.get(key, default)
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """
+        Delete every entry whose key matches the predicate, returns the number of deleted entries
+        """
+        with self._lock:
+            keys = [k for k in self._data if predicate(k)]
+            for k in keys:
+                del self._data[k]
+            return len(keys)
+
+    def values(self) -> List[Any]:
+        with self._lock:
+            return list(self._data.values())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": (self.hits / requests) if requests else None,
+            }
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
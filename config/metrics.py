@@ -0,0 +1,135 @@
+"""
+Prometheus metrics of the API, exposed on /metrics.
+Under gunicorn every worker writes its samples to PROMETHEUS_MULTIPROC_DIR
+(see config/gunicorn_conf.py) and /metrics aggregates the files of all workers
+"""
+import os
+import time
+from contextvars import ContextVar
+from typing import Callable, List, Optional, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REQUEST_LATENCY = Histogram(
+    "bistime_request_duration_seconds",
+    "Request latency by url name",
+    ["method", "view", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_DB_QUERIES = Histogram(
+    "bistime_request_db_queries",
+    "Database queries per request",
+    ["view"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 200),
+)
+REQUEST_DB_TIME = Histogram(
+    "bistime_request_db_duration_seconds",
+    "Time spent in database queries per request",
+    ["view"],
+    buckets=LATENCY_BUCKETS,
+)
+
+S3_REQUESTS = Counter(
+    "bistime_s3_requests_total",
+    "Schedule store S3 calls",
+    ["operation", "outcome"],
+)
+S3_BYTES = Counter(
+    "bistime_s3_bytes_total",
+    "Bytes sent to and received from S3",
+    ["operation", "direction"],
+)
+S3_LATENCY = Histogram(
+    "bistime_s3_request_duration_seconds",
+    "Schedule store S3 call latency",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+
+CACHE_REQUESTS = Counter(
+    "bistime_cache_requests_total",
+    "In-process cache lookups, the hit ratio is hit / (hit + miss)",
+    ["cache", "result"],
+)
+COMPRESSION_BYTES = Counter(
+    "bistime_compression_bytes_total",
+    "Bytes of the compressed responses before and after compression",
+    ["encoding", "body"],
+)
+
+# [query count, query time] of the current request, shared with sync_to_async threads
+_request_queries: ContextVar[Optional[List[float]]] = ContextVar(
+    "request_queries", default=None
+)
+
+
+def start_request() -> Tuple[List[float], object]:
+    queries = [0, 0.0]
+    return queries, _request_queries.set(queries)
+
+
+def end_request(
+    token, queries: List[float], method: str, view: str, status: int, duration: float
+) -> None:
+    _request_queries.reset(token)
+    REQUEST_LATENCY.labels(method, view, status).observe(duration)
+    REQUEST_DB_QUERIES.labels(view).observe(queries[0])
+    REQUEST_DB_TIME.labels(view).observe(queries[1])
+
+
+def count_query(execute: Callable, sql: str, params, many: bool, context):
+    """
+    Database execute wrapper, adds the query to the current request's totals
+    """
+    queries = _request_queries.get()
+    if queries is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        queries[0] += 1
+        queries[1] += time.perf_counter() - started
+
+
+def install_query_counter(connection, **kwargs) -> None:
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
+
+
+def observe_s3(
+    operation: str,
+    started: float,
+    outcome: str = "ok",
+    sent: int = 0,
+    received: int = 0,
+) -> None:
+    S3_REQUESTS.labels(operation, outcome).inc()
+    S3_LATENCY.labels(operation).observe(time.perf_counter() - started)
+    if sent:
+        S3_BYTES.labels(operation, "sent").inc(sent)
+    if received:
+        S3_BYTES.labels(operation, "received").inc(received)
+
+
+def render_latest() -> Tuple[bytes, str]:
+    """
+    Text exposition of the metrics of every worker, or of this process outside gunicorn
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
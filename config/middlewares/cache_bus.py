@@ -0,0 +1,33 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+
+from config.cache import invalidation_bus
+
+
+class CacheInvalidationMiddleware:
+    """
+    Applies the cache invalidations of the other workers (config.cache.bus)
+    before the request reads any in-process cache
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(self.get_response):
+            # same marker as django.utils.deprecation.MiddlewareMixin
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        invalidation_bus.maybe_poll()
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if invalidation_bus.enabled:
+            await sync_to_async(invalidation_bus.maybe_poll)()
+        return await self.get_response(request)
@@ -0,0 +1,27 @@
+import asyncio
+
+from config.compression import compress_response
+
+
+class CompressionMiddleware:
+    """
+    Compresses JSON and text responses with the encoding the client prefers
+    (config.compression). Keep it above the middlewares reading or writing the body
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(self.get_response):
+            # same marker as django.utils.deprecation.MiddlewareMixin
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        return compress_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return compress_response(request, await self.get_response(request))
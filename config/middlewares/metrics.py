@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from config import metrics
+
+
+class MetricsMiddleware:
+    """
+    Records the latency and the database queries of every request in config.metrics,
+    labelled with the url name of the matched route. Keep it first in MIDDLEWARE
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(self.get_response):
+            # same marker as django.utils.deprecation.MiddlewareMixin
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+        connection_created.connect(
+            metrics.install_query_counter, dispatch_uid="metrics_query_counter"
+        )
+        # connections opened before the middleware was loaded missed connection_created
+        for connection in connections.all():
+            metrics.install_query_counter(connection)
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        started = time.perf_counter()
+        queries, token = metrics.start_request()
+        response = self.get_response(request)
+        self.__record(request, response, queries, token, started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        queries, token = metrics.start_request()
+        response = await self.get_response(request)
+        self.__record(request, response, queries, token, started)
+        return response
+
+    @staticmethod
+    def __record(request, response, queries, token, started: float) -> None:
+        metrics.end_request(
+            token,
+            queries,
+            request.method,
+            MetricsMiddleware.view_name(request),
+            response.status_code,
+            time.perf_counter() - started,
+        )
+
+    @staticmethod
+    def view_name(request) -> str:
+        # unmatched paths share one label, raw paths would explode the label set
+        match = getattr(request, "resolver_match", None)
+        if match is None:
+            return "unmatched"
+        return match.url_name or match.view_name or "unnamed"
@@ -0,0 +1,78 @@
+import asyncio
+import hmac
+import random
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from config.profiling import RequestProfile, install_query_recorder, profile_buffer
+
+
+class SamplingProfilerMiddleware:
+    """
+    Profiles 1 in settings.PROFILER_SAMPLE_RATE requests, and every request carrying
+    settings.INTERNAL_STATS_TOKEN in the X-Profile header, into config.profiling.profile_buffer.
+    Sampled requests record their SQL timings and, on sync views, a cProfile summary
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(self.get_response):
+            # same marker as django.utils.deprecation.MiddlewareMixin
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+        connection_created.connect(
+            install_query_recorder, dispatch_uid="profiling_query_recorder"
+        )
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        if not self.should_profile(request):
+            return self.get_response(request)
+
+        self.__install_on_open_connections()
+        with RequestProfile(
+            request.method, request.path, use_cprofile=settings.PROFILER_CPROFILE
+        ) as profile:
+            response = self.get_response(request)
+
+        profile.status_code = response.status_code
+        profile_buffer.add(profile)
+        return response
+
+    async def __acall__(self, request):
+        if not self.should_profile(request):
+            return await self.get_response(request)
+
+        # tasks of other requests run on the same thread, cProfile would mix them up
+        with RequestProfile(request.method, request.path) as profile:
+            response = await self.get_response(request)
+
+        profile.status_code = response.status_code
+        profile_buffer.add(profile)
+        return response
+
+    @staticmethod
+    def should_profile(request) -> bool:
+        if request.path.startswith("/api/internal"):
+            return False
+
+        token = settings.INTERNAL_STATS_TOKEN
+        provided = request.headers.get("X-Profile")
+        if token and provided and hmac.compare_digest(token, provided):
+            return True
+
+        rate = settings.PROFILER_SAMPLE_RATE
+        return rate > 0 and random.random() * rate < 1
+
+    @staticmethod
+    def __install_on_open_connections() -> None:
+        # connections opened before the middleware was loaded missed connection_created
+        for connection in connections.all():
+            install_query_recorder(connection)
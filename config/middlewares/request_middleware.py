@@ -29,6 +29,9 @@ class RequestMiddleware:
         return response
 
     def process_request(self, request):
+        if request.path in ("/health-check", "/metrics"):
+            return
+
         if not settings.DEBUG:
             # deployment environment
             if "api" not in request.path:
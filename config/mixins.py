@@ -1,8 +1,13 @@
-from typing import Union
+from typing import FrozenSet, Optional, Union
 
 from django.db import models
+from django.db.models import F
+from django.utils import timezone
+from djangorestframework_camel_case.util import camel_to_underscore
 from rest_framework.exceptions import ValidationError
 
+from config.exceptions import InvalidInputException
+
 
 class TimeStampMixin(models.Model):
     """
@@ -16,6 +21,27 @@ class TimeStampMixin(models.Model):
         abstract = True
 
 
+class ContentVersionMixin(models.Model):
+    """
+    Abstract version of the content served with a model that is stored in other rows
+    (schedules, members, subgroups) and does not show in updated_at.
+    Services bump it when that content changes, conditional GETs are validated with it
+    """
+
+    content_version = models.PositiveBigIntegerField(default=0)
+    content_updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def bump_content_version(cls, **filters) -> int:
+        return cls.objects.filter(**filters).update(
+            content_version=F("content_version") + 1,
+            content_updated_at=timezone.now(),
+        )
+
+
 class TimeBlockMixin(models.Model):
     """
     Sets the start time and end time
@@ -59,3 +85,68 @@ class TimeBlockMixin(models.Model):
         if start_time and end_time:
             if int(end_time.split(":")[0]) - int(start_time.split(":")[0]) < 0:
                 raise ValidationError("end_time should be larger than start_time")
+
+    @staticmethod
+    def time_to_slot(time_exp: str) -> int:
+        """
+        Index of the 30-minute slot starting at 'HH:MM' (00:00 -> 0, 24:00 -> 48)
+        """
+        hours, minutes = time_exp.split(":")
+        return int(hours) * 2 + (1 if minutes == "30" else 0)
+
+    @staticmethod
+    def slot_to_time(slot: int) -> str:
+        return f"{slot // 2:02d}:{'30' if slot % 2 else '00'}"
+
+
+class SparseFieldsetMixin(object):
+    """
+    Serializer mixin rendering only the fields selected by the fields / omit query parameters
+    of the request (comma separated, camelCase or snake_case), e.g. ?omit=availability.
+    The other fields are skipped before their values are read, so the SerializerMethodFields
+    left out are not computed. Input fields are not affected
+    """
+
+    @property
+    def _readable_fields(self):
+        selected = self.selected_fields
+        for field in super()._readable_fields:
+            if selected is None or field.field_name in selected:
+                yield field
+
+    @property
+    def selected_fields(self) -> Optional[FrozenSet[str]]:
+        """
+        Names of the fields to render, None for all of them
+        """
+        if not hasattr(self, "_selected_fields"):
+            self._selected_fields = self.__select_fields()
+        return self._selected_fields
+
+    def __select_fields(self) -> Optional[FrozenSet[str]]:
+        request = self.context.get("request")
+        # nested serializers render what their parent selected
+        if request is None or self.root not in (self, self.parent):
+            return None
+
+        params = getattr(request, "query_params", request.GET)
+        fields = self.__parse(params.get("fields"))
+        omit = self.__parse(params.get("omit"))
+        if fields is None and omit is None:
+            return None
+
+        names = set(self.fields)
+        unknown = ((fields or set()) | (omit or set())) - names
+        if unknown:
+            raise InvalidInputException(f"unknown fields: {', '.join(sorted(unknown))}")
+        return frozenset((names if fields is None else fields) - (omit or set()))
+
+    @staticmethod
+    def __parse(value: Optional[str]) -> Optional[set]:
+        if value is None:
+            return None
+        return {
+            camel_to_underscore(name.strip())
+            for name in value.split(",")
+            if name.strip()
+        }
@@ -0,0 +1,201 @@
+"""
+Sampled request profiling (see config.middlewares.profiling).
+Profiles are kept in a bounded in-memory ring buffer per process
+"""
+import cProfile
+import io
+import itertools
+import pstats
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+_current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar(
+    "current_profile", default=None
+)
+_profile_ids = itertools.count(1)
+
+
+class RequestProfile(object):
+    def __init__(self, method: str, path: str, use_cprofile: bool = False):
+        self.id = next(_profile_ids)
+        self.method = method
+        self.path = path
+        self.started_at = timezone.now()
+        self.status_code: Optional[int] = None
+        self.duration = 0.0
+        self.queries: List[Dict[str, Any]] = []
+        self.query_count = 0
+        self.query_time = 0.0
+        self.sections: List[Dict[str, Any]] = []
+        self.stats: Optional[str] = None
+
+        self._lock = threading.Lock()
+        self._started = 0.0
+        self._token = None
+        self._profiler = cProfile.Profile() if use_cprofile else None
+
+    def __enter__(self) -> "RequestProfile":
+        self._token = _current_profile.set(self)
+        self._started = time.perf_counter()
+        if self._profiler is not None:
+            try:
+                self._profiler.enable()
+            except ValueError:
+                # another profiler is active on this thread
+                self._profiler = None
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self._profiler is not None:
+            self._profiler.disable()
+            self.stats = self.__format_stats(self._profiler)
+        self.duration = time.perf_counter() - self._started
+        _current_profile.reset(self._token)
+
+    def add_query(self, sql: str, duration: float, many: bool) -> None:
+        # queries of sync_to_async threads land here as well
+        with self._lock:
+            self.query_count += 1
+            self.query_time += duration
+            if len(self.queries) < settings.PROFILER_MAX_QUERIES:
+                self.queries.append(
+                    {
+                        "sql": sql[:1000],
+                        "duration_ms": round(duration * 1000, 3),
+                        "many": many,
+                    }
+                )
+
+    def add_section(self, name: str, duration: float) -> None:
+        with self._lock:
+            self.sections.append(
+                {"name": name, "duration_ms": round(duration * 1000, 3)}
+            )
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status_code": self.status_code,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(self.duration * 1000, 3),
+            "query_count": self.query_count,
+            "query_time_ms": round(self.query_time * 1000, 3),
+        }
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            **self.summary(),
+            "sections": self.sections,
+            "queries": self.queries,
+            "stats": self.stats,
+        }
+
+    @staticmethod
+    def __format_stats(profiler: cProfile.Profile) -> str:
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(
+            settings.PROFILER_TOP_FUNCTIONS
+        )
+        return stream.getvalue()
+
+
+class ProfileBuffer(object):
+    """
+    Thread-safe ring buffer keeping the most recent profiles
+    """
+
+    def __init__(self, maxlen: int):
+        self._profiles: Deque[RequestProfile] = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def add(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._profiles.append(profile)
+
+    def list(self) -> List[RequestProfile]:
+        with self._lock:
+            return list(reversed(self._profiles))
+
+    def get(self, profile_id: int) -> Optional[RequestProfile]:
+        with self._lock:
+            for profile in self._profiles:
+                if profile.id == profile_id:
+                    return profile
+        return None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._profiles.clear()
+
+
+profile_buffer = ProfileBuffer(maxlen=settings.PROFILER_BUFFER_SIZE)
+
+
+def current_profile() -> Optional[RequestProfile]:
+    return _current_profile.get()
+
+
+def record_query(execute: Callable, sql: str, params, many: bool, context):
+    """
+    Database execute wrapper, times queries of the profiled request and is a no-op otherwise
+    """
+    profile = _current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.add_query(sql, time.perf_counter() - started, many)
+
+
+def install_query_recorder(connection, **kwargs) -> None:
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class profile_section(object):
+    """
+    Times a block or a function as a named section of the current profile,
+    in place of silk's silk_profile. Costs nothing when the request is not sampled
+
+        @profile_section("availability")
+        def get_availability(...): ...
+
+        with profile_section("decode schedules"):
+            ...
+    """
+
+    def __init__(self, name: str = None):
+        self.name = name
+        self._started: List[float] = []
+
+    def __enter__(self) -> "profile_section":
+        self._started.append(time.perf_counter())
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        started = self._started.pop()
+        profile = _current_profile.get()
+        if profile is not None:
+            profile.add_section(self.name, time.perf_counter() - started)
+
+    def __call__(self, func: Callable) -> Callable:
+        name = self.name or func.__qualname__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with profile_section(name):
+                return func(*args, **kwargs)
+
+        return wrapper
@@ -1,17 +1,20 @@
 import os
 
 import boto3
+from botocore.credentials import Credentials
 from dotenv import load_dotenv
 
 load_dotenv()
 
+S3_REGION_NAME = "ap-northeast-2"
+
 
 def s3_client_connection():
     try:
         # s3 클라이언트 생성
         s3 = boto3.client(
             service_name="s3",
-            region_name="ap-northeast-2",
+            region_name=S3_REGION_NAME,
             aws_access_key_id=os.environ.get("S3_USER_ACCESS_KEY"),
             aws_secret_access_key=os.environ.get("S3_USER_SECRET_KEY"),
         )
@@ -30,3 +33,11 @@ def s3_bucket():
     )
     bucket = s3.Bucket(os.environ.get("S3_BUCKET_NAME"))
     return bucket
+
+
+def s3_credentials() -> Credentials:
+    # used to sign requests that do not go through boto3 (async schedule store)
+    return Credentials(
+        access_key=os.environ.get("S3_USER_ACCESS_KEY"),
+        secret_key=os.environ.get("S3_USER_SECRET_KEY"),
+    )
@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/4.1/ref/settings/
 from pathlib import Path
 import os
 import sys
+import tempfile
 from dotenv import load_dotenv
 from corsheaders.defaults import default_headers
 
@@ -40,7 +41,7 @@ ALLOWED_HOSTS = ["13.125.196.243", "api.bistime.app", "bistime.app", "0.0.0.0"]
 
 # Application definition
 
-BISTIME_APPS = ["apps.event", "apps.team", "apps.feedback"]
+BISTIME_APPS = ["apps.event", "apps.team", "apps.feedback", "config.cache"]
 
 THIRD_PARTY_APPS = [
     "rest_framework",
@@ -48,7 +49,6 @@ THIRD_PARTY_APPS = [
     "django_filters",
     "django_extensions",
     "corsheaders",
-    "silk",
 ]
 
 DJANGO_CORE_APPS = [
@@ -63,6 +63,8 @@ DJANGO_CORE_APPS = [
 INSTALLED_APPS = DJANGO_CORE_APPS + THIRD_PARTY_APPS + BISTIME_APPS
 
 MIDDLEWARE = [
+    "config.middlewares.metrics.MetricsMiddleware",
+    "config.middlewares.compression.CompressionMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -71,11 +73,20 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
-    "silk.middleware.SilkyMiddleware",
+    "config.middlewares.profiling.SamplingProfilerMiddleware",
+    "config.middlewares.cache_bus.CacheInvalidationMiddleware",
     "config.middlewares.add_headers.AddHeaders",
     "config.middlewares.request_middleware.RequestMiddleware",
 ]
 
+# Response compression (config.compression): JSON and text bodies of COMPRESSION_MIN_SIZE bytes
+# and more, with br when the brotli package is installed, otherwise gzip. The compressed
+# bodies of responses with an ETag are kept in a per-worker LRU of COMPRESSION_CACHE_SIZE entries
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", 1024))
+COMPRESSION_GZIP_LEVEL = int(os.environ.get("COMPRESSION_GZIP_LEVEL", 6))
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get("COMPRESSION_BROTLI_QUALITY", 5))
+COMPRESSION_CACHE_SIZE = int(os.environ.get("COMPRESSION_CACHE_SIZE", 256))
+
 # CORS
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -143,15 +154,33 @@ APPEND_SLASH = False
 # Database
 # https://docs.djangoproject.com/en/4.1/ref/settings/#databases
 
+# with DB_POOL_ENABLED, the threads of a worker share a pool of connections (config.db.mysql_pool)
+# and hand them back at the end of every request. Otherwise each thread keeps its own
+# connection open for DB_CONN_MAX_AGE seconds
+DB_POOL_ENABLED = os.environ.get("DB_POOL_ENABLED", "false") == "true"
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.mysql",
+        "ENGINE": "config.db.mysql_pool"
+        if DB_POOL_ENABLED
+        else "django.db.backends.mysql",
         "NAME": os.environ.get("DB_NAME"),
         "USER": os.environ.get("DB_USER"),
         "PASSWORD": os.environ.get("DB_PASSWORD"),
         "HOST": os.environ.get("DB_HOST"),
         "PORT": 3306,
         "OPTIONS": {"init_command": "SET sql_mode=STRICT_TRANS_TABLES"},
+        "CONN_MAX_AGE": 0
+        if DB_POOL_ENABLED
+        else int(os.environ.get("DB_CONN_MAX_AGE", 60)),
+        # persistent connections are pinged before being reused by a new request
+        "CONN_HEALTH_CHECKS": True,
+        "POOL": {
+            "MAX_SIZE": int(os.environ.get("DB_POOL_MAX_SIZE", 10)),
+            "TIMEOUT": int(os.environ.get("DB_POOL_TIMEOUT", 5)),
+            "RECYCLE": int(os.environ.get("DB_POOL_RECYCLE", 3600)),
+            "PING_AFTER": int(os.environ.get("DB_POOL_PING_AFTER", 30)),
+        },
     }
 }
 
@@ -187,6 +216,125 @@ AWS_S3_OBJECT_PARAMETERS = {
     "CacheControl": "max-age=86400",
 }
 
+# Team member week schedules
+# bounded in-process cache of decoded schedules, revalidated against S3 ETag after TTL (seconds)
+MEMBER_SCHEDULE_CACHE_SIZE = int(os.environ.get("MEMBER_SCHEDULE_CACHE_SIZE", 2048))
+MEMBER_SCHEDULE_CACHE_TTL = int(os.environ.get("MEMBER_SCHEDULE_CACHE_TTL", 30))
+# aggregated availability heatmaps per team (seconds in the service cache)
+TEAM_HEATMAP_CACHE_TTL = int(os.environ.get("TEAM_HEATMAP_CACHE_TTL", 30))
+# then served while recomputed in the background
+TEAM_HEATMAP_STALE_TTL = int(os.environ.get("TEAM_HEATMAP_STALE_TTL", 60))
+# weekly occupancy masks compiled from team regular events
+TEAM_OCCUPANCY_CACHE_TTL = int(os.environ.get("TEAM_OCCUPANCY_CACHE_TTL", 30))
+# identity of events (id, team, time range) resolved by schedule writes, dropped on event updates
+EVENT_IDENTITY_CACHE_TTL = int(os.environ.get("EVENT_IDENTITY_CACHE_TTL", 3600))
+# pre-rendered bodies of event details (config.snapshots), versioned by their ETag, 0 disables them
+SNAPSHOT_TTL = int(os.environ.get("SNAPSHOT_TTL", 3600))
+# delta sync of the schedules of an event (ScheduleView ?since=): changes are re-read for
+# SCHEDULE_SYNC_COMMIT_WINDOW seconds before the cursor in case they committed late,
+# deletions are kept SCHEDULE_TOMBSTONE_RETENTION seconds, older cursors get every schedule
+SCHEDULE_SYNC_COMMIT_WINDOW = 5
+SCHEDULE_TOMBSTONE_RETENTION = int(
+    os.environ.get("SCHEDULE_TOMBSTONE_RETENTION", 7 * 24 * 3600)
+)
+# live availability of events (apps.event.stream, ASGI only): writes within SSE_DEBOUNCE seconds
+# are pushed together, idle streams get a comment every SSE_HEARTBEAT seconds, and a stream
+# more than SSE_QUEUE_SIZE messages behind gets the current state instead
+SSE_DEBOUNCE = float(os.environ.get("SSE_DEBOUNCE", 0.5))
+SSE_HEARTBEAT = 15
+SSE_QUEUE_SIZE = 16
+SSE_RETRY_MS = 3000
+# aggregated availability of events in a file mapped by every worker of the host
+# (apps.event.availability), suffixed with its slots and max dates, empty disables it.
+# Events with more dates are not stored
+AVAILABILITY_SHM_PATH = os.environ.get(
+    "AVAILABILITY_SHM_PATH",
+    "/dev/shm/bistime-availability"
+    if os.path.isdir("/dev/shm")
+    else os.path.join(tempfile.gettempdir(), "bistime-availability"),
+)
+AVAILABILITY_SHM_SLOTS = int(os.environ.get("AVAILABILITY_SHM_SLOTS", 2048))
+AVAILABILITY_SHM_MAX_DATES = int(os.environ.get("AVAILABILITY_SHM_MAX_DATES", 31))
+
+# Service layer cache (config.cache): per-worker LRU of SERVICE_CACHE_SIZE entries in front of
+# a backend shared by the workers: 'file', 'db' (manage.py createcachetable), 'locmem', 'none'
+# or the dotted path of a Django cache backend, SERVICE_CACHE_LOCATION is passed to the backend
+SERVICE_CACHE_SIZE = int(os.environ.get("SERVICE_CACHE_SIZE", 1024))
+SERVICE_CACHE_BACKEND = os.environ.get("SERVICE_CACHE_BACKEND", "file")
+SERVICE_CACHE_BACKENDS = {
+    "file": (
+        "django.core.cache.backends.filebased.FileBasedCache",
+        str(BASE_DIR / ".cache" / "service"),
+    ),
+    "db": ("django.core.cache.backends.db.DatabaseCache", "service_cache"),
+    "locmem": ("django.core.cache.backends.locmem.LocMemCache", "service"),
+}
+
+CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+if SERVICE_CACHE_BACKEND != "none":
+    _backend, _location = SERVICE_CACHE_BACKENDS.get(
+        SERVICE_CACHE_BACKEND, (SERVICE_CACHE_BACKEND, "")
+    )
+    CACHES["service"] = {
+        "BACKEND": _backend,
+        "LOCATION": os.environ.get("SERVICE_CACHE_LOCATION", _location),
+        "TIMEOUT": None,
+        "OPTIONS": {"MAX_ENTRIES": 10_000},
+    }
+
+# Cross-worker invalidation of the in-process caches (config.cache.bus): seconds between
+# polls of the cache_invalidation table by a worker, 0 disables the bus (single process).
+# Rows are kept CACHE_BUS_RETENTION seconds and re-read for CACHE_BUS_COMMIT_WINDOW seconds
+# in case they commit after rows with higher ids
+CACHE_BUS_POLL_INTERVAL = float(os.environ.get("CACHE_BUS_POLL_INTERVAL", 1))
+CACHE_BUS_COMMIT_WINDOW = 5
+CACHE_BUS_RETENTION = 3600
+CACHE_BUS_PRUNE_EVERY = 100
+
+# token for the internal stats endpoints (X-Internal-Token header), they answer 404 without it
+INTERNAL_STATS_TOKEN = os.environ.get("INTERNAL_STATS_TOKEN")
+
+# Sampled request profiling (config.middlewares.profiling), 1 in PROFILER_SAMPLE_RATE requests
+# and every request with INTERNAL_STATS_TOKEN in the X-Profile header, 0 disables sampling
+PROFILER_SAMPLE_RATE = int(os.environ.get("PROFILER_SAMPLE_RATE", 100))
+PROFILER_BUFFER_SIZE = int(os.environ.get("PROFILER_BUFFER_SIZE", 200))
+PROFILER_CPROFILE = os.environ.get("PROFILER_CPROFILE", "true") == "true"
+PROFILER_MAX_QUERIES = 200
+PROFILER_TOP_FUNCTIONS = 30
+
+# nginx micro-cache of event and team reads (config.edge_cache): seconds nginx keeps them,
+# and the internal nginx listener re-fetching purged paths, empty disables purges
+EDGE_CACHE_TTL = int(os.environ.get("EDGE_CACHE_TTL", 5))
+EDGE_CACHE_URL = os.environ.get("EDGE_CACHE_URL", "")
+EDGE_CACHE_PURGE_TIMEOUT = 2
+
+# Schedule storage backend (apps.team.storage): 's3', 'filesystem', 'memory' or a dotted path
+SCHEDULE_STORE_BACKEND = os.environ.get("SCHEDULE_STORE_BACKEND", "s3")
+# root directory of the filesystem backend
+SCHEDULE_STORE_ROOT = os.environ.get("SCHEDULE_STORE_ROOT", str(BASE_DIR / "schedules"))
+# number of parallel s3 requests for batched schedule reads, writes and deletes
+S3_MAX_WORKERS = int(os.environ.get("S3_MAX_WORKERS", 8))
+# connection pool size and request timeout (seconds) of the async s3 client, per event loop
+S3_ASYNC_MAX_CONNECTIONS = int(os.environ.get("S3_ASYNC_MAX_CONNECTIONS", 64))
+S3_ASYNC_TIMEOUT = int(os.environ.get("S3_ASYNC_TIMEOUT", 10))
+# serve the team member endpoints with async views (set by config.asgi)
+ASYNC_TEAM_VIEWS = os.environ.get("BISTIME_ASYNC_VIEWS", "false") == "true"
+# serve the event detail, availability and schedule list reads with async views (set by config.asgi)
+ASYNC_EVENT_VIEWS = os.environ.get("BISTIME_ASYNC_VIEWS", "false") == "true"
+
+# Write-behind outbox for schedule uploads (apps.team.outbox)
+# with AUTODRAIN, each process drains the outbox in a background thread after commit
+SCHEDULE_OUTBOX_AUTODRAIN = (
+    os.environ.get("SCHEDULE_OUTBOX_AUTODRAIN", "true") == "true"
+)
+SCHEDULE_OUTBOX_BATCH_SIZE = 50
+SCHEDULE_OUTBOX_CONCURRENCY = 8
+SCHEDULE_OUTBOX_MAX_ATTEMPTS = 8
+SCHEDULE_OUTBOX_BASE_BACKOFF = 2  # seconds
+SCHEDULE_OUTBOX_MAX_BACKOFF = 300  # seconds
+SCHEDULE_OUTBOX_LEASE_SECONDS = 60
+SCHEDULE_OUTBOX_POLL_INTERVAL = 5  # seconds
+
 # s3 static settings
 STATIC_URL = f"https://{AWS_S3_CUSTOM_DOMAIN}/{AWS_LOCATION}/"
 STATICFILES_STORAGE = "storages.backends.s3boto3.S3Boto3Storage"  # s3 media settings
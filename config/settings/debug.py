@@ -2,3 +2,23 @@ from .base import *
 
 DEBUG = True
 ALLOWED_HOSTS = ["*"]
+
+# silk records every request locally, sampled profiling is left to explicit X-Profile requests
+INSTALLED_APPS += ["silk"]
+MIDDLEWARE.insert(
+    MIDDLEWARE.index("config.middlewares.profiling.SamplingProfilerMiddleware"),
+    "silk.middleware.SilkyMiddleware",
+)
+PROFILER_SAMPLE_RATE = 0
+
+# the shared tier of the service cache lives in the process
+SERVICE_CACHE_BACKEND = "locmem"
+CACHES["service"] = {
+    "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    "LOCATION": "service",
+    "TIMEOUT": None,
+}
+
+# runserver is a single process, there is nothing to share across workers
+CACHE_BUS_POLL_INTERVAL = 0
+AVAILABILITY_SHM_PATH = ""
@@ -0,0 +1,135 @@
+"""
+Pre-rendered JSON bodies of detail responses, stored in the service cache with their
+compressed variants (config.compression).
+A snapshot is keyed by the ETag of the content version of its instance (config.conditional),
+so a write retires every snapshot of the instance without an invalidation, and a GET
+matching one is answered with its bytes without running the serializers or the renderers.
+Services render the snapshot of an instance in the background once its writes committed,
+a GET missing it is rendered live and stores its bytes
+"""
+from functools import wraps
+from typing import Any, Callable, Dict, NamedTuple, Optional, Type
+
+from django.conf import settings
+from django.db import models
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from djangorestframework_camel_case.render import CamelCaseJSONRenderer
+from rest_framework import status
+from rest_framework.response import Response
+
+from config.cache import service_cache
+from config.compression import ENCODINGS, compress, negotiate_encoding
+from config.conditional import ContentVersion, get_content_version
+from config.metrics import CACHE_REQUESTS
+
+_hit_counter = CACHE_REQUESTS.labels("snapshot", "hit")
+_miss_counter = CACHE_REQUESTS.labels("snapshot", "miss")
+
+
+class Snapshot(NamedTuple):
+    body: bytes
+    # encoding -> compressed body, for the encodings making the body smaller
+    encoded: Dict[str, bytes]
+
+
+def snapshot_key(kind: str, uuid: str, version: ContentVersion) -> str:
+    return f"{kind}-snapshot:{uuid}:{version.etag}"
+
+
+def render_snapshot(data: Any) -> bytes:
+    return CamelCaseJSONRenderer().render(data)
+
+
+def store_snapshot(kind: str, uuid: str, version: ContentVersion, body: bytes) -> None:
+    """
+    Stores the rendered body of the instance, read after its content version
+    """
+    if settings.SNAPSHOT_TTL <= 0:
+        return
+    encoded = {}
+    if len(body) >= settings.COMPRESSION_MIN_SIZE:
+        for encoding in ENCODINGS:
+            compressed = compress(body, encoding)
+            if len(compressed) < len(body):
+                encoded[encoding] = compressed
+    service_cache.set(
+        snapshot_key(kind, uuid, version),
+        Snapshot(body, encoded),
+        settings.SNAPSHOT_TTL,
+    )
+
+
+def get_snapshot(kind: str, uuid: str, version: ContentVersion) -> Optional[Snapshot]:
+    snapshot = service_cache.get(snapshot_key(kind, uuid, version))
+    if snapshot is None:
+        _miss_counter.inc()
+    else:
+        _hit_counter.inc()
+    return snapshot
+
+
+def snapshot_response(
+    request, snapshot: Snapshot, version: ContentVersion
+) -> HttpResponse:
+    encoding = negotiate_encoding(request, tuple(snapshot.encoded))
+    if encoding is not None:
+        response = HttpResponse(
+            snapshot.encoded[encoding], content_type="application/json"
+        )
+        response["Content-Encoding"] = encoding
+        # the representations differ by their bytes, like GZipMiddleware does
+        response["ETag"] = f"W/{version.etag}"
+    else:
+        response = HttpResponse(snapshot.body, content_type="application/json")
+    patch_vary_headers(response, ("Accept-Encoding",))
+    return response
+
+
+def serve_snapshot(
+    kind: str,
+    model: Type[models.Model],
+    lookup_field: str = "uuid",
+    url_kwarg: str = "uuid",
+) -> Callable:
+    """
+    Decorator of the GET handler of a DRF detail view serving the snapshot of the instance
+    matching the url kwarg. Requests with a query string, or negotiating another renderer,
+    and missing instances are left to the view
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            uuid = kwargs.get(url_kwarg)
+            if (
+                settings.SNAPSHOT_TTL <= 0
+                or request.GET
+                or not isinstance(request.accepted_renderer, CamelCaseJSONRenderer)
+            ):
+                return view(request, *args, **kwargs)
+
+            version = get_content_version(request, model, lookup_field, uuid)
+            if version is None:
+                return view(request, *args, **kwargs)
+
+            snapshot = get_snapshot(kind, uuid, version)
+            if snapshot is not None:
+                return snapshot_response(request, snapshot, version)
+
+            response = view(request, *args, **kwargs)
+            if (
+                isinstance(response, Response)
+                and response.status_code == status.HTTP_200_OK
+            ):
+                patch_vary_headers(response, ("Accept-Encoding",))
+                response.add_post_render_callback(
+                    lambda rendered: store_snapshot(
+                        kind, uuid, version, rendered.content
+                    )
+                )
+            return response
+
+        return wrapper
+
+    return decorator
@@ -17,6 +17,8 @@ from django.http import HttpResponse
 from django.urls import path, include, re_path
 from django.conf import settings
 
+from config.internal_views import metrics_view
+
 
 def health_check_view(request):
     return HttpResponse(status=200)
@@ -24,6 +26,7 @@ def health_check_view(request):
 
 urlpatterns = [
     path("health-check", health_check_view, name="health-check"),
+    path("metrics", metrics_view, name="metrics"),
     re_path(r"^api/", include("config.urls_v1")),
 ]
 
@@ -22,6 +22,13 @@ from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.decorators import api_view
 
+from config.internal_views import (
+    cache_stats_view,
+    db_pool_stats_view,
+    profile_list_view,
+    profile_detail_view,
+)
+
 api_info = openapi.Info(
     title="BisTime - API Doc",
     default_version="v1",
@@ -51,6 +58,14 @@ urlpatterns = [
     path("teams", include("apps.team.urls")),
     path("feedbacks", include("apps.feedback.urls")),
     path("api-auth", include("rest_framework.urls")),
+    path("internal/db-pool", db_pool_stats_view, name="internal-db-pool"),
+    path("internal/cache", cache_stats_view, name="internal-cache"),
+    path("internal/profiles", profile_list_view, name="internal-profiles"),
+    path(
+        "internal/profiles/<int:profile_id>",
+        profile_detail_view,
+        name="internal-profile-detail",
+    ),
 ]
 
 urlpatterns += [
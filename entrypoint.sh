@@ -12,13 +12,8 @@ export DJANGO_SETTINGS_MODULE=config.settings.deploy
 
 cd /home/bistime
 python3 manage.py migrate || exit 1
+python3 manage.py createcachetable || exit 1
 
 exec gunicorn config.wsgi.deploy:application \
-    --name bistime \
-    --bind 0.0.0.0:8080 \
-    --workers 1 \
-    --log-level=debug \
-    --log-file=./logs/gunicorn.log \
-    --access-logfile=./logs/gunicorn-access.log \
-    --error-logfile=./logs/gunicorn-error.log \
+    -c config/gunicorn_conf.py \
 "$@"
\ No newline at end of file
@@ -0,0 +1,114 @@
+"""
+Throughput and latency of the event read endpoints under concurrent connections,
+served by the DRF views (WSGI) and by apps.event.async_views (ASGI).
+Start both stacks against the same database, e.g.
+
+    gunicorn config.wsgi:application -w 2 --threads 8 -b :8000
+    gunicorn config.asgi:application -w 2 -k uvicorn.workers.UvicornWorker -b :8001
+
+    python utils/async_views_benchmark.py --event <uuid> \
+        [--wsgi http://localhost:8000] [--asgi http://localhost:8001] \
+        [--connections 16,64,256] [--duration 10] [--live]
+
+--live adds a query string, so detail and availability skip the snapshots and run
+the serializers as the first GET after a write does
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Dict, List, NamedTuple
+
+import aiohttp
+
+PATHS: Dict[str, str] = {
+    "detail": "/api/events/{uuid}",
+    "availability": "/api/events/{uuid}/availability",
+    "schedules": "/api/events/{uuid}/schedules",
+}
+
+
+class Result(NamedTuple):
+    requests: int
+    errors: int
+    latencies: List[float]
+    elapsed: float
+
+    @property
+    def throughput(self) -> float:
+        return self.requests / self.elapsed
+
+    def percentile(self, p: float) -> float:
+        if not self.latencies:
+            return 0.0
+        latencies = sorted(self.latencies)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+
+
+async def run(url: str, connections: int, duration: float) -> Result:
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(session: aiohttp.ClientSession) -> None:
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                async with session.get(
+                    url, headers={"Accept": "application/json; version=1"}
+                ) as response:
+                    await response.read()
+                    if response.status != 200:
+                        errors += 1
+                        continue
+            except aiohttp.ClientError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    connector = aiohttp.TCPConnector(limit=connections)
+    timeout = aiohttp.ClientTimeout(total=30)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(session) for _ in range(connections)))
+        elapsed = time.perf_counter() - started
+    return Result(len(latencies), errors, latencies, elapsed)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--event", required=True, help="uuid of an event with schedules"
+    )
+    parser.add_argument("--wsgi", default="http://localhost:8000")
+    parser.add_argument("--asgi", default="http://localhost:8001")
+    parser.add_argument("--connections", default="16,64,256")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--live", action="store_true")
+    args = parser.parse_args()
+
+    stacks = {"wsgi": args.wsgi, "asgi": args.asgi}
+    query = "?live=1" if args.live else ""
+
+    print(
+        f"{'endpoint':<13} {'conns':>6} {'stack':<5} {'req/s':>9} "
+        f"{'p50':>9} {'p99':>9} {'mean':>9} {'errors':>7}"
+    )
+    for name, path in PATHS.items():
+        for connections in [int(c) for c in args.connections.split(",")]:
+            for stack, base_url in stacks.items():
+                url = base_url + path.format(uuid=args.event) + query
+                result = await run(url, connections, args.duration)
+                mean = statistics.mean(result.latencies) if result.latencies else 0
+                print(
+                    f"{name:<13} {connections:>6} {stack:<5} "
+                    f"{result.throughput:>9.1f} "
+                    f"{result.percentile(0.5) * 1000:>7.1f}ms "
+                    f"{result.percentile(0.99) * 1000:>7.1f}ms "
+                    f"{mean * 1000:>7.1f}ms {result.errors:>7}"
+                )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,140 @@
+"""
+Bytes and CPU of config.compression on bodies shaped like the availability-heavy responses
+(event detail, event schedules, team member schedules), compressed on every request
+and served from the cache of compressed variants.
+
+    python utils/compression_benchmark.py [--dates 14] [--members 30] [--requests 200]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Callable, Dict, List
+
+import django
+from django.conf import settings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+settings.configure(
+    COMPRESSION_MIN_SIZE=1024,
+    COMPRESSION_GZIP_LEVEL=int(os.environ.get("COMPRESSION_GZIP_LEVEL", 6)),
+    COMPRESSION_BROTLI_QUALITY=int(os.environ.get("COMPRESSION_BROTLI_QUALITY", 5)),
+    COMPRESSION_CACHE_SIZE=256,
+    ALLOWED_HOSTS=["*"],
+)
+django.setup()
+
+from django.http import HttpResponse  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+
+from config.compression import (  # noqa: E402
+    ENCODINGS,
+    compress_response,
+    compressed_cache,
+)
+
+
+def timeblock(p: float = 0.4) -> str:
+    return "".join("1" if random.random() < p else "0" for _ in range(48))
+
+
+def event_detail(dates: int, members: int) -> dict:
+    return {
+        "id": 1,
+        "uuid": "dbWUg9io46UXYNsiJrPhfR",
+        "associatedTeam": None,
+        "title": "benchmark",
+        "startTime": "09:00",
+        "endTime": "21:00",
+        "availability": {
+            f"2023-03-{day + 1:02d}": "".join(
+                str(random.randint(0, min(members, 9))) for _ in range(48)
+            )
+            for day in range(dates)
+        },
+        "createdAt": "2023-02-21T00:00:00+09:00",
+        "updatedAt": "2023-02-21T00:00:00+09:00",
+    }
+
+
+def event_schedules(dates: int, members: int) -> List[dict]:
+    return [
+        {
+            "id": member * dates + day,
+            "name": f"member{member}",
+            "event": 1,
+            "date": f"2023-03-{day + 1:02d}",
+            "availability": timeblock(),
+            "createdAt": "2023-02-21T00:00:00+09:00",
+            "updatedAt": "2023-02-21T00:00:00+09:00",
+        }
+        for member in range(members)
+        for day in range(dates)
+    ]
+
+
+def team_members(dates: int, members: int) -> List[dict]:
+    return [
+        {
+            "name": f"member{member}",
+            "subgroup": f"subgroup{member % 4}",
+            "weekSchedule": {str(day): timeblock() for day in range(7)},
+        }
+        for member in range(members)
+    ]
+
+
+def cpu_per_request(run: Callable[[], HttpResponse], requests: int) -> float:
+    started = time.process_time()
+    for _ in range(requests):
+        run()
+    return (time.process_time() - started) / requests
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dates", type=int, default=14)
+    parser.add_argument("--members", type=int, default=30)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    payloads: Dict[str, object] = {
+        "event detail": event_detail(args.dates, args.members),
+        "event schedules": event_schedules(args.dates, args.members),
+        "team members": team_members(args.dates, args.members),
+    }
+    factory = RequestFactory()
+
+    print(
+        f"{'response':<16} {'encoding':<9} {'bytes':>9} {'ratio':>7} "
+        f"{'cpu/req':>10} {'cached':>10}"
+    )
+    for name, payload in payloads.items():
+        body = json.dumps(payload, separators=(",", ":")).encode()
+        print(f"{name:<16} {'identity':<9} {len(body):>9}")
+
+        for encoding in ENCODINGS:
+            request = factory.get("/api/benchmark", HTTP_ACCEPT_ENCODING=encoding)
+
+            def respond(etag: str = "") -> HttpResponse:
+                response = HttpResponse(body, content_type="application/json")
+                if etag:
+                    response["ETag"] = etag
+                return compress_response(request, response)
+
+            compressed = len(respond().content)
+            uncached = cpu_per_request(respond, args.requests)
+            compressed_cache.clear()
+            cached = cpu_per_request(lambda: respond('"1-1-1"'), args.requests)
+            print(
+                f"{'':<16} {encoding:<9} {compressed:>9} "
+                f"{compressed / len(body):>7.1%} {uncached * 1000:>8.3f}ms "
+                f"{cached * 1000:>8.3f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()